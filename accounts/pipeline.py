@@ -0,0 +1,28 @@
+from django.core.cache import cache
+
+
+# Where the Google avatar URL is kept so pages don't have to load
+# UserSocialAuth.extra_data on every render
+PICTURE_SESSION_KEY = "google_picture"
+PICTURE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def picture_cache_key(user_id):
+    return f"spacebook:google_picture:{user_id}"
+
+
+def remember_picture(user_id, picture):
+    cache.set(picture_cache_key(user_id), picture, PICTURE_CACHE_TIMEOUT)
+
+
+def save_profile_picture(backend, strategy, user=None, social=None, response=None, *args, **kwargs):
+    """Pipeline step: keep the Google avatar URL in the session and cache."""
+    if backend.name != "google-oauth2" or user is None:
+        return
+
+    picture = (response or {}).get("picture")
+    if not picture and social:
+        picture = social.extra_data.get("picture")
+
+    strategy.session_set(PICTURE_SESSION_KEY, picture)
+    remember_picture(user.pk, picture)
@@ -1,7 +1,9 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
+from social_django.models import UserSocialAuth
 from .models import UserRole
+from .pipeline import remember_picture
 
 @receiver(post_save, sender=User)
 def assign_role_from_email(sender, instance, created, **kwargs):
@@ -33,3 +35,10 @@ def assign_role_from_email(sender, instance, created, **kwargs):
         user=instance,
         role=role
     )
+
+
+@receiver(post_save, sender=UserSocialAuth)
+def refresh_cached_picture(sender, instance, **kwargs):
+    # Runs on login and whenever the access token is refreshed
+    if instance.provider == "google-oauth2":
+        remember_picture(instance.user_id, instance.extra_data.get("picture"))
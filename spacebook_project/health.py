@@ -0,0 +1,183 @@
+# spacebook_project/health.py
+#
+# Health endpoints for the load balancer:
+#
+#   /spacebook/health/live/   process is up (no I/O at all)
+#   /spacebook/health/ready/  databases and cache answer
+#   /spacebook/health/        readiness + cached system stats
+#
+# System stats come from a background sampler thread, so a probe never
+# waits on psutil.cpu_percent() or disk I/O.
+import socket
+import sys
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import psutil
+import django
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import JsonResponse
+from django.utils import timezone
+
+
+STARTED_AT = timezone.now()
+
+# Seconds between system stat samples
+SAMPLE_INTERVAL = 5
+
+# Longest a readiness probe waits on one database
+DB_TIMEOUT = 1.0
+
+
+class SystemSampler:
+    """Refreshes CPU, memory, disk and process stats on a daemon thread."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, disk_path=None):
+        self.interval = interval
+        self.disk_path = str(disk_path or settings.BASE_DIR)
+        self.snapshot = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._process = psutil.Process()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            # Prime the counters so the first real sample has a baseline
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
+            self.sample()
+            self._thread = threading.Thread(
+                target=self._run, name="health-sampler", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception:  # noqa: BLE001
+                # Never let a failed sample kill the thread
+                pass
+
+    def sample(self):
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        proc = self._process
+
+        with proc.oneshot():
+            process = {
+                "pid": proc.pid,
+                "memory_bytes": proc.memory_info().rss,
+                "cpu_percent": proc.cpu_percent(interval=None),
+                "threads": proc.num_threads(),
+            }
+
+        self.snapshot = {
+            "sampled_at": timezone.now().isoformat(),
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory": {
+                "total": mem.total,
+                "used": mem.used,
+                "percent": mem.percent,
+            },
+            "disk": {
+                "path": self.disk_path,
+                "total": disk.total,
+                "used": disk.used,
+                "percent": disk.percent,
+            },
+            "process": process,
+        }
+
+
+sampler = SystemSampler()
+
+# One worker per database so a stuck ping can't block the others
+_db_pool = ThreadPoolExecutor(
+    max_workers=len(settings.DATABASES), thread_name_prefix="health-db"
+)
+
+
+def _ping(alias):
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except Exception:
+        # Drop a broken connection so the next probe reconnects
+        connections[alias].close()
+        raise
+
+
+def check_databases(timeout=DB_TIMEOUT):
+    futures = {alias: _db_pool.submit(_ping, alias) for alias in settings.DATABASES}
+    deadline = time.monotonic() + timeout
+    results = {}
+
+    for alias, future in futures.items():
+        try:
+            future.result(timeout=max(deadline - time.monotonic(), 0))
+            results[alias] = {"ok": True, "error": None}
+        except FutureTimeout:
+            results[alias] = {"ok": False, "error": f"timed out after {timeout}s"}
+        except Exception as e:  # noqa: BLE001
+            results[alias] = {"ok": False, "error": str(e)}
+
+    return results
+
+
+def check_cache():
+    try:
+        cache.set("__healthcheck__", "ok", 5)
+        ok = cache.get("__healthcheck__") == "ok"
+        return {"ok": ok, "error": None}
+    except Exception as e:  # noqa: BLE001
+        return {"ok": False, "error": str(e)}
+
+
+def _checks():
+    checks = {"databases": check_databases(), "cache": check_cache()}
+    ok = checks["cache"]["ok"] and all(db["ok"] for db in checks["databases"].values())
+    return ok, checks
+
+
+def liveness(request):
+    return JsonResponse({"status": "ok"})
+
+
+def readiness(request):
+    ok, checks = _checks()
+    return JsonResponse(
+        {"status": "ok" if ok else "degraded", "checks": checks},
+        status=200 if ok else 503,
+    )
+
+
+def health(request):
+    sampler.start()
+    ok, checks = _checks()
+
+    data = {
+        "status": "ok" if ok else "degraded",
+        "app": "spacebook",
+        "host": socket.gethostname(),
+        "time": timezone.now().isoformat(),
+        "started_at": STARTED_AT.isoformat(),
+        "uptime_seconds": (timezone.now() - STARTED_AT).total_seconds(),
+        "checks": checks,
+        "system": sampler.snapshot,
+        "versions": {
+            "python": sys.version.split()[0],
+            "django": django.get_version(),
+            "platform": platform.platform(),
+        },
+    }
+
+    return JsonResponse(data, status=200 if ok else 503)
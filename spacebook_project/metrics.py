@@ -0,0 +1,304 @@
+# spacebook_project/metrics.py
+#
+# Per-view request metrics in Prometheus text format, served at
+# /spacebook/metrics/.
+#
+# MetricsMiddleware records, per resolved URL name:
+#   * a request latency histogram and request counts by status code
+#   * DB query count and time, per database alias (default / main)
+#   * time spent waiting for SQLite's write lock, i.e. in BEGIN IMMEDIATE
+#     (see DATABASES in settings)
+#
+# Each worker process keeps its numbers in memory and writes them to its
+# own JSON file in METRICS_DIR about once a second. The endpoint sums
+# the files of every live worker, so a multi-worker uvicorn deployment
+# reports one set of numbers whichever worker answers the scrape. When a
+# worker has exited, its file is folded into RETIRED_FILE before it is
+# deleted, so the counters never go backwards (Prometheus would read
+# that as a reset).
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+
+import psutil
+from django.conf import settings
+from django.core.files import locks
+from django.db import connections
+from django.http import HttpResponse
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds between writes of this process's metrics file
+FLUSH_INTERVAL = 1.0
+
+# Views not worth recording (the scrape itself, probes)
+SKIP_VIEWS = {"metrics", "health", "health_live", "health_ready"}
+
+# Totals of exited workers, and the lock taken while adding to them
+RETIRED_FILE = "retired.json"
+RETIRED_LOCK = "retired.lock"
+
+
+def metrics_dir():
+    return str(
+        getattr(settings, "METRICS_DIR", None)
+        or os.path.join(tempfile.gettempdir(), "spacebook-metrics")
+    )
+
+
+class _Store:
+    """Counters for this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}   # (view, status) -> count
+        self.latency = {}    # view -> [bucket counts..., +Inf count, sum]
+        self.queries = {}    # (view, alias) -> [count, seconds, lock seconds]
+        self.last_flush = 0.0
+        process = psutil.Process()
+        self.filename = f"{process.pid}-{int(process.create_time())}.json"
+
+    def record(self, view, status, seconds, db_stats):
+        with self.lock:
+            key = (view, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            hist = self.latency.setdefault(view, [0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += 1
+            hist[-1] += seconds
+
+            for alias, (count, spent, lock_wait) in db_stats.items():
+                entry = self.queries.setdefault((view, alias), [0, 0.0, 0.0])
+                entry[0] += count
+                entry[1] += spent
+                entry[2] += lock_wait
+
+    def to_dict(self):
+        with self.lock:
+            return _to_dict(self.requests, self.latency, self.queries)
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_flush < FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+
+        folder = metrics_dir()
+        os.makedirs(folder, exist_ok=True)
+        _write(os.path.join(folder, self.filename), self.to_dict())
+
+
+def _to_dict(requests, latency, queries):
+    return {
+        "requests": [[*k, v] for k, v in requests.items()],
+        "latency": [[k, v] for k, v in latency.items()],
+        "queries": [[*k, *v] for k, v in queries.items()],
+    }
+
+
+def _write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+store = _Store()
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.lock_wait = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if sql.startswith("BEGIN"):
+                self.lock_wait += elapsed
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timers = {alias: _QueryTimer() for alias in settings.DATABASES}
+        started = time.perf_counter()
+
+        with ExitStack() as stack:
+            for alias, timer in timers.items():
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+
+        elapsed = time.perf_counter() - started
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name if match else None) or "unresolved"
+
+        if view not in SKIP_VIEWS:
+            store.record(
+                view,
+                response.status_code,
+                elapsed,
+                {
+                    alias: (t.count, t.seconds, t.lock_wait)
+                    for alias, t in timers.items()
+                    if t.count
+                },
+            )
+            store.flush()
+
+        return response
+
+
+def _alive(filename):
+    try:
+        pid, started = filename[:-5].split("-")
+        process = psutil.Process(int(pid))
+        return int(process.create_time()) == int(started)
+    except (ValueError, psutil.Error):
+        return False
+
+
+def _add(totals, data):
+    """Add one metrics file's numbers to (requests, latency, queries)."""
+    requests, latency, queries = totals
+    for view, status, count in data["requests"]:
+        requests[(view, status)] = requests.get((view, status), 0) + count
+    for view, hist in data["latency"]:
+        total = latency.setdefault(view, [0] * len(hist))
+        for i, value in enumerate(hist):
+            total[i] += value
+    for view, alias, count, seconds, *rest in data["queries"]:
+        entry = queries.setdefault((view, alias), [0, 0.0, 0.0])
+        entry[0] += count
+        entry[1] += seconds
+        # files written before lock wait was recorded have no third value
+        entry[2] += rest[0] if rest else 0.0
+
+
+def _retire(folder, filename):
+    """Fold an exited worker's file into RETIRED_FILE and delete it."""
+    with open(os.path.join(folder, RETIRED_LOCK), "a") as lock:
+        locks.lock(lock, locks.LOCK_EX)
+        try:
+            path = os.path.join(folder, filename)
+            data = _read(path)
+            if data is None:
+                # Another scrape got here first
+                return
+            totals = ({}, {}, {})
+            retired = _read(os.path.join(folder, RETIRED_FILE))
+            if retired:
+                _add(totals, retired)
+            _add(totals, data)
+            _write(os.path.join(folder, RETIRED_FILE), _to_dict(*totals))
+            os.remove(path)
+        finally:
+            locks.unlock(lock)
+
+
+def collect():
+    """Sum the metric files of every live worker and of those retired."""
+    store.flush(force=True)
+
+    totals = ({}, {}, {})
+    folder = metrics_dir()
+
+    for filename in os.listdir(folder):
+        if not filename.endswith(".json") or filename == RETIRED_FILE:
+            continue
+        if not _alive(filename):
+            _retire(folder, filename)
+            continue
+        data = _read(os.path.join(folder, filename))
+        if data:
+            _add(totals, data)
+
+    # Read last, so it includes the workers retired above
+    retired = _read(os.path.join(folder, RETIRED_FILE))
+    if retired:
+        _add(totals, retired)
+    return totals
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render():
+    requests, latency, queries = collect()
+    lines = []
+
+    lines.append("# HELP spacebook_requests_total Requests handled, by view and status.")
+    lines.append("# TYPE spacebook_requests_total counter")
+    for (view, status), count in sorted(requests.items()):
+        lines.append(
+            f'spacebook_requests_total{{view="{_label(view)}",status="{status}"}} {count}'
+        )
+
+    lines.append("# HELP spacebook_request_duration_seconds Request latency by view.")
+    lines.append("# TYPE spacebook_request_duration_seconds histogram")
+    for view, hist in sorted(latency.items()):
+        name = _label(view)
+        for bound, count in zip(BUCKETS, hist):
+            lines.append(
+                f'spacebook_request_duration_seconds_bucket{{view="{name}",le="{bound}"}} {count}'
+            )
+        lines.append(
+            f'spacebook_request_duration_seconds_bucket{{view="{name}",le="+Inf"}} {hist[-2]}'
+        )
+        lines.append(f'spacebook_request_duration_seconds_count{{view="{name}"}} {hist[-2]}')
+        lines.append(f'spacebook_request_duration_seconds_sum{{view="{name}"}} {hist[-1]:.6f}')
+
+    lines.append("# HELP spacebook_db_queries_total DB queries by view and database alias.")
+    lines.append("# TYPE spacebook_db_queries_total counter")
+    for (view, alias), (count, _, _) in sorted(queries.items()):
+        lines.append(
+            f'spacebook_db_queries_total{{view="{_label(view)}",database="{alias}"}} {count}'
+        )
+
+    lines.append(
+        "# HELP spacebook_db_query_seconds_total Time spent in DB queries by view and database alias."
+    )
+    lines.append("# TYPE spacebook_db_query_seconds_total counter")
+    for (view, alias), (_, seconds, _) in sorted(queries.items()):
+        lines.append(
+            f'spacebook_db_query_seconds_total{{view="{_label(view)}",database="{alias}"}} {seconds:.6f}'
+        )
+
+    lines.append(
+        "# HELP spacebook_db_lock_wait_seconds_total Time spent acquiring the SQLite write lock by view and database alias."
+    )
+    lines.append("# TYPE spacebook_db_lock_wait_seconds_total counter")
+    for (view, alias), (_, _, lock_wait) in sorted(queries.items()):
+        lines.append(
+            f'spacebook_db_lock_wait_seconds_total{{view="{_label(view)}",database="{alias}"}} {lock_wait:.6f}'
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics(request):
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
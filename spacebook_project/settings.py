@@ -31,10 +31,13 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "accounts.apps.AccountsConfig",
     "social_django",
+    "django_htmx",
     "website",
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware
+    "spacebook_project.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -43,6 +46,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "django_htmx.middleware.HtmxMiddleware",
 ]
 
 ROOT_URLCONF = "spacebook_project.urls"
@@ -80,11 +84,38 @@ DATABASES = {
     "main": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "main.db",
+        "OPTIONS": {
+            # Take the write lock at BEGIN so concurrent bookings queue up
+            # instead of both passing the conflict check (website/reservations.py)
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+        # File-backed test DB: in-memory SQLite can't queue concurrent writers
+        "TEST": {"NAME": BASE_DIR / "test_main.db"},
     },
 }
 
 DATABASE_ROUTERS = ["website.db_router.MainRouter"]
 
+# Cache
+# Per-process by default. Point this at a shared backend (Redis, Memcached,
+# file-based) when running several uvicorn workers so cache invalidation
+# in website/cache_utils.py reaches all of them.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+
+# Email
+# Queued in the outbox table and delivered by `manage.py send_outbox`
+# (website/outbox.py), never from inside a request. Points at a local
+# relay by default.
+EMAIL_HOST = "localhost"
+EMAIL_PORT = 25
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = "SpaceBook <noreply@uitm.edu.my>"
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -150,6 +181,20 @@ SOCIAL_AUTH_GOOGLE_OAUTH2_SCOPE = [
     "openid",
 ]
 
+SOCIAL_AUTH_PIPELINE = (
+    "social_core.pipeline.social_auth.social_details",
+    "social_core.pipeline.social_auth.social_uid",
+    "social_core.pipeline.social_auth.auth_allowed",
+    "social_core.pipeline.social_auth.social_user",
+    "social_core.pipeline.user.get_username",
+    "social_core.pipeline.user.create_user",
+    "social_core.pipeline.social_auth.associate_user",
+    "social_core.pipeline.social_auth.load_extra_data",
+    "social_core.pipeline.user.user_details",
+    # Keep the avatar URL in the session for website.context_processors
+    "accounts.pipeline.save_profile_picture",
+)
+
 SOCIAL_AUTH_GOOGLE_OAUTH2_EXTRA_DATA = [
     "sub",
     "email",
@@ -1,6 +1,6 @@
 # website/admin.py
 from django.contrib import admin
-from .models import Branch, Campus
+from .models import Branch, Campus, Closure, OpeningException, OpeningHours, OutboxEmail
 
 
 @admin.register(Branch)
@@ -18,3 +18,36 @@ class CampusAdmin(admin.ModelAdmin):
     search_fields = ("campus_code", "campus_name", "branch__name")
 
 
+@admin.register(OpeningHours)
+class OpeningHoursAdmin(admin.ModelAdmin):
+    list_display = ("library", "space", "weekday", "opens_at", "closes_at")
+    ordering = ("library", "space", "weekday", "opens_at")
+    list_filter = ("weekday",)
+    search_fields = ("library__library_code", "library__library_name", "space__space_name")
+
+
+@admin.register(OpeningException)
+class OpeningExceptionAdmin(admin.ModelAdmin):
+    list_display = ("date", "library", "space", "opens_at", "closes_at", "reason")
+    ordering = ("-date",)
+    date_hierarchy = "date"
+    search_fields = ("reason", "library__library_code", "library__library_name", "space__space_name")
+
+
+@admin.register(Closure)
+class ClosureAdmin(admin.ModelAdmin):
+    list_display = ("reason", "branch", "campus", "library", "space", "starts_at", "ends_at", "notices_sent_at")
+    ordering = ("-starts_at",)
+    date_hierarchy = "starts_at"
+    list_filter = ("branch",)
+    search_fields = ("reason", "library__library_code", "library__library_name", "space__space_name")
+    readonly_fields = ("notices_sent_at",)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("kind", "user_id", "summary", "status", "attempts", "next_attempt_at", "sent_at")
+    ordering = ("-created_at",)
+    list_filter = ("status", "kind")
+    search_fields = ("summary", "last_error")
+    readonly_fields = ("created_at", "sent_at", "last_error")
@@ -0,0 +1,116 @@
+# website/approvals.py
+#
+# Approving or rejecting many pending bookings at once.
+#
+# decide() reads the selected PENDING bookings (with their space's
+# buffer) in one locking query. Before approving, it re-checks in memory
+# that they overlap neither each other nor an already approved booking,
+# which costs one more query over the same space-days. Then it flips
+# them all with a single
+#
+#   UPDATE website_booking SET status = ... WHERE status = 'PENDING' AND id IN (...)
+#
+# queryset.update() skips the Booking signals, so the rollup, the booking
+# index and the cached booking counts are brought up to date here.
+# Callers queue the emails (website/outbox.py) in the same transaction.
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from website import booking_index, rollup
+from website.booking_rules import buffered
+from website.cache_utils import bump_version
+from website.models import Booking
+
+
+DECISIONS = ("APPROVED", "REJECTED")
+
+_FIELDS = (
+    "id", "user_id", "space_id", "booking_date", "start_time", "end_time",
+    "status", "payment_status",
+)
+
+
+def _overlapping(rows, using):
+    """{id: reason} for rows that clash with an approved booking or with
+    an earlier row; the rest can all be approved together."""
+    days = {(row["space_id"], row["booking_date"]) for row in rows}
+    taken = defaultdict(list)
+    approved = (
+        Booking.objects.using(using)
+        .filter(
+            status="APPROVED",
+            space_id__in={space_id for space_id, _ in days},
+            booking_date__in={day for _, day in days},
+        )
+        .values_list("space_id", "booking_date", "start_time", "end_time")
+    )
+    for space_id, day, start, end in approved:
+        if (space_id, day) in days:
+            taken[space_id, day].append((start, end))
+
+    clashes = {}
+    for row in sorted(rows, key=lambda r: (r["space_id"], r["booking_date"], r["start_time"], r["id"])):
+        start, end = buffered(row["start_time"], row["end_time"], row["buffer"])
+        slots = taken[row["space_id"], row["booking_date"]]
+        if any(s < end and e > start for s, e in slots):
+            clashes[row["id"]] = "Overlaps an approved booking."
+        else:
+            slots.append((row["start_time"], row["end_time"]))
+    return clashes
+
+
+def decide(decision, ids=None, space_id=None, booking_date=None, using="main"):
+    """Approve or reject PENDING bookings by id and/or space and date.
+
+    Returns (bookings decided, {id: reason} for those left pending).
+    """
+    if decision not in DECISIONS:
+        raise ValueError(f"Unknown decision {decision!r}")
+    if ids is None and space_id is None and booking_date is None:
+        return [], {}
+
+    pending = Booking.objects.using(using).filter(status="PENDING")
+    if ids is not None:
+        pending = pending.filter(id__in=ids)
+    if space_id is not None:
+        pending = pending.filter(space_id=space_id)
+    if booking_date is not None:
+        pending = pending.filter(booking_date=booking_date)
+
+    with transaction.atomic(using=using):
+        rows = list(
+            pending.select_for_update().order_by()
+            .values(
+                *_FIELDS,
+                buffer=F("space__buffer_minutes"),
+                space_name=F("space__space_name"),
+            )
+        )
+        skipped = _overlapping(rows, using) if rows and decision == "APPROVED" else {}
+        rows = [row for row in rows if row["id"] not in skipped]
+        if not rows:
+            return [], skipped
+
+        Booking.objects.using(using).filter(
+            status="PENDING", id__in=[row["id"] for row in rows]
+        ).update(status=decision, updated_at=timezone.now())
+
+        before = [Booking(**{f: row[f] for f in _FIELDS}) for row in rows]
+        after = [Booking(**{f: row[f] for f in _FIELDS}) for row in rows]
+        for booking, row in zip(after, rows):
+            booking.status = decision
+            # For the outbox summaries, without loading the space
+            booking.space_name = row["space_name"]
+        # update() skips the signals that keep these in step
+        rollup.apply_many(before, sign=-1, using=using)
+        rollup.apply_many(after, using=using)
+
+    if decision in Booking.INACTIVE_STATUSES:
+        for key in {(b.space_id, b.booking_date) for b in after}:
+            booking_index.invalidate_on_commit(*key, using=using)
+    bump_version("booking_counts")
+    return after, skipped
+
@@ -0,0 +1,189 @@
+# website/autocomplete.py
+#
+# Search-as-you-type suggestions for branches, campuses, libraries and
+# spaces, served from memory.
+#
+# SUGGESTIONS caches one Suggestions object: every entry (a branch,
+# campus, library or space with its label and branch code) plus a
+# sorted array of (word, entry) pairs covering each word of every name
+# and code. A keystroke is a bisect into that array, never a query.
+# Saving or deleting any of the four models invalidates it (see
+# website/signals.py).
+#
+# Words are folded like website/search.py does (case, accents), and every
+# query word is a prefix: "pu pin" suggests "Pulau Pinang".
+import bisect
+import heapq
+
+from django.urls import reverse
+
+from website.cache_utils import VersionedCache
+from website.models import Branch, Campus, Library, LibrarySpace
+from website.search import tokenize
+
+
+# Suggestion order when matches are otherwise equal
+KIND_ORDER = ("branch", "campus", "library", "space")
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+
+# Results remembered per Suggestions build
+MEMO_SIZE = 4096
+
+
+class Entry:
+    __slots__ = ("kind", "key", "label", "detail", "branch", "words")
+
+    def __init__(self, kind, key, label, detail, branch, codes=()):
+        self.kind = kind
+        self.key = key
+        self.label = label
+        self.detail = detail
+        self.branch = branch
+        self.words = tuple(dict.fromkeys(tokenize(label) + tokenize(" ".join(codes))))
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @property
+    def url(self):
+        # Built per response, not per entry: reverse() is the slowest
+        # part of a rebuild
+        if self.kind == "branch":
+            return reverse("branch_detail", args=[self.key])
+        if self.kind == "campus":
+            return f"{reverse('library_list')}?branch={self.branch}&campus={self.key}"
+        if self.kind == "library":
+            return reverse("library_detail", args=[self.key])
+        return reverse("space_detail", args=[self.key])
+
+    def as_json(self):
+        return {
+            "kind": self.kind,
+            "key": self.key,
+            "label": self.label,
+            "detail": self.detail,
+            "url": self.url,
+        }
+
+
+class Suggestions:
+    def __init__(self, entries):
+        self.entries = sorted(
+            entries, key=lambda e: (KIND_ORDER.index(e.kind), e.label.casefold())
+        )
+        # (word, position in entries), sorted by word
+        self.words = sorted(
+            (word, i) for i, entry in enumerate(self.entries) for word in entry.words
+        )
+        self.campuses_by_branch = {}
+        for entry in self.entries:
+            if entry.kind == "campus":
+                self.campuses_by_branch.setdefault(entry.branch, []).append(entry)
+        self._memo = {}
+
+    # The memo is per process; don't ship it through the shared cache
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_memo"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._memo = {}
+
+    def _positions(self, prefix):
+        start = bisect.bisect_left(self.words, (prefix,))
+        end = bisect.bisect_left(self.words, (prefix + "\uffff",))
+        return {i for _, i in self.words[start:end]}
+
+    def suggest(self, query, kinds=None, branch=None, limit=DEFAULT_LIMIT):
+        words = tuple(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+
+        # Short prefixes match the most entries and are typed the most
+        memo_key = (words, tuple(kinds or ()), branch, limit)
+        found = self._memo.get(memo_key)
+        if found is None:
+            found = self._suggest(words, kinds, branch, limit)
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[memo_key] = found
+        return found
+
+    def _suggest(self, words, kinds, branch, limit):
+
+        # Start from the most specific word, then check the rest
+        by_length = sorted(words, key=len, reverse=True)
+        positions = self._positions(by_length[0])
+        for word in by_length[1:]:
+            if not positions:
+                break
+            positions &= self._positions(word)
+
+        ranked = []
+        for i in positions:
+            entry = self.entries[i]
+            if kinds and entry.kind not in kinds:
+                continue
+            if branch and entry.branch != branch:
+                continue
+            # Labels that start with the query's first word come first
+            leading = not entry.words or not entry.words[0].startswith(words[0])
+            ranked.append((leading, i))
+
+        return [self.entries[i] for _, i in heapq.nsmallest(limit, ranked)]
+
+
+def _load_suggestions():
+    branch_of_campus = {}
+    entries = []
+
+    for code, name, location in Branch.objects.order_by().values_list("code", "name", "location"):
+        entries.append(Entry(
+            "branch", code, name, location, code, [code],
+        ))
+
+    campuses = Campus.objects.order_by().values_list("campus_code", "campus_name", "branch_id", "city")
+    for code, name, branch, city in campuses:
+        branch_of_campus[code] = branch
+        entries.append(Entry("campus", code, name, city, branch, [code]))
+
+    library_names = {}
+    libraries = Library.objects.order_by().values_list(
+        "library_code", "library_name", "short_name", "campus_code", "city"
+    )
+    for code, name, short_name, campus, city in libraries:
+        library_names[code] = (name, branch_of_campus.get(campus))
+        entries.append(Entry(
+            "library", code, name, city, branch_of_campus.get(campus), [code, short_name or ""],
+        ))
+
+    spaces = LibrarySpace.objects.filter(is_active=True).order_by().values_list(
+        "space_id", "space_name", "room_number", "library_id"
+    )
+    for space_id, name, room_number, library in spaces:
+        library_name, branch = library_names.get(library, (library, None))
+        entries.append(Entry(
+            "space", str(space_id), name, library_name, branch, [room_number],
+        ))
+
+    return Suggestions(entries)
+
+
+SUGGESTIONS = VersionedCache("suggestions", _load_suggestions)
+
+
+def suggest(query, kinds=None, branch=None, limit=DEFAULT_LIMIT):
+    return SUGGESTIONS.get().suggest(query, kinds, branch, limit)
+
+
+def campuses_of(branch):
+    """Campus entries of a branch, by name."""
+    return SUGGESTIONS.get().campuses_by_branch.get(branch, [])
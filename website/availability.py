@@ -0,0 +1,175 @@
+# website/availability.py
+#
+# Free-slot calculation for a LibrarySpace. Busy intervals come from the
+# per-day booking index (website/booking_index.py), so repeated lookups
+# for the same space-day don't touch the database.
+#
+# Slots fall inside the space's opening hours for the day
+# (website/opening_hours.py), not just available_from-available_to.
+#
+# Also builds the library-wide room-by-slot grid, one bitmask per room.
+import datetime
+
+from django.utils import timezone
+
+from website import booking_index, opening_hours
+from website.models import Booking
+
+
+# Longest range the availability API will compute in one request
+MAX_RANGE_DAYS = 31
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _time(minutes):
+    if minutes >= opening_hours.DAY_MINUTES:
+        return datetime.time.max
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+def earliest_start(space, now=None):
+    """First bookable moment, honouring advance_notice (hours)."""
+    now = timezone.localtime(now)
+    if space.advance_notice:
+        now += datetime.timedelta(hours=space.advance_notice)
+    return now.replace(tzinfo=None, second=0, microsecond=0)
+
+
+def free_slots_for_day(space, day, busy, not_before=None):
+    """Free (start, end) time pairs on `day`.
+
+    `busy` is a list of (start, end) times sorted by start. One pass over
+    it per open interval of the day, with every booking widened by the
+    space's buffer_minutes.
+    """
+    earliest = 0
+    if not_before is not None:
+        if day < not_before.date():
+            return []
+        if day == not_before.date():
+            earliest = _minutes(not_before.time())
+
+    buffer = space.buffer_minutes or 0
+    slots = []
+
+    for open_at, close_at in opening_hours.open_intervals(space, day):
+        cursor = max(open_at, earliest)
+
+        for start, end in busy:
+            blocked_from = _minutes(start) - buffer
+            blocked_to = _minutes(end) + buffer
+
+            if blocked_from > cursor:
+                slots.append((cursor, min(blocked_from, close_at)))
+            cursor = max(cursor, blocked_to)
+
+            if cursor >= close_at:
+                break
+
+        if cursor < close_at:
+            slots.append((cursor, close_at))
+
+    return [(_time(s), _time(e)) for s, e in slots if e > s]
+
+
+def free_slots(space, start_date, end_date, now=None):
+    """{date: [(start, end), ...]} for every day in the inclusive range."""
+    days = [
+        start_date + datetime.timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+    ]
+    busy_by_day = booking_index.busy_intervals_by_day(space.pk, days)
+    not_before = earliest_start(space, now)
+
+    return {
+        day: free_slots_for_day(space, day, busy_by_day[day], not_before)
+        for day in days
+    }
+
+
+class GridRow:
+    """One room in a library day grid; bit i of a mask is slot i."""
+
+    def __init__(self, space_id, space_name, capacity, booked=0, closed=0):
+        self.space_id = space_id
+        self.space_name = space_name
+        self.capacity = capacity
+        self.booked = booked
+        self.closed = closed
+
+    def cells(self, slot_count):
+        # "." free, "x" booked, "-" outside the room's hours
+        out = []
+        for i in range(slot_count):
+            bit = 1 << i
+            out.append("-" if self.closed & bit else "x" if self.booked & bit else ".")
+        return "".join(out)
+
+
+def _slot_mask(first, last):
+    # Bits first..last inclusive
+    if last < first:
+        return 0
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+def library_day_grid(library, day, slot_minutes=60):
+    """(slot start times, [GridRow, ...]) for every active room in `library`.
+
+    Two queries regardless of the number of rooms: one for the spaces and
+    one for all of their active bookings on `day`. Opening hours come
+    from the cached table.
+    """
+    spaces = list(
+        library.spaces.filter(is_active=True)
+        .order_by("space_name")
+        .values_list(
+            "space_id", "space_name", "capacity", "available_from", "available_to"
+        )
+    )
+    if not spaces:
+        return [], []
+
+    open_by_space = {
+        space_id: opening_hours.intervals(space_id, day, available_from, available_to)
+        for space_id, _, _, available_from, available_to in spaces
+    }
+    starts = [i[0][0] for i in open_by_space.values() if i]
+    ends = [i[-1][1] for i in open_by_space.values() if i]
+    if not starts:
+        # Everything is closed; show the rooms' usual hours, all blanked
+        starts = [_minutes(s[3]) for s in spaces]
+        ends = [_minutes(s[4]) for s in spaces]
+
+    grid_start = min(starts)
+    grid_start -= grid_start % slot_minutes
+    grid_end = max(ends)
+    slot_count = -(-(grid_end - grid_start) // slot_minutes)
+    full = _slot_mask(0, slot_count - 1)
+
+    def span(start, end):
+        first = (start - grid_start) // slot_minutes
+        last = -(-(end - grid_start) // slot_minutes) - 1
+        return _slot_mask(max(first, 0), min(last, slot_count - 1))
+
+    rows = {}
+    for space_id, name, capacity, _, _ in spaces:
+        open_mask = 0
+        for start, end in open_by_space[space_id]:
+            open_mask |= span(start, end)
+        rows[space_id] = GridRow(space_id, name, capacity, closed=full & ~open_mask)
+
+    bookings = (
+        Booking.objects.using("main")
+        .filter(space__library=library, space__is_active=True, booking_date=day)
+        .exclude(status__in=Booking.INACTIVE_STATUSES)
+        .values_list("space_id", "start_time", "end_time")
+    )
+    for space_id, start, end in bookings:
+        rows[space_id].booked |= span(_minutes(start), _minutes(end))
+
+    labels = [_time(grid_start + i * slot_minutes) for i in range(slot_count)]
+    return labels, list(rows.values())
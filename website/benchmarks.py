@@ -0,0 +1,327 @@
+# website/benchmarks.py
+#
+# Shared pieces of the query-count regression suite:
+#
+#   * seed()    fills both databases with a realistic dataset
+#               (users in "default", everything else in "main")
+#   * ROUTES    every named route in website/urls.py, with the URL
+#               arguments it needs and its query budget per request
+#   * sweep()   requests every route and records query counts and
+#               p50/p95 latency
+#
+# Used by QueryBudgetTests in website/tests.py (small dataset, budgets
+# only) and by `python manage.py bench_routes` (full dataset, latency
+# baseline in JSON).
+import datetime
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from website import rollup, search
+from website.models import Branch, Campus, Library, LibrarySpace, Booking
+
+
+SCALES = {
+    # branches, campuses per branch, libraries, spaces, bookings, users
+    "test": dict(branches=3, campuses=2, libraries=6, spaces=30, bookings=600, users=20),
+    "full": dict(
+        branches=15, campuses=3, libraries=200, spaces=5000, bookings=1_000_000, users=2000
+    ),
+}
+
+BATCH_SIZE = 5000
+
+
+class SeededData:
+    """Primary keys of the sample rows routes are requested with."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def seed(branches, campuses, libraries, spaces, bookings, users, first_day=None):
+    first_day = first_day or datetime.date(2030, 1, 6)
+
+    User.objects.bulk_create(
+        [
+            User(username=f"student{i}", email=f"student{i}@student.uitm.edu.my")
+            for i in range(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(
+        User.objects.filter(username__startswith="student").values_list("pk", flat=True)
+    )
+    staff = User.objects.create(
+        username="librarian", email="librarian@uitm.edu.my", is_staff=True
+    )
+
+    Branch.objects.bulk_create(
+        [Branch(code=f"B{i:02}", name=f"Branch {i:02}", location="Malaysia") for i in range(branches)]
+    )
+    Campus.objects.bulk_create(
+        [
+            Campus(
+                campus_code=f"C{b:02}{c}",
+                branch_id=f"B{b:02}",
+                campus_name=f"Campus {b:02}-{c}",
+                role="Main Campus" if c == 0 else "Satellite Campus",
+            )
+            for b in range(branches)
+            for c in range(campuses)
+        ]
+    )
+    campus_codes = list(Campus.objects.values_list("campus_code", flat=True))
+
+    Library.objects.bulk_create(
+        [
+            Library(
+                library_code=f"L{i:04}",
+                campus_code=campus_codes[i % len(campus_codes)],
+                library_name=f"Perpustakaan {i:04}",
+                city="Shah Alam",
+                state="Selangor",
+                latitude=1.5 + (i % 50) * 0.1,
+                longitude=100.5 + (i // 50) * 0.1,
+            )
+            for i in range(libraries)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    space_types = [code for code, _ in LibrarySpace.SPACE_TYPES]
+    new_spaces = [
+        LibrarySpace(
+            library_id=f"L{i % libraries:04}",
+            space_name=f"Room {i:05}",
+            capacity=2 + i % 12,
+            space_type=space_types[i % len(space_types)],
+            has_projector=i % 2 == 0,
+            has_whiteboard=i % 3 == 0,
+            has_wifi=True,
+            has_power_plug=i % 4 != 0,
+            has_network_node=i % 5 == 0,
+            wheelchair_accessible=i % 6 == 0,
+            requires_approval=i % 4 == 0,
+            available_from=datetime.time(8),
+            available_to=datetime.time(22),
+        )
+        for i in range(spaces)
+    ]
+    for space in new_spaces:
+        # bulk_create skips save()
+        space.amenity_mask = space.compute_amenity_mask()
+    LibrarySpace.objects.bulk_create(new_spaces, batch_size=BATCH_SIZE)
+    space_ids = list(LibrarySpace.objects.values_list("space_id", flat=True))
+
+    # One booking per space per day at a varying hour, so the seeded data
+    # never contains overlapping active bookings
+    statuses = ["APPROVED", "APPROVED", "APPROVED", "PENDING", "CANCELLED", "REJECTED"]
+    batch = []
+    for i in range(bookings):
+        space = space_ids[i % len(space_ids)]
+        day = i // len(space_ids)
+        hour = 8 + (day * 5 + i) % 14
+        batch.append(
+            Booking(
+                user_id=user_ids[i % len(user_ids)],
+                space_id=space,
+                booking_date=first_day + datetime.timedelta(days=day),
+                start_time=datetime.time(hour),
+                end_time=datetime.time(hour + 1),
+                status=statuses[i % len(statuses)],
+                payment_status="PAID" if i % 7 == 0 else "UNPAID",
+            )
+        )
+        if len(batch) >= BATCH_SIZE:
+            Booking.objects.bulk_create(batch)
+            batch = []
+    Booking.objects.bulk_create(batch)
+    rollup.rebuild()
+    search.rebuild()
+
+    student = User.objects.get(pk=user_ids[0])
+    pending = list(
+        Booking.objects.filter(status="PENDING").order_by("id").values_list("id", flat=True)[:2]
+    )
+    own = (
+        Booking.objects.filter(user=student, status="APPROVED", payment_status="UNPAID")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+    return SeededData(
+        student=student,
+        staff=staff,
+        branch_code="B00",
+        campus_code=campus_codes[0],
+        library_code="L0000",
+        space_id=space_ids[0],
+        own_booking_id=own[0],
+        cancel_booking_id=own[1],
+        approve_booking_id=pending[0],
+        reject_booking_id=pending[1],
+        first_day=first_day,
+    )
+
+
+class Route:
+    def __init__(self, name, budget, user=None, kwargs=None, params=None, repeatable=True):
+        self.name = name
+        self.budget = budget          # max queries per request, both databases
+        self.user = user              # None, "student" or "staff"
+        self.kwargs = kwargs or (lambda data: {})
+        self.params = params or (lambda data: {})
+        self.repeatable = repeatable  # False for routes that change state on GET
+
+    def url(self, data):
+        return reverse(self.name, kwargs=self.kwargs(data))
+
+
+def _branch(data):
+    return {"code": data.branch_code}
+
+
+def _campus(data):
+    return {"campus_code": data.campus_code}
+
+
+def _library(data):
+    return {"library_code": data.library_code}
+
+
+def _space(data):
+    return {"space_id": data.space_id}
+
+
+def _booking(attr):
+    return lambda data: {"booking_id": getattr(data, attr)}
+
+
+# Budgets include the session + user lookups of logged-in requests.
+# Raise one only together with the change that needs it.
+ROUTES = [
+    Route("home", 1),
+    Route("profile", 2, user="student"),
+    Route("about", 0),
+    Route("blank", 0),
+    # "s" matches seeded libraries (Shah Alam) and spaces (Study Area)
+    Route("search", 4, params=lambda data: {"q": "s"}),
+    Route("autocomplete_api", 0, params=lambda data: {"q": "ro"}),
+    Route("branch_list_embed", 1),
+    Route("branch_list", 1),
+    Route("branch_create", 4, user="staff"),
+    Route("branch_list_api", 1),
+    Route("branch_detail", 2, kwargs=_branch),
+    Route("branch_edit", 5, user="staff", kwargs=_branch),
+    Route("branch_delete", 3, user="staff", kwargs=_branch),
+    Route("campus_list", 1),
+    Route("campus_create", 1),
+    Route("campus_edit", 3, kwargs=_campus),
+    Route("campus_delete", 2, kwargs=_campus),
+    Route("library_list", 3, params=lambda data: {"branch": data.branch_code}),
+    Route("library_create", 3, user="staff"),
+    Route("library_delete", 3, user="staff", kwargs=_library),
+    Route("campus_by_branch_api", 0, params=lambda data: {"branch": data.branch_code}),
+    Route("library_edit", 7, user="staff", kwargs=_library),
+    Route(
+        "library_nearest_api", 2,
+        params=lambda data: {
+            "lat": 2.0, "lng": 100.6, "date": data.first_day,
+            "start": "09:00", "end": "10:00", "capacity": 4,
+        },
+    ),
+    Route("library_detail", 1, kwargs=_library),
+    Route("library_grid", 3, kwargs=_library, params=lambda data: {"date": data.first_day}),
+    Route("space_list", 4, params=lambda data: {"library": data.library_code}),
+    Route("space_create", 3, user="staff"),
+    Route("space_detail", 1, kwargs=_space),
+    Route(
+        "space_availability_api",
+        2,
+        kwargs=_space,
+        params=lambda data: {"start": data.first_day, "end": data.first_day + datetime.timedelta(days=6)},
+    ),
+    Route("space_edit", 4, user="staff", kwargs=_space),
+    Route("space_delete", 3, user="staff", kwargs=_space),
+    Route("booking_create", 3, user="student", kwargs=_space),
+    Route("booking_series_create", 3, user="student", kwargs=_space),
+    Route("my_bookings", 3, user="student"),
+    Route("cancel_booking", 13, user="student", kwargs=_booking("cancel_booking_id"), repeatable=False),
+    Route("pending_bookings", 4, user="staff"),
+    Route("bulk_decide_bookings", 2, user="staff"),
+    Route("approve_booking", 13, user="staff", kwargs=_booking("approve_booking_id"), repeatable=False),
+    Route("reject_booking", 13, user="staff", kwargs=_booking("reject_booking_id"), repeatable=False),
+    Route("booking_report", 4, user="staff"),
+    Route(
+        "booking_report_export",
+        3,
+        user="staff",
+        params=lambda data: {"start_date": data.first_day, "end_date": data.first_day},
+    ),
+    Route("fpx_start", 3, user="student", kwargs=_booking("own_booking_id")),
+    Route("fpx_bank", 3, user="student", kwargs=_booking("own_booking_id")),
+]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def sweep(clients, data, repeat=1, routes=ROUTES):
+    """Request every route; returns {name: stats} with queries and latency.
+
+    `clients` maps None / "student" / "staff" to a logged-in test client.
+    Each repeatable route gets one unmeasured warm-up request first.
+    """
+    results = {}
+    aliases = list(connections)
+
+    for route in routes:
+        client = clients[route.user]
+        url = route.url(data)
+        params = route.params(data)
+
+        runs = repeat if route.repeatable else 1
+        if route.repeatable:
+            _consume(client.get(url, params))
+
+        timings = []
+        queries = []
+        status = None
+        for _ in range(runs):
+            with ExitStack() as stack:
+                captured = [
+                    stack.enter_context(CaptureQueriesContext(connections[alias]))
+                    for alias in aliases
+                ]
+                started = time.perf_counter()
+                response = client.get(url, params)
+                _consume(response)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(sum(len(c.captured_queries) for c in captured))
+            status = response.status_code
+
+        results[route.name] = {
+            "url": url,
+            "status": status,
+            "queries": max(queries),
+            "budget": route.budget,
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(_percentile(timings, 95), 2),
+        }
+
+    return results
+
+
+def _consume(response):
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response
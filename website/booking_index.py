@@ -0,0 +1,232 @@
+# website/booking_index.py
+#
+# In-memory interval index of active bookings, one per (space, date).
+# Used by BookingForm.clean (through website/booking_rules.py) so
+# conflict checks are a bisect instead of a database round trip. Entries
+# are kept fresh by the Booking signals in website/signals.py, once the
+# change commits, and rebuilt from the (space, booking_date) index on a
+# miss.
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import transaction
+
+from website.models import Booking
+
+
+# Other worker processes don't see our signals, so never trust an
+# entry for longer than this.
+INDEX_TTL_SECONDS = 60
+
+# Upper bound on cached (space, date) entries per process.
+INDEX_MAX_ENTRIES = 5000
+
+
+class IntervalIndex:
+    """Bookings of one space on one day, sorted by start time."""
+
+    def __init__(self, rows=()):
+        rows = sorted(rows, key=lambda row: (row[1], row[2]))
+        self._ids = [row[0] for row in rows]
+        self._starts = [row[1] for row in rows]
+        self._ends = [row[2] for row in rows]
+        self._max_ends = []
+        self._rebuild_max_ends(0)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _rebuild_max_ends(self, position):
+        # _max_ends[i] is the latest end among the first i + 1 intervals,
+        # so overlapping rows (e.g. legacy data) are still handled.
+        del self._max_ends[position:]
+        current = self._max_ends[-1] if self._max_ends else None
+        for end in self._ends[position:]:
+            current = end if current is None or end > current else current
+            self._max_ends.append(current)
+
+    def add(self, booking_id, start, end):
+        position = bisect.bisect_right(self._starts, start)
+        self._ids.insert(position, booking_id)
+        self._starts.insert(position, start)
+        self._ends.insert(position, end)
+        self._rebuild_max_ends(position)
+
+    def remove(self, booking_id):
+        try:
+            position = self._ids.index(booking_id)
+        except ValueError:
+            return False
+
+        del self._ids[position]
+        del self._starts[position]
+        del self._ends[position]
+        self._rebuild_max_ends(position)
+        return True
+
+    def intervals(self):
+        return list(zip(self._starts, self._ends))
+
+    def overlaps(self, start, end):
+        # Every interval starting before `end` is a candidate; the
+        # running max tells us whether any of them ends after `start`.
+        position = bisect.bisect_left(self._starts, end)
+        return position > 0 and self._max_ends[position - 1] > start
+
+
+_lock = threading.Lock()
+_indexes = OrderedDict()   # (space_id, date) -> (loaded_at, IntervalIndex)
+_locations = {}            # booking_id -> (space_id, date)
+
+
+def _load(space_id, booking_date):
+    rows = (
+        Booking.objects.using("main")
+        .filter(space_id=space_id, booking_date=booking_date)
+        .exclude(status__in=Booking.INACTIVE_STATUSES)
+        .values_list("id", "start_time", "end_time")
+    )
+    return IntervalIndex(rows)
+
+
+def _forget(key):
+    entry = _indexes.pop(key, None)
+    if entry:
+        for booking_id in entry[1]._ids:
+            _locations.pop(booking_id, None)
+
+
+def _store(key, index, loaded_at):
+    # Caller holds _lock.
+    _forget(key)
+    _indexes[key] = (loaded_at, index)
+    for booking_id in index._ids:
+        _locations[booking_id] = key
+
+    while len(_indexes) > INDEX_MAX_ENTRIES:
+        _forget(next(iter(_indexes)))
+
+
+def _cached(key, now):
+    # Caller holds _lock.
+    entry = _indexes.get(key)
+    if entry and now - entry[0] < INDEX_TTL_SECONDS:
+        _indexes.move_to_end(key)
+        return entry[1]
+    return None
+
+
+def get_index(space_id, booking_date):
+    key = (space_id, booking_date)
+    now = time.monotonic()
+
+    with _lock:
+        index = _cached(key, now)
+    if index is not None:
+        return index
+
+    index = _load(space_id, booking_date)
+
+    with _lock:
+        _store(key, index, now)
+
+    return index
+
+
+def busy_intervals_by_day(space_id, dates):
+    """Sorted (start, end) pairs per day, loading all misses in one query."""
+    now = time.monotonic()
+    found = {}
+
+    with _lock:
+        for day in dates:
+            index = _cached((space_id, day), now)
+            if index is not None:
+                found[day] = index
+
+    missing = [day for day in dates if day not in found]
+    if missing:
+        rows = {day: [] for day in missing}
+        qs = (
+            Booking.objects.using("main")
+            .filter(space_id=space_id, booking_date__in=missing)
+            .exclude(status__in=Booking.INACTIVE_STATUSES)
+            .values_list("booking_date", "id", "start_time", "end_time")
+        )
+        for booking_date, booking_id, start, end in qs:
+            rows[booking_date].append((booking_id, start, end))
+
+        with _lock:
+            for day in missing:
+                found[day] = IntervalIndex(rows[day])
+                _store((space_id, day), found[day], now)
+
+    with _lock:
+        return {day: index.intervals() for day, index in found.items()}
+
+
+def busy_intervals(space_id, booking_date):
+    index = get_index(space_id, booking_date)
+    with _lock:
+        return index.intervals()
+
+
+def has_conflict(space_id, booking_date, start_time, end_time):
+    index = get_index(space_id, booking_date)
+    with _lock:
+        return index.overlaps(start_time, end_time)
+
+
+def _field_value(booking, name):
+    # Instances built by hand may still hold strings until refreshed.
+    return Booking._meta.get_field(name).to_python(getattr(booking, name))
+
+
+def _move(booking_id, key, interval):
+    """Take a booking out of its entry and, given an interval, add it to
+    the entry for `key`."""
+    with _lock:
+        previous = _locations.pop(booking_id, None)
+        if previous and previous in _indexes:
+            _indexes[previous][1].remove(booking_id)
+
+        # Only patch entries we already hold; misses are rebuilt from the DB.
+        entry = _indexes.get(key)
+        if entry and interval:
+            entry[1].add(booking_id, *interval)
+            _locations[booking_id] = key
+
+
+def booking_saved(booking, using="main"):
+    key = (booking.space_id, _field_value(booking, "booking_date"))
+    interval = None
+    if booking.status not in Booking.INACTIVE_STATUSES:
+        interval = (_field_value(booking, "start_time"), _field_value(booking, "end_time"))
+    # Values as saved; a save that rolls back never reaches the index
+    booking_id = booking.pk
+    transaction.on_commit(lambda: _move(booking_id, key, interval), using=using)
+
+
+def booking_deleted(booking, using="main"):
+    booking_id = booking.pk
+    transaction.on_commit(lambda: _move(booking_id, None, None), using=using)
+
+
+def invalidate(space_id=None, booking_date=None):
+    """Drop cached entries, e.g. after a queryset .update() skipped signals."""
+    with _lock:
+        if space_id is None:
+            _indexes.clear()
+            _locations.clear()
+            return
+
+        for key in [k for k in _indexes if k[0] == space_id]:
+            if booking_date is None or key[1] == booking_date:
+                _forget(key)
+
+
+def invalidate_on_commit(space_id=None, booking_date=None, using="main"):
+    """invalidate() once the current transaction on `using` commits."""
+    transaction.on_commit(lambda: invalidate(space_id, booking_date), using=using)
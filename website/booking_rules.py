@@ -0,0 +1,75 @@
+# website/booking_rules.py
+#
+# Every rule a new booking must pass, in one place:
+#
+#   * advance notice: start no earlier than now + space.advance_notice
+#     hours (never in the past)
+#   * closures (website/closures.py)
+#   * opening hours, which fall back to available_from-available_to
+#     (website/opening_hours.py)
+#   * no overlap with an active booking widened by space.buffer_minutes
+#     (website/booking_index.py)
+#
+# All of it runs against in-memory state. Checking a slot costs the same
+# single indexed query as the plain overlap check did, and only when the
+# booking index misses that space-day; otherwise none. The buffer is
+# applied to the requested slot rather than to every stored booking,
+# which is the same test: the slot, widened by the buffer on both sides,
+# must not touch any booking.
+import datetime
+
+from website import availability, booking_index, closures, opening_hours
+
+
+def buffered(start_time, end_time, buffer_minutes):
+    """start_time-end_time widened by `buffer_minutes`, kept within the day."""
+    if not buffer_minutes:
+        return start_time, end_time
+    day = datetime.date.min
+    delta = datetime.timedelta(minutes=buffer_minutes)
+    start = datetime.datetime.combine(day, start_time) - delta
+    end = datetime.datetime.combine(day, end_time) + delta
+    return (
+        start.time() if start.date() == day else datetime.time.min,
+        end.time() if end.date() == day else datetime.time.max,
+    )
+
+
+def calendar_violation(space, booking_date, start_time, end_time, now=None):
+    """Why the slot is off limits whatever else is booked, or None."""
+    not_before = availability.earliest_start(space, now)
+    if datetime.datetime.combine(booking_date, start_time) < not_before:
+        if space.advance_notice:
+            return (
+                f"This space must be booked at least {space.advance_notice} "
+                f"hours in advance."
+            )
+        return "That time has already passed. Please choose a later time."
+
+    closure = closures.closure_during(space.pk, booking_date, start_time, end_time)
+    if closure:
+        return f"The space is closed at that time ({closure[2]}). Please choose another date."
+
+    if not opening_hours.is_open(space, booking_date, start_time, end_time):
+        return "The space is closed at that time. Please check its opening hours."
+
+    return None
+
+
+def violation(space, booking_date, start_time, end_time, now=None):
+    """Why `space` can't be booked for the slot, or None if it can."""
+    problem = calendar_violation(space, booking_date, start_time, end_time, now)
+    if problem:
+        return problem
+
+    if booking_index.has_conflict(space.pk, booking_date, start_time, end_time):
+        return "This time slot is already booked. Please choose another time."
+    # Same index entry as above, so no second load
+    if space.buffer_minutes and booking_index.has_conflict(
+        space.pk, booking_date, *buffered(start_time, end_time, space.buffer_minutes)
+    ):
+        return (
+            f"Bookings in this space need {space.buffer_minutes} minutes "
+            f"between them. Please choose another time."
+        )
+    return None
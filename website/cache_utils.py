@@ -0,0 +1,105 @@
+# website/cache_utils.py
+#
+# Two-level cache for small, rarely changing lookups (nav branches and
+# the like): a process-local copy in front of Django's cache, keyed by a
+# version number that lives in the cache itself. Invalidating bumps the
+# version, so every worker sharing the cache backend moves to a fresh
+# key on its next version check.
+#
+# With the default LocMemCache each process has its own version, so
+# changes made in another worker show up once SHARED_TIMEOUT expires.
+import threading
+import time
+
+from django.core.cache import cache
+
+
+# How often a process re-reads the shared version number
+VERSION_CHECK_SECONDS = 5
+
+# Lifetime of a cached value in the shared cache
+SHARED_TIMEOUT = 300
+
+_missing = object()
+
+
+def _version_key(namespace):
+    return f"spacebook:{namespace}:version"
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Start from the clock so a lost key never reuses an old version
+        cache.add(_version_key(namespace), int(time.time() * 1000), None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+def bump_version(namespace):
+    try:
+        return cache.incr(_version_key(namespace))
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(_version_key(namespace), version, None)
+        return version
+
+
+def cached_count(namespace, key, queryset, timeout=SHARED_TIMEOUT):
+    """queryset.count(), cached until bump_version(namespace)."""
+    cache_key = f"spacebook:{namespace}:{get_version(namespace)}:{key}"
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, timeout)
+    return count
+
+
+class VersionedCache:
+    """Process-local value backed by the shared cache under a versioned key."""
+
+    def __init__(self, namespace, loader, timeout=SHARED_TIMEOUT):
+        self.namespace = namespace
+        self.loader = loader
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._value = _missing
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    def get(self):
+        now = time.monotonic()
+
+        with self._lock:
+            if self._value is not _missing:
+                fresh = now - self._loaded_at < self.timeout
+                if fresh and now - self._checked_at < VERSION_CHECK_SECONDS:
+                    return self._value
+
+        version = get_version(self.namespace)
+
+        with self._lock:
+            fresh = now - self._loaded_at < self.timeout
+            if self._value is not _missing and fresh and version == self._version:
+                self._checked_at = now
+                return self._value
+
+        key = f"spacebook:{self.namespace}:{version}"
+        value = cache.get(key, _missing)
+        if value is _missing:
+            value = self.loader()
+            cache.set(key, value, self.timeout)
+
+        with self._lock:
+            self._value = value
+            self._version = version
+            self._loaded_at = now
+            self._checked_at = now
+
+        return value
+
+    def invalidate(self):
+        bump_version(self.namespace)
+        with self._lock:
+            self._value = _missing
@@ -0,0 +1,199 @@
+# website/closures.py
+#
+# Closure calendar: is a space closed at some moment?
+#
+# CLOSURES caches a ClosureCalendar: the closures of every scope (branch,
+# campus, library, space) as sorted, merged datetime intervals, and each
+# space's chain of scopes. Checking a slot is one bisect per scope, four
+# at most, and never a query. Closures that ended more than HISTORY_DAYS
+# ago are left out. Saving or deleting a closure, space, library or
+# campus invalidates it (see website/signals.py).
+#
+# website/opening_hours.py subtracts closures from a space's open
+# intervals, so free slots, the day grid and nearest-library search all
+# honour them. Times here are naive local datetimes, like a booking's
+# booking_date + start_time.
+#
+# send_notices() is the batch job behind `manage.py send_closure_notices`:
+# it queues a notice (website/outbox.py) for each active booking that a
+# new closure overlaps; the outbox sends each user one digest.
+import bisect
+import datetime
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from website import outbox
+from website.cache_utils import VersionedCache
+from website.models import Booking, Campus, Closure, Library, LibrarySpace
+
+
+HISTORY_DAYS = 7
+
+DAY_MINUTES = 24 * 60
+
+
+def _local(value):
+    return timezone.localtime(value).replace(tzinfo=None)
+
+
+class ClosureCalendar:
+    def __init__(self, closures, chains):
+        """`closures` are (kind, key, starts_at, ends_at, reason); `chains`
+        maps space_id to its scopes, from the space up to its branch."""
+        by_scope = {}
+        for kind, key, starts_at, ends_at, reason in sorted(closures, key=lambda c: c[2]):
+            by_scope.setdefault((kind, key), []).append((starts_at, ends_at, reason))
+
+        # Merged per scope, so intervals are disjoint and their ends sorted
+        self.scopes = {}
+        for scope, rows in by_scope.items():
+            merged = []
+            for starts_at, ends_at, reason in rows:
+                if merged and starts_at <= merged[-1][1]:
+                    if ends_at > merged[-1][1]:
+                        merged[-1] = (merged[-1][0], ends_at, merged[-1][2])
+                else:
+                    merged.append((starts_at, ends_at, reason))
+            self.scopes[scope] = ([ends_at for _, ends_at, _ in merged], merged)
+        self.chains = chains
+
+    def __bool__(self):
+        return bool(self.scopes)
+
+    def overlapping(self, space_id, start, end):
+        """(starts_at, ends_at, reason) of closures of the space, or of
+        anything it belongs to, that overlap start-end."""
+        found = []
+        for scope in self.chains.get(space_id, (("space", space_id),)):
+            entry = self.scopes.get(scope)
+            if entry is None:
+                continue
+            ends, intervals = entry
+            i = bisect.bisect_right(ends, start)
+            while i < len(intervals) and intervals[i][0] < end:
+                found.append(intervals[i])
+                i += 1
+        return found
+
+
+def _load_closures():
+    since = timezone.now() - datetime.timedelta(days=HISTORY_DAYS)
+    rows = Closure.objects.filter(ends_at__gte=since).order_by().values_list(
+        "space_id", "library_id", "campus_id", "branch_id", "starts_at", "ends_at", "reason"
+    )
+    closures = []
+    for *keys, starts_at, ends_at, reason in rows:
+        kind, key = next((k, v) for k, v in zip(Closure.SCOPES, keys) if v is not None)
+        closures.append((kind, key, _local(starts_at), _local(ends_at), reason))
+
+    if not closures:
+        # The usual case; no need to know who belongs to whom
+        return ClosureCalendar([], {})
+
+    branch_of_campus = dict(Campus.objects.order_by().values_list("campus_code", "branch_id"))
+    library_chains = {}
+    for code, campus in Library.objects.order_by().values_list("library_code", "campus_code"):
+        chain = [("library", code)]
+        if campus:
+            chain.append(("campus", campus))
+            if branch_of_campus.get(campus):
+                chain.append(("branch", branch_of_campus[campus]))
+        library_chains[code] = tuple(chain)
+
+    chains = {
+        space_id: (("space", space_id),) + library_chains.get(library_id, ())
+        for space_id, library_id in LibrarySpace.objects.order_by().values_list("space_id", "library_id")
+    }
+    return ClosureCalendar(closures, chains)
+
+
+CLOSURES = VersionedCache("closures", _load_closures)
+
+
+def closure_during(space_id, day, start_time, end_time):
+    """First closure overlapping a slot, as (starts_at, ends_at, reason), or None."""
+    calendar = CLOSURES.get()
+    if not calendar:
+        return None
+    found = calendar.overlapping(
+        space_id,
+        datetime.datetime.combine(day, start_time),
+        datetime.datetime.combine(day, end_time),
+    )
+    return found[0] if found else None
+
+
+def closed_minutes(space_id, day):
+    """(start_minute, end_minute) parts of `day` when the space is closed."""
+    calendar = CLOSURES.get()
+    if not calendar:
+        return ()
+    midnight = datetime.datetime.combine(day, datetime.time())
+    found = calendar.overlapping(space_id, midnight, midnight + datetime.timedelta(days=1))
+    return tuple(
+        (
+            max(0, int((starts_at - midnight).total_seconds()) // 60),
+            min(DAY_MINUTES, -(-int((ends_at - midnight).total_seconds()) // 60)),
+        )
+        for starts_at, ends_at, _ in found
+    )
+
+
+def affected_bookings(closure):
+    """Active bookings that `closure` overlaps, in date order."""
+    start, end = _local(closure.starts_at), _local(closure.ends_at)
+    kind, key = closure.scope
+    in_scope = {
+        "space": Q(space_id=key),
+        "library": Q(space__library_id=key),
+        "campus": Q(space__library__campus_code=key),
+        "branch": Q(space__library__campus_code__in=Campus.objects.filter(
+            branch_id=key
+        ).values("campus_code")),
+    }[kind]
+
+    bookings = (
+        Booking.objects.filter(in_scope, booking_date__range=(start.date(), end.date()))
+        .exclude(status__in=Booking.INACTIVE_STATUSES)
+        .select_related("space__library")
+        .order_by("booking_date", "start_time")
+    )
+    # The date range is coarse at either end
+    return [
+        booking for booking in bookings
+        if datetime.datetime.combine(booking.booking_date, booking.start_time) < end
+        and datetime.datetime.combine(booking.booking_date, booking.end_time) > start
+    ]
+
+
+def notice_summary(closure, booking):
+    """Outbox line for a booking that `closure` overlaps."""
+    return (
+        f"{booking.space.space_name}, {booking.space.library.library_name}: "
+        f"{booking.booking_date:%d %b %Y} {booking.start_time:%H:%M}-{booking.end_time:%H:%M} "
+        f"({closure.reason})"
+    )
+
+
+def send_notices():
+    """Queue notices for everyone whose booking a not-yet-announced
+    closure overlaps.
+
+    Returns (closures announced, notices queued).
+    """
+    pending = list(
+        Closure.objects.filter(notices_sent_at__isnull=True).order_by("starts_at")
+    )
+    queued = 0
+    for closure in pending:
+        with transaction.atomic(using="main"):
+            queued += len(outbox.enqueue(
+                "closure",
+                affected_bookings(closure),
+                summary=lambda booking: notice_summary(closure, booking),
+            ))
+            # update(), not save(): the calendar itself hasn't changed
+            Closure.objects.filter(pk=closure.pk).update(notices_sent_at=timezone.now())
+    return len(pending), queued
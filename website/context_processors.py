@@ -1,26 +1,57 @@
 # website/context_processors.py
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from accounts.pipeline import PICTURE_SESSION_KEY, picture_cache_key, remember_picture
+from .cache_utils import VersionedCache
 from .models import Branch
 from social_django.models import UserSocialAuth
 
 
+_missing = object()
+
+
+def _stored_picture(user):
+    try:
+        social = user.social_auth.get(provider="google-oauth2")
+        # This is where Google usually stores the avatar URL
+        return social.extra_data.get("picture")
+    except UserSocialAuth.DoesNotExist:
+        return None
+    except Exception:
+        return None
+
+
 def google_profile_picture(request):
     picture = None
     user = request.user
 
     if user.is_authenticated:
-        try:
-            social = user.social_auth.get(provider="google-oauth2")
-            # This is where Google usually stores the avatar URL
-            picture = social.extra_data.get("picture")
-        except UserSocialAuth.DoesNotExist:
-            picture = None
-        except Exception:
-            picture = None
+        # Per-user cache, then the session (both filled at login by
+        # accounts.pipeline.save_profile_picture), then the database
+        cache_key = picture_cache_key(user.pk)
+        picture = cache.get(cache_key, _missing)
+
+        if picture is _missing:
+            if PICTURE_SESSION_KEY in request.session:
+                picture = request.session[PICTURE_SESSION_KEY]
+            else:
+                picture = _stored_picture(user)
+                request.session[PICTURE_SESSION_KEY] = picture
+            remember_picture(user.pk, picture)
 
     return {"google_picture": picture}
 
 
-def nav_branches(request):
+def _load_nav_branches():
     # Order by name so it looks nice in the dropdown
-    branches = Branch.objects.all().order_by("name")
-    return {"nav_branches": branches}
+    return list(Branch.objects.all().order_by("name"))
+
+
+# Invalidated by the Branch signals in website/signals.py
+NAV_BRANCHES = VersionedCache("nav_branches", _load_nav_branches)
+
+
+def nav_branches(request):
+    # Lazy, so pages that don't render the nav never touch the cache
+    return {"nav_branches": SimpleLazyObject(NAV_BRANCHES.get)}
@@ -0,0 +1,229 @@
+# website/exports.py
+#
+# Streaming booking report exports. Rows are read with
+# .values_list().iterator() and written out chunk by chunk, so memory
+# stays flat no matter how many bookings the date range covers.
+#
+# XLSX is written by hand (inline strings, no styles) straight into a
+# streaming zip, since openpyxl isn't a dependency and would buffer the
+# whole workbook anyway.
+import csv
+import zipfile
+from xml.sax.saxutils import escape
+
+from website.models import Booking
+from website.reports import usage_by_space
+
+
+CHUNK_SIZE = 2000
+
+BOOKING_COLUMNS = [
+    ("id", "Booking ID"),
+    ("booking_date", "Date"),
+    ("start_time", "Start"),
+    ("end_time", "End"),
+    ("space_id", "Space ID"),
+    ("space__space_name", "Space"),
+    ("space__library__library_code", "Library Code"),
+    ("space__library__library_name", "Library"),
+    ("user_id", "User ID"),
+    ("status", "Status"),
+    ("payment_status", "Payment Status"),
+    ("transaction_ref", "FPX Ref"),
+    ("paid_at", "Paid At"),
+    ("created_at", "Created At"),
+]
+
+USAGE_COLUMNS = [
+    ("space_id", "Space ID"),
+    ("space__space_name", "Space"),
+    ("space__library__library_name", "Library"),
+    ("total", "Total Bookings"),
+    ("approved", "Approved"),
+    ("pending", "Pending"),
+    ("cancelled", "Cancelled"),
+    ("rejected", "Rejected"),
+    ("paid", "Paid"),
+    ("unpaid", "Unpaid"),
+    ("booked_minutes", "Booked Minutes"),
+]
+
+
+def booking_rows(start_date=None, end_date=None, using="main"):
+    qs = Booking.objects.using(using)
+    if start_date:
+        qs = qs.filter(booking_date__gte=start_date)
+    if end_date:
+        qs = qs.filter(booking_date__lte=end_date)
+
+    return (
+        qs.order_by("booking_date", "start_time", "id")
+        .values_list(*[name for name, _ in BOOKING_COLUMNS])
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def usage_rows(start_date=None, end_date=None, using="main"):
+    for row in usage_by_space(start_date, end_date, using=using):
+        yield tuple(row[name] for name, _ in USAGE_COLUMNS)
+
+
+# -----------------------------
+# CSV
+# -----------------------------
+class _Echo:
+    """File-like object whose write() hands the line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([label for _, label in columns]).encode("utf-8-sig")
+
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(["" if v is None else v for v in row]))
+        if len(chunk) >= CHUNK_SIZE:
+            yield "".join(chunk).encode("utf-8")
+            chunk = []
+
+    if chunk:
+        yield "".join(chunk).encode("utf-8")
+
+
+# -----------------------------
+# XLSX
+# -----------------------------
+class _Sink:
+    """Write-only, unseekable buffer that zipfile streams into."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell(ref, value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    return f'<c r="{ref}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def _sheet_rows(columns, rows):
+    letters = [_column_letter(i) for i in range(len(columns))]
+
+    def row_xml(number, values):
+        cells = "".join(
+            _cell(f"{letter}{number}", value) for letter, value in zip(letters, values)
+        )
+        return f'<row r="{number}">{cells}</row>'
+
+    yield row_xml(1, [label for _, label in columns])
+    for number, row in enumerate(rows, start=2):
+        yield row_xml(number, row)
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    "{sheets}"
+    "</Types>"
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+
+
+def stream_xlsx(sheets):
+    """Stream a workbook; `sheets` is a list of (title, columns, rows)."""
+    sink = _Sink()
+    count = len(sheets)
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(
+            "[Content_Types].xml",
+            _CONTENT_TYPES.format(
+                sheets="".join(
+                    f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                    for i in range(1, count + 1)
+                )
+            ),
+        )
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr(
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(
+                f'<sheet name="{escape(title)}" sheetId="{i}" r:id="rId{i}"/>'
+                for i, (title, _, _) in enumerate(sheets, start=1)
+            )
+            + "</sheets></workbook>",
+        )
+        zf.writestr(
+            "xl/_rels/workbook.xml.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{i}" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{i}.xml"/>'
+                for i in range(1, count + 1)
+            )
+            + "</Relationships>",
+        )
+        yield sink.drain()
+
+        for i, (_, columns, rows) in enumerate(sheets, start=1):
+            with zf.open(f"xl/worksheets/sheet{i}.xml", "w", force_zip64=True) as part:
+                part.write(
+                    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    b"<sheetData>"
+                )
+                chunk = []
+                for row in _sheet_rows(columns, rows):
+                    chunk.append(row)
+                    if len(chunk) >= CHUNK_SIZE:
+                        part.write("".join(chunk).encode("utf-8"))
+                        chunk = []
+                        yield sink.drain()
+                part.write("".join(chunk).encode("utf-8"))
+                part.write(b"</sheetData></worksheet>")
+            yield sink.drain()
+
+    yield sink.drain()
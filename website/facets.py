@@ -0,0 +1,182 @@
+# website/facets.py
+#
+# Filtering and sidebar counts for space_list.
+#
+# Facets: campus, space type, noise level, access policy, capacity band
+# and the amenity checkboxes. Amenities are matched through a single
+# predicate on LibrarySpace.amenity_mask:
+#
+#     amenity_mask & wanted = wanted
+#
+# SPACE_FACETS caches one grouped query: the number of spaces for each
+# distinct (library, campus, type, noise, access, capacity band,
+# amenity_mask). That is a few hundred cells even for thousands of
+# spaces, so every count in the sidebar comes from one pass in memory
+# instead of a COUNT per option. Saving or deleting a space or library
+# invalidates it (see website/signals.py).
+#
+# Counts are "what you'd get if you picked this": for a select, all
+# other filters apply but not the select's own value; for an amenity,
+# every current filter applies plus that amenity.
+from django.db.models import Count, F
+
+from website.cache_utils import VersionedCache
+from website.models import LibrarySpace
+
+
+# space_list query parameter -> LibrarySpace field
+AMENITY_PARAMS = {
+    "projector": "has_projector",
+    "whiteboard": "has_whiteboard",
+    "wifi": "has_wifi",
+    "power": "has_power_plug",
+    "network": "has_network_node",
+    "accessible": "wheelchair_accessible",
+}
+
+# (key, label, min, max) -- max None means no upper bound
+CAPACITY_BANDS = [
+    ("1-4", "1-4 people", 1, 4),
+    ("5-10", "5-10 people", 5, 10),
+    ("11-20", "11-20 people", 11, 20),
+    ("21+", "21+ people", 21, None),
+]
+
+# Positions in each SPACE_FACETS cell, ahead of (amenity_mask, spaces)
+COLUMNS = ("library", "campus", "type", "noise", "access", "capacity")
+
+# Columns with counts in the sidebar (the library select has none)
+FACETS = COLUMNS[1:]
+
+# Choices shown for each facet select, as (value, label)
+FACET_CHOICES = {
+    "type": LibrarySpace.SPACE_TYPES,
+    "noise": LibrarySpace.NOISE_LEVELS,
+    "access": LibrarySpace.ACCESS_POLICIES,
+    "capacity": [(key, label) for key, label, _, _ in CAPACITY_BANDS],
+}
+
+
+def capacity_band(capacity):
+    for key, _, low, high in CAPACITY_BANDS:
+        if capacity >= low and (high is None or capacity <= high):
+            return key
+    return None
+
+
+def mask_from_params(params):
+    """Amenity mask for the checkboxes ticked in a QueryDict."""
+    return sum(
+        LibrarySpace.AMENITY_BITS[field]
+        for param, field in AMENITY_PARAMS.items()
+        if params.get(param)
+    )
+
+
+def filters_from_params(params):
+    """{column: selected value or None, ..., "mask": amenity mask}."""
+    filters = {name: params.get(name) or None for name in COLUMNS}
+    if filters["capacity"] not in {key for key, _, _, _ in CAPACITY_BANDS}:
+        filters["capacity"] = None
+    filters["mask"] = mask_from_params(params)
+    return filters
+
+
+def filter_amenities(queryset, mask):
+    if not mask:
+        return queryset
+    return queryset.alias(
+        _amenities=F("amenity_mask").bitand(mask)
+    ).filter(_amenities=mask)
+
+
+def apply_filters(queryset, filters):
+    if filters["library"]:
+        queryset = queryset.filter(library_id=filters["library"])
+    if filters["campus"]:
+        queryset = queryset.filter(library__campus_code=filters["campus"])
+    if filters["type"]:
+        queryset = queryset.filter(space_type=filters["type"])
+    if filters["noise"]:
+        queryset = queryset.filter(noise_level=filters["noise"])
+    if filters["access"]:
+        queryset = queryset.filter(access_policy=filters["access"])
+    if filters["capacity"]:
+        _, _, low, high = next(b for b in CAPACITY_BANDS if b[0] == filters["capacity"])
+        queryset = queryset.filter(capacity__gte=low)
+        if high is not None:
+            queryset = queryset.filter(capacity__lte=high)
+    return filter_amenities(queryset, filters["mask"])
+
+
+def _load_space_facets():
+    cells = {}
+    rows = (
+        LibrarySpace.objects.order_by()
+        .values_list(
+            "library_id",
+            "library__campus_code",
+            "space_type",
+            "noise_level",
+            "access_policy",
+            "capacity",
+            "amenity_mask",
+        )
+        .annotate(spaces=Count("pk"))
+    )
+    for library, campus, space_type, noise, access, capacity, mask, spaces in rows:
+        key = (library, campus, space_type, noise, access, capacity_band(capacity), mask)
+        cells[key] = cells.get(key, 0) + spaces
+    return [(*key, spaces) for key, spaces in cells.items()]
+
+
+SPACE_FACETS = VersionedCache("space_facets", _load_space_facets)
+
+
+def facet_counts(filters):
+    """Sidebar counts for `filters` (see filters_from_params).
+
+    Returns {"total": n, "amenities": {param: n}, facet: {value: n}, ...}.
+    """
+    wanted = [(i, filters[name]) for i, name in enumerate(COLUMNS) if filters[name]]
+    mask = filters["mask"]
+    bits = [
+        (param, LibrarySpace.AMENITY_BITS[field])
+        for param, field in AMENITY_PARAMS.items()
+    ]
+
+    counts = {name: {} for name in FACETS}
+    counts["amenities"] = dict.fromkeys(AMENITY_PARAMS, 0)
+    counts["total"] = 0
+
+    for cell in SPACE_FACETS.get():
+        space_mask, spaces = cell[-2], cell[-1]
+
+        missed = [i for i, value in wanted if cell[i] != value]
+        if space_mask & mask != mask:
+            missed.append(None)
+
+        if not missed:
+            counts["total"] += spaces
+            for i, name in enumerate(FACETS, start=1):
+                counts[name][cell[i]] = counts[name].get(cell[i], 0) + spaces
+            for param, bit in bits:
+                if space_mask & bit:
+                    counts["amenities"][param] += spaces
+        elif len(missed) == 1 and missed[0] is not None and COLUMNS[missed[0]] in FACETS:
+            # Off only in this facet: counts towards its other options
+            i = missed[0]
+            counts[COLUMNS[i]][cell[i]] = counts[COLUMNS[i]].get(cell[i], 0) + spaces
+
+    return counts
+
+
+def facet_options(counts, filters):
+    """{facet: [(value, label, count, selected), ...]} for the selects."""
+    return {
+        name: [
+            (value, label, counts[name].get(value, 0), value == filters[name])
+            for value, label in choices
+        ]
+        for name, choices in FACET_CHOICES.items()
+    }
@@ -1,6 +1,8 @@
+import datetime
+
 from django import forms
-from django.db.models import Q
-from website.models import Booking
+from website.models import Booking, BookingSeries
+from website import booking_rules, recurrence
 
 
 class BookingForm(forms.ModelForm):
@@ -54,21 +56,100 @@ class BookingForm(forms.ModelForm):
             )
             return cleaned_data
 
-        # conflict detection
+        # advance notice, closures, opening hours and buffered overlap,
+        # all in memory (see website/booking_rules.py)
         if self.space and booking_date and start_time and end_time:
-            conflicts = Booking.objects.filter(
-                space=self.space,
-                booking_date=booking_date,
-            ).exclude(
-                status__in=["CANCELLED", "REJECTED"]
-            ).filter(
-                Q(start_time__lt=end_time) &
-                Q(end_time__gt=start_time)
+            problem = booking_rules.violation(
+                self.space, booking_date, start_time, end_time
             )
+            if problem:
+                raise forms.ValidationError(problem)
+
+        return cleaned_data
+
+
+class BookingSeriesForm(forms.ModelForm):
+
+    weekdays = forms.TypedMultipleChoiceField(
+        choices=[
+            (0, "Mon"), (1, "Tue"), (2, "Wed"), (3, "Thu"),
+            (4, "Fri"), (5, "Sat"), (6, "Sun"),
+        ],
+        coerce=int,
+        required=False,
+        widget=forms.CheckboxSelectMultiple,
+        help_text="Weekly series only; defaults to the first date's weekday.",
+    )
+    skip_dates = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={"class": "form-control", "rows": 2}),
+        help_text="Dates to leave out (YYYY-MM-DD), separated by commas or new lines.",
+    )
+
+    class Meta:
+        model = BookingSeries
+        fields = [
+            "frequency",
+            "interval",
+            "starts_on",
+            "until",
+            "start_time",
+            "end_time",
+        ]
+
+        widgets = {
+            "frequency": forms.Select(attrs={"class": "form-select"}),
+            "interval": forms.NumberInput(attrs={"class": "form-control", "min": 1}),
+            "starts_on": forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+            "until": forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+            "start_time": forms.TimeInput(attrs={"class": "form-control", "type": "time"}),
+            "end_time": forms.TimeInput(attrs={"class": "form-control", "type": "time"}),
+        }
+
+    def clean_skip_dates(self):
+        raw = self.cleaned_data.get("skip_dates", "")
+        try:
+            return sorted({
+                datetime.date.fromisoformat(part.strip())
+                for part in raw.replace("\n", ",").split(",")
+                if part.strip()
+            })
+        except ValueError:
+            raise forms.ValidationError("Use YYYY-MM-DD for the dates to leave out.")
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        start_time = cleaned_data.get("start_time")
+        end_time = cleaned_data.get("end_time")
+        if start_time and end_time and end_time <= start_time:
+            self.add_error("end_time", "End time must be later than start time.")
+            return cleaned_data
 
-            if conflicts.exists():
-                raise forms.ValidationError(
-                    "This time slot is already booked. Please choose another time."
-                )
+        starts_on = cleaned_data.get("starts_on")
+        until = cleaned_data.get("until")
+        frequency = cleaned_data.get("frequency")
+        interval = cleaned_data.get("interval")
+        if None in (starts_on, until, frequency, interval):
+            return cleaned_data
+        if until < starts_on:
+            self.add_error("until", "The series must end on or after its first date.")
+            return cleaned_data
+
+        try:
+            cleaned_data["dates"] = recurrence.expand(
+                starts_on,
+                until,
+                frequency,
+                interval,
+                cleaned_data.get("weekdays"),
+                cleaned_data.get("skip_dates", []),
+            )
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+        if not cleaned_data["dates"]:
+            raise forms.ValidationError("The series has no dates.")
 
+        self.instance.weekdays = ",".join(map(str, cleaned_data.get("weekdays") or []))
+        self.instance.exceptions = [d.isoformat() for d in cleaned_data.get("skip_dates", [])]
         return cleaned_data
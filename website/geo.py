@@ -0,0 +1,271 @@
+# website/geo.py
+#
+# Nearest-library search over Library.latitude/longitude.
+#
+# LIBRARY_LOCATIONS caches a LocationGrid: every located library bucketed
+# into equal-angle cells of CELL_DEGREES. A nearest-first search walks
+# rings of cells outward from the query point and yields a library once
+# no unvisited cell could hold anything closer, so asking for k libraries
+# only touches the cells around the point. Saving or deleting a library
+# invalidates it (see website/signals.py).
+#
+# Distances are great-circle (haversine) kilometres. Each grid keeps the
+# coordinates as columns with their sines and cosines precomputed, and
+# scores a whole ring of candidates in one pass over those columns.
+import heapq
+import math
+from array import array
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from website import booking_rules
+from website.cache_utils import VersionedCache
+from website.models import Booking, Library, LibrarySpace
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+# ~11 km at the equator; Malaysian campuses are a few cells apart
+CELL_DEGREES = 0.1
+
+DEFAULT_K = 5
+MAX_K = 50
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points, in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class LocationGrid:
+    def __init__(self, rows, cell_degrees=CELL_DEGREES):
+        """`rows` are (key, latitude, longitude)."""
+        self.cell = cell_degrees
+        self.keys = []
+        self.lats = array("d")
+        self.lngs = array("d")
+        self.cells = {}
+
+        for key, lat, lng in rows:
+            if lat is None or lng is None:
+                continue
+            self.cells.setdefault(self._cell_of(lat, lng), []).append(len(self.keys))
+            self.keys.append(key)
+            self.lats.append(lat)
+            self.lngs.append(lng)
+
+        # Columns for haversine: phi, cos(phi) and lambda, in radians
+        self._phi = array("d", map(math.radians, self.lats))
+        self._cos_phi = array("d", map(math.cos, self._phi))
+        self._lam = array("d", map(math.radians, self.lngs))
+
+        # A degree of longitude is shortest at the highest latitude
+        self._max_abs_lat = max(map(abs, self.lats), default=0.0)
+        rows, cols = zip(*self.cells) if self.cells else ((0,), (0,))
+        self._extent = (min(rows), max(rows), min(cols), max(cols))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _cell_of(self, lat, lng):
+        return math.floor(lat / self.cell), math.floor(lng / self.cell)
+
+    def distances(self, lat, lng, positions):
+        """Haversine km from (lat, lng) to each of `positions`."""
+        phi = math.radians(lat)
+        lam = math.radians(lng)
+        cos_phi = math.cos(phi)
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+        P, C, L = self._phi, self._cos_phi, self._lam
+        return [
+            2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(
+                sin((P[i] - phi) / 2) ** 2
+                + cos_phi * C[i] * sin((L[i] - lam) / 2) ** 2
+            )))
+            for i in positions
+        ]
+
+    @staticmethod
+    def _ring(center, r):
+        ci, cj = center
+        if r == 0:
+            return [center]
+        ring = []
+        for d in range(-r, r + 1):
+            ring += [(ci - r, cj + d), (ci + r, cj + d)]
+        for d in range(-r + 1, r):
+            ring += [(ci + d, cj - r), (ci + d, cj + r)]
+        return ring
+
+    def _ring_bound_km(self, lat, r):
+        """Least distance to any point outside rings 0..r."""
+        # Along a meridian a degree is exact. Across, use the narrowest
+        # degree of longitude, times 2/pi for the great circle shortcut
+        # between two points on one parallel.
+        top = min(90.0, max(abs(lat), self._max_abs_lat) + self.cell)
+        km_per_degree = math.pi * EARTH_RADIUS_KM / 180
+        across = km_per_degree * math.cos(math.radians(top)) * 2 / math.pi
+        return r * self.cell * min(km_per_degree, across)
+
+    def nearest(self, lat, lng, max_km=None):
+        """Yield (distance_km, key) for located libraries, nearest first."""
+        if not self.keys:
+            return
+        center = self._cell_of(lat, lng)
+        ci, cj = center
+        min_i, max_i, min_j, max_j = self._extent
+        last_ring = max(ci - min_i, max_i - ci, cj - min_j, max_j - cj, 0)
+
+        heap = []
+        by_ring = None
+        scanned = 0
+        for r in range(last_ring + 1):
+            scanned += 8 * r
+            if by_ring is None and scanned > len(self.cells):
+                # Walking empty cells now costs more than the grid has
+                # occupied ones: bucket those by ring once instead
+                by_ring = {}
+                for cell in self.cells:
+                    ring = max(abs(cell[0] - ci), abs(cell[1] - cj))
+                    if ring >= r:
+                        by_ring.setdefault(ring, []).append(cell)
+                if not (min_i <= ci <= max_i and min_j <= cj <= max_j):
+                    # Far outside the grid the ring bound is too loose to
+                    # help; score everything left in one pass
+                    by_ring = {r: [cell for ring in by_ring.values() for cell in ring]}
+                    last_ring = r
+            ring = by_ring.get(r, ()) if by_ring is not None else self._ring(center, r)
+
+            positions = [p for cell in ring for p in self.cells.get(cell, ())]
+            if positions:
+                heap += zip(self.distances(lat, lng, positions), positions)
+                heapq.heapify(heap)
+
+            bound = self._ring_bound_km(lat, r) if r < last_ring else math.inf
+            while heap and heap[0][0] <= bound:
+                distance, p = heapq.heappop(heap)
+                if max_km is not None and distance > max_km:
+                    return
+                yield distance, self.keys[p]
+            if max_km is not None and bound > max_km and not heap:
+                return
+
+    def brute_force(self, lat, lng, k):
+        """k nearest by scoring every library; for tests and benchmarks."""
+        distances = self.distances(lat, lng, range(len(self.keys)))
+        best = heapq.nsmallest(k, zip(distances, range(len(self.keys))))
+        return [(distance, self.keys[p]) for distance, p in best]
+
+
+def _load_library_locations():
+    rows = Library.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).order_by().values_list("library_code", "latitude", "longitude")
+    return LocationGrid(rows)
+
+
+LIBRARY_LOCATIONS = VersionedCache("library_locations", _load_library_locations)
+
+
+def free_spaces(library_codes, day=None, start_time=None, end_time=None, capacity=None):
+    """{library_code: [space, ...]} of active spaces in `library_codes`
+    seating `capacity` and, given a time range, bookable for it on `day`
+    by the same rules as booking_create (website/booking_rules.py)."""
+    spaces = LibrarySpace.objects.filter(library_id__in=library_codes, is_active=True)
+    if capacity:
+        spaces = spaces.filter(capacity__gte=capacity)
+    if start_time and end_time:
+        clashes = Booking.objects.filter(
+            space=OuterRef("pk"),
+            booking_date=day,
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+        ).exclude(status__in=Booking.INACTIVE_STATUSES)
+        spaces = spaces.exclude(Exists(clashes))
+
+    spaces = list(
+        spaces.only(
+            "space_id", "library_id", "space_name", "capacity",
+            "available_from", "available_to", "buffer_minutes", "advance_notice",
+        ).order_by("capacity", "space_name")
+    )
+    if start_time and end_time:
+        # Advance notice, closures and opening hours vary by date and by
+        # the clock, so they are checked here against the cached tables
+        now = timezone.now()
+        spaces = [
+            space for space in spaces
+            if not booking_rules.calendar_violation(space, day, start_time, end_time, now)
+        ]
+        spaces = _clear_of_buffers(spaces, day, start_time, end_time)
+
+    found = {}
+    for space in spaces:
+        found.setdefault(space.library_id, []).append(space)
+    return found
+
+
+def _clear_of_buffers(spaces, day, start_time, end_time):
+    """`spaces` without those booked within their buffer_minutes of the
+    slot. The SQL in free_spaces() only rules out plain overlaps; this is
+    one more query, and only when some space has a buffer."""
+    windows = {
+        space.pk: booking_rules.buffered(start_time, end_time, space.buffer_minutes)
+        for space in spaces
+        if space.buffer_minutes
+    }
+    if not windows:
+        return spaces
+
+    nearby = Booking.objects.filter(
+        space_id__in=windows,
+        booking_date=day,
+        start_time__lt=max(end for _, end in windows.values()),
+        end_time__gt=min(start for start, _ in windows.values()),
+    ).exclude(status__in=Booking.INACTIVE_STATUSES).order_by().values_list(
+        "space_id", "start_time", "end_time"
+    )
+    taken = {
+        space_id for space_id, start, end in nearby
+        if start < windows[space_id][1] and end > windows[space_id][0]
+    }
+    return [space for space in spaces if space.pk not in taken]
+
+
+def nearest_libraries(lat, lng, k=DEFAULT_K, max_km=None, availability=None):
+    """[(distance_km, library, spaces), ...] for the k nearest libraries.
+
+    `availability` is None or (day, start_time, end_time, capacity); then
+    only libraries with a free matching space count, and `spaces` lists
+    them. Candidates are checked a batch at a time, one query per batch.
+    """
+    candidates = LIBRARY_LOCATIONS.get().nearest(lat, lng, max_km)
+    batch_size = k if availability is None else max(2 * k, 10)
+
+    found = []
+    while len(found) < k:
+        batch = [candidate for _, candidate in zip(range(batch_size), candidates)]
+        if not batch:
+            break
+        codes = [code for _, code in batch]
+
+        spaces = {}
+        if availability is not None:
+            spaces = free_spaces(codes, *availability)
+            batch = [(d, code) for d, code in batch if code in spaces]
+
+        libraries = Library.objects.only(
+            "library_code", "library_name", "latitude", "longitude"
+        ).in_bulk([code for _, code in batch])
+        found += [
+            (distance, libraries[code], spaces.get(code, []))
+            for distance, code in batch
+            if code in libraries
+        ]
+    return found[:k]
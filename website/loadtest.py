@@ -0,0 +1,367 @@
+# website/loadtest.py
+#
+# Synthetic booking-rush traffic for capacity planning. Each virtual user
+# runs on its own thread and picks a scenario per request from a weighted
+# mix:
+#
+#   browse        GET space_list / library_list
+#   availability  GET space_availability_api for a week
+#   book          POST booking_create for a random one-hour slot
+#   cancel        GET cancel_booking on one of the user's own bookings
+#   approve       GET approve_booking on a pending booking (staff)
+#
+# Requests go either through Django's test client in this process
+# (ClientTarget) or over HTTP to a running server (LiveTarget). SQLite
+# write-lock wait comes from the spacebook_db_lock_wait_seconds_total
+# metric in both cases.
+#
+# Driven by: python manage.py loadtest
+import datetime
+import math
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from spacebook_project import metrics
+from website.models import Booking, Branch, Library, LibrarySpace
+
+
+SCENARIOS = ("browse", "availability", "book", "cancel", "approve")
+
+DEFAULT_MIX = {"browse": 50, "availability": 30, "book": 12, "cancel": 4, "approve": 4}
+
+# Scenarios that write to the main database
+WRITES = {"book", "cancel", "approve"}
+
+
+def parse_mix(text):
+    """'browse=50,book=10' -> {"browse": 50, "book": 10}."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not mix or not any(mix.values()):
+        raise ValueError("The traffic mix needs at least one scenario with a weight")
+    return mix
+
+
+class ClientTarget:
+    """Requests through Django's test client, in this process."""
+
+    def __init__(self, user):
+        self.client = Client()
+        self.client.force_login(user)
+
+    def get(self, path, params=None):
+        response = self.client.get(path, params or {})
+        return response.status_code
+
+    def post(self, path, data):
+        response = self.client.post(path, data)
+        return response.status_code
+
+    def close(self):
+        connections.close_all()
+
+
+class LiveTarget:
+    """Requests over HTTP to a running server sharing this settings module."""
+
+    def __init__(self, base_url, user):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+        # Log in the way the test client does: a real session row plus cookie
+        client = Client()
+        client.force_login(user)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.session.cookies.set(settings.SESSION_COOKIE_NAME, cookie)
+
+    def get(self, path, params=None):
+        response = self.session.get(
+            self.base_url + path, params=params, allow_redirects=False, timeout=30
+        )
+        return response.status_code
+
+    def post(self, path, data):
+        url = self.base_url + path
+        token = self.session.cookies.get(settings.CSRF_COOKIE_NAME)
+        if not token:
+            self.session.get(url, timeout=30)
+            token = self.session.cookies.get(settings.CSRF_COOKIE_NAME)
+        response = self.session.post(
+            url,
+            data={**data, "csrfmiddlewaretoken": token},
+            headers={"Referer": url},
+            allow_redirects=False,
+            timeout=30,
+        )
+        return response.status_code
+
+    def close(self):
+        self.session.close()
+
+
+def lock_wait_seconds(base_url=None):
+    """Total SQLite lock wait so far: this process's, or the live server's."""
+    if base_url is None:
+        return sum(entry[4] for entry in metrics.store.to_dict()["queries"])
+
+    body = requests.get(base_url.rstrip("/") + reverse("metrics"), timeout=30).text
+    return sum(
+        float(line.rsplit(" ", 1)[1])
+        for line in body.splitlines()
+        if line.startswith("spacebook_db_lock_wait_seconds_total{")
+    )
+
+
+class Pools:
+    """Ids the scenarios draw from, shared by all virtual users."""
+
+    def __init__(self, students, first_day, days):
+        self.lock = threading.Lock()
+        self.first_day = first_day
+        self.days = days
+        self.branch_codes = list(Branch.objects.values_list("code", flat=True))
+        self.library_codes = list(Library.objects.values_list("library_code", flat=True))
+        self.space_ids = list(
+            LibrarySpace.objects.filter(is_active=True).values_list("space_id", flat=True)
+        )
+
+        active = Booking.objects.exclude(status__in=Booking.INACTIVE_STATUSES)
+        self.own = defaultdict(list)
+        for booking_id, user_id in active.filter(
+            user_id__in=[s.pk for s in students]
+        ).values_list("id", "user_id"):
+            self.own[user_id].append(booking_id)
+        self.pending = list(
+            active.filter(status="PENDING").order_by("-id").values_list("id", flat=True)
+        )
+
+        if not self.space_ids:
+            raise ValueError("No active spaces to send traffic to")
+
+    def take_own(self, user_id):
+        with self.lock:
+            return self.own[user_id].pop() if self.own[user_id] else None
+
+    def take_pending(self):
+        with self.lock:
+            return self.pending.pop() if self.pending else None
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(list)   # scenario -> seconds
+        self.outcomes = defaultdict(lambda: defaultdict(int))   # scenario -> outcome -> n
+
+    def record(self, scenario, seconds, outcome):
+        with self.lock:
+            if outcome != "skipped":
+                self.latency[scenario].append(seconds)
+            self.outcomes[scenario][outcome] += 1
+
+
+def _classify(scenario, status):
+    if scenario == "book" and status == 200:
+        # The form re-renders when the slot is taken
+        return "conflict"
+    if scenario in ("cancel", "approve") and status == 404:
+        # Someone else changed the booking first
+        return "conflict"
+    return "error" if status >= 400 else "ok"
+
+
+class VirtualUser:
+    def __init__(self, student, staff, user_id, pools, mix, rng):
+        self.student = student
+        self.staff = staff
+        self.user_id = user_id
+        self.pools = pools
+        self.scenarios = list(mix)
+        self.weights = [mix[name] for name in self.scenarios]
+        self.rng = rng
+
+    def day(self):
+        offset = self.rng.randrange(self.pools.days)
+        return self.pools.first_day + datetime.timedelta(days=offset)
+
+    def pick(self):
+        return self.rng.choices(self.scenarios, self.weights)[0]
+
+    def send(self, scenario):
+        """Run one request; returns its status, or None if skipped."""
+        return getattr(self, scenario)()
+
+    def browse(self):
+        pools = self.pools
+        if self.rng.random() < 0.5 and pools.library_codes:
+            library = self.rng.choice(pools.library_codes)
+            return self.student.get(reverse("space_list"), {"library": library})
+        params = {"branch": self.rng.choice(pools.branch_codes)} if pools.branch_codes else {}
+        return self.student.get(reverse("library_list"), params)
+
+    def availability(self):
+        start = self.day()
+        space_id = self.rng.choice(self.pools.space_ids)
+        return self.student.get(
+            reverse("space_availability_api", kwargs={"space_id": space_id}),
+            {"start": start, "end": start + datetime.timedelta(days=6)},
+        )
+
+    def book(self):
+        hour = self.rng.randrange(8, 21)
+        space_id = self.rng.choice(self.pools.space_ids)
+        return self.student.post(
+            reverse("booking_create", kwargs={"space_id": space_id}),
+            {
+                "booking_date": self.day().isoformat(),
+                "start_time": f"{hour:02}:00",
+                "end_time": f"{hour + 1:02}:00",
+            },
+        )
+
+    def cancel(self):
+        booking_id = self.pools.take_own(self.user_id)
+        if booking_id is None:
+            return None
+        return self.student.get(reverse("cancel_booking", kwargs={"booking_id": booking_id}))
+
+    def approve(self):
+        booking_id = self.pools.take_pending()
+        if booking_id is None:
+            return None
+        return self.staff.get(reverse("approve_booking", kwargs={"booking_id": booking_id}))
+
+
+def run(make_target, students, staff_user, pools, mix, concurrency,
+        duration=None, total=None, seed=None):
+    """Drive `concurrency` virtual users until `duration` seconds pass or
+    `total` requests are sent. Returns (Stats, elapsed seconds)."""
+    if not duration and not total:
+        raise ValueError("Give a duration or a request count")
+
+    stats = Stats()
+    counter = iter(range(total)) if total else None
+    counter_lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+
+    def more():
+        if deadline and time.monotonic() >= deadline:
+            return False
+        if counter is not None:
+            with counter_lock:
+                return next(counter, None) is not None
+        return True
+
+    def worker(index):
+        student_user = students[index % len(students)]
+        student = make_target(student_user)
+        staff = make_target(staff_user)
+        rng = random.Random(None if seed is None else seed + index)
+        user = VirtualUser(student, staff, student_user.pk, pools, mix, rng)
+        try:
+            while more():
+                scenario = user.pick()
+                started = time.perf_counter()
+                try:
+                    status = user.send(scenario)
+                except requests.RequestException:
+                    # Live server refused or timed out
+                    status = 599
+                elapsed = time.perf_counter() - started
+                if status is None:
+                    stats.record(scenario, elapsed, "skipped")
+                else:
+                    stats.record(scenario, elapsed, _classify(scenario, status))
+        finally:
+            student.close()
+            staff.close()
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, args=(i,), name=f"loadtest-{i}")
+        for i in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return stats, time.perf_counter() - started
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(stats, elapsed, lock_wait):
+    """Capacity report as a dict (JSON-friendly)."""
+    scenarios = {}
+    all_latency = []
+    totals = defaultdict(int)
+
+    for scenario in sorted(stats.outcomes):
+        latency = stats.latency[scenario]
+        outcomes = dict(stats.outcomes[scenario])
+        sent = sum(n for outcome, n in outcomes.items() if outcome != "skipped")
+        all_latency.extend(latency)
+        for outcome, n in outcomes.items():
+            totals[outcome] += n
+        if scenario in WRITES:
+            totals["writes"] += sent
+
+        scenarios[scenario] = {
+            "requests": sent,
+            "skipped": outcomes.get("skipped", 0),
+            "errors": outcomes.get("error", 0),
+            "conflicts": outcomes.get("conflict", 0),
+            "p50_ms": round(_percentile(latency, 50) * 1000, 2),
+            "p95_ms": round(_percentile(latency, 95) * 1000, 2),
+            "p99_ms": round(_percentile(latency, 99) * 1000, 2),
+        }
+
+    sent = len(all_latency)
+    booking = scenarios.get("book", {})
+    return {
+        "requests": sent,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(sent / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(all_latency, 50) * 1000, 2),
+        "p95_ms": round(_percentile(all_latency, 95) * 1000, 2),
+        "p99_ms": round(_percentile(all_latency, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(all_latency) * 1000, 2) if all_latency else 0.0,
+        "error_rate": round(totals["error"] / sent, 4) if sent else 0.0,
+        "conflict_rate": (
+            round(booking["conflicts"] / booking["requests"], 4)
+            if booking.get("requests") else 0.0
+        ),
+        "lock_wait_seconds": round(lock_wait, 4),
+        "lock_wait_ms_per_write": (
+            round(lock_wait / totals["writes"] * 1000, 2) if totals["writes"] else 0.0
+        ),
+        "scenarios": scenarios,
+    }
+
+
+def workers_needed(report, server_workers, target_rps):
+    """Workers for `target_rps`, scaling linearly from the measured run."""
+    per_worker = report["throughput_rps"] / server_workers
+    if not per_worker:
+        return None
+    return math.ceil(target_rps / per_worker)
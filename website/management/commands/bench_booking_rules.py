@@ -0,0 +1,174 @@
+import datetime
+import json
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from website import booking_index, booking_rules, closures, opening_hours
+from website.models import Booking, Library, LibrarySpace
+from website.reservations import reserve
+
+
+FIRST_DAY = datetime.date(2030, 1, 7)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark booking checks: the plain overlap test against the full "
+        "rule set (advance notice, closures, opening hours, buffered "
+        "overlap), counting database round trips for each. Seeds throwaway "
+        "test databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--spaces", type=int, default=200)
+        parser.add_argument("--days", type=int, default=14)
+        parser.add_argument("--checks", type=int, default=5000)
+        parser.add_argument("--output", help="Also write the results as JSON")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default", "main"}
+        )
+        try:
+            spaces = self.seed(options["spaces"], options["days"])
+            results = self.run(spaces, options["days"], options["checks"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        reserve_selects = results.pop("reserve")
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<18} cold {r['cold_queries_per_check']:>5.2f} queries/check   "
+                f"warm {r['warm_queries_per_check']:>5.2f} queries/check   "
+                f"p50 {r['p50_us']:>7.1f} us"
+            )
+        self.stdout.write(
+            "reserve()          SELECTs without buffer {without}, with buffer {with_}".format(
+                without=reserve_selects["without_buffer"], with_=reserve_selects["with_buffer"]
+            )
+        )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({**results, "reserve": reserve_selects}, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def seed(self, count, days):
+        started = time.perf_counter()
+        library = Library.objects.create(library_code="PTAR", library_name="Perpustakaan Tun Abdul Razak")
+        LibrarySpace.objects.bulk_create(
+            [
+                LibrarySpace(
+                    library=library,
+                    space_name=f"Room {i}",
+                    capacity=6,
+                    available_from=datetime.time(8),
+                    available_to=datetime.time(22),
+                    buffer_minutes=15,
+                    advance_notice=24,
+                )
+                for i in range(count)
+            ],
+            batch_size=2000,
+        )
+        spaces = list(LibrarySpace.objects.all())
+        user = User.objects.create(username="bench")
+        # Every other hour booked, 08:00-20:00
+        Booking.objects.bulk_create(
+            [
+                Booking(
+                    user=user,
+                    space=space,
+                    booking_date=FIRST_DAY + datetime.timedelta(days=day),
+                    start_time=datetime.time(hour),
+                    end_time=datetime.time(hour + 1),
+                    status="APPROVED",
+                )
+                for space in spaces
+                for day in range(days)
+                for hour in range(8, 20, 2)
+            ],
+            batch_size=5000,
+        )
+        self.stdout.write(
+            f"Seeded {count} spaces with {Booking.objects.count()} bookings "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return spaces
+
+    def run(self, spaces, days, checks):
+        rng = random.Random(0)
+        slots = []
+        for _ in range(checks):
+            start = rng.randrange(8 * 60, 21 * 60, 15)
+            slots.append((
+                rng.choice(spaces),
+                FIRST_DAY + datetime.timedelta(days=rng.randrange(days)),
+                datetime.time(start // 60, start % 60),
+                datetime.time((start + 60) // 60, (start + 60) % 60),
+            ))
+
+        # Loaded once per process, not per check
+        with CaptureQueriesContext(connections["main"]) as loads:
+            opening_hours.OPENING_HOURS.get()
+            closures.CLOSURES.get()
+        self.stdout.write(f"Opening hours and closures loaded in {len(loads)} queries")
+
+        approaches = {
+            "overlap only": lambda s, d, a, b: booking_index.has_conflict(s.pk, d, a, b),
+            "all rules": booking_rules.violation,
+        }
+        results = {}
+        for name, check in approaches.items():
+            booking_index.invalidate()
+            phases = {}
+            timings = []
+            for phase in ("cold", "warm"):
+                with CaptureQueriesContext(connections["main"]) as queries:
+                    for slot in slots:
+                        t = time.perf_counter()
+                        check(*slot)
+                        timings.append((time.perf_counter() - t) * 1e6)
+                phases[phase] = len(queries) / len(slots)
+            results[name] = {
+                "cold_queries_per_check": round(phases["cold"], 3),
+                "warm_queries_per_check": round(phases["warm"], 3),
+                "p50_us": round(statistics.median(timings[len(slots):]), 2),
+            }
+
+        if results["all rules"]["cold_queries_per_check"] > results["overlap only"]["cold_queries_per_check"]:
+            raise CommandError("The full rule set made extra round trips")
+
+        results["reserve"] = self.reserve_round_trips(spaces[0])
+        return results
+
+    def reserve_round_trips(self, space):
+        """SELECTs per reserve(), with and without a buffer to honour."""
+        counts = {}
+        user = User.objects.get(username="bench")
+        for label, buffer in (("without_buffer", 0), ("with_buffer", 15)):
+            LibrarySpace.objects.filter(pk=space.pk).update(buffer_minutes=buffer)
+            booking = Booking(
+                user=user,
+                space=space,
+                booking_date=FIRST_DAY + datetime.timedelta(days=400 + buffer),
+                start_time=datetime.time(9),
+                end_time=datetime.time(10),
+            )
+            with CaptureQueriesContext(connections["main"]) as queries:
+                reserve(booking)
+            counts[label] = sum(q["sql"].startswith("SELECT") for q in queries)
+        return counts
@@ -0,0 +1,150 @@
+import datetime
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from website import geo
+from website.models import Library, LibrarySpace
+
+
+def orm_nearest(lat, lng, k):
+    """Haversine in SQL (ORDER BY distance LIMIT k): every row, every query."""
+    distance = 2 * geo.EARTH_RADIUS_KM * ASin(Sqrt(
+        Power(Sin((Radians(F("latitude")) - Radians(lat)) / 2), 2)
+        + Cos(Radians(lat)) * Cos(Radians(F("latitude")))
+        * Power(Sin((Radians(F("longitude")) - Radians(lng)) / 2), 2)
+    ))
+    rows = (
+        Library.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        .annotate(distance=distance)
+        .order_by("distance")
+        .values_list("distance", "library_code")[:k]
+    )
+    return list(rows)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark k-nearest library lookups: haversine in SQL, a brute-force "
+        "scan in Python and the grid index, plus the availability-filtered "
+        "search. Seeds throwaway test databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--libraries", type=int, default=10_000)
+        parser.add_argument("--spaces-per-library", type=int, default=3)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--k", type=int, default=geo.DEFAULT_K)
+        parser.add_argument("--output", help="Also write the results as JSON")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default", "main"}
+        )
+        try:
+            self.seed(options["libraries"], options["spaces_per_library"])
+            results = self.run(options["queries"], options["k"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<22} p50 {r['p50_ms']:>8.2f} ms   p95 {r['p95_ms']:>8.2f} ms"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def seed(self, count, spaces_per_library):
+        started = time.perf_counter()
+        rng = random.Random(0)
+        # Peninsular and East Malaysia
+        Library.objects.bulk_create(
+            [
+                Library(
+                    library_code=f"L{i:05}",
+                    library_name=f"Library {i:05}",
+                    latitude=rng.uniform(1.2, 6.7),
+                    longitude=rng.uniform(100.1, 104.3) if i % 3 else rng.uniform(109.6, 119.3),
+                )
+                for i in range(count)
+            ],
+            batch_size=2000,
+        )
+        LibrarySpace.objects.bulk_create(
+            [
+                LibrarySpace(
+                    library_id=f"L{i // spaces_per_library:05}",
+                    space_name=f"Room {i}",
+                    capacity=2 + i % 8,
+                    available_from=datetime.time(8),
+                    available_to=datetime.time(22),
+                )
+                for i in range(count * spaces_per_library)
+            ],
+            batch_size=2000,
+        )
+        self.stdout.write(f"Seeded {count} libraries in {time.perf_counter() - started:.1f}s")
+
+    def run(self, queries, k):
+        rng = random.Random(1)
+        points = [(rng.uniform(1.2, 6.7), rng.uniform(100.1, 104.3)) for _ in range(queries)]
+
+        started = time.perf_counter()
+        grid = geo.LIBRARY_LOCATIONS.get()
+        self.stdout.write(
+            f"Built the grid over {len(grid)} libraries in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+        def first_k(lat, lng):
+            found = []
+            for hit in grid.nearest(lat, lng):
+                found.append(hit)
+                if len(found) == k:
+                    return found
+            return found
+
+        availability = (datetime.date(2030, 1, 7), datetime.time(9), datetime.time(10), 4)
+        approaches = {
+            "sql haversine": lambda lat, lng: orm_nearest(lat, lng, k),
+            "python brute force": lambda lat, lng: grid.brute_force(lat, lng, k),
+            "grid": first_k,
+            "grid + availability": lambda lat, lng: geo.nearest_libraries(lat, lng, k, availability=availability),
+        }
+
+        results = {}
+        expected = None
+        for name, find in approaches.items():
+            timings, answers = [], []
+            for lat, lng in points:
+                t = time.perf_counter()
+                answers.append(find(lat, lng))
+                timings.append((time.perf_counter() - t) * 1000)
+
+            if name != "grid + availability":
+                codes = [[code for _, code in answer] for answer in answers]
+                if expected is None:
+                    expected = codes
+                elif codes != expected:
+                    raise CommandError(f"{name} disagrees with sql haversine")
+
+            timings.sort()
+            results[name] = {
+                "p50_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+            }
+        return results
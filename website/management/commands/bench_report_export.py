@@ -0,0 +1,113 @@
+import datetime
+import time
+
+import psutil
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from website import exports, rollup
+from website.models import Booking, Library, LibrarySpace
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the streaming booking report export: rows per second and "
+        "peak RSS. Seeds throwaway test databases with synthetic bookings; "
+        "the real ones are never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+        parser.add_argument("--seed", type=int, default=100000, help="Bookings to insert")
+        parser.add_argument("--spaces", type=int, default=50)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default", "main"}
+        )
+        try:
+            self.seed(options["seed"], options["spaces"])
+            self.run(options["format"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def seed(self, count, space_count):
+        started = time.perf_counter()
+        user_id = User.objects.create(username="bench").pk
+
+        library = Library.objects.create(library_code="BENCH", library_name="Benchmark Library")
+        spaces = [
+            LibrarySpace.objects.create(
+                library=library,
+                space_name=f"Bench Room {i}",
+                capacity=8,
+                available_from=datetime.time(8),
+                available_to=datetime.time(22),
+            )
+            for i in range(space_count)
+        ]
+
+        first_day = datetime.date(2030, 1, 1)
+        statuses = ["APPROVED", "APPROVED", "PENDING", "CANCELLED", "REJECTED"]
+        batch = []
+        for i in range(count):
+            hour = 8 + i % 13
+            batch.append(
+                Booking(
+                    user_id=user_id,
+                    space=spaces[i % space_count],
+                    booking_date=first_day + datetime.timedelta(days=(i // 500) % 365),
+                    start_time=datetime.time(hour),
+                    end_time=datetime.time(hour + 1),
+                    status=statuses[i % len(statuses)],
+                    payment_status="PAID" if i % 3 == 0 else "UNPAID",
+                )
+            )
+            if len(batch) == 5000:
+                Booking.objects.bulk_create(batch)
+                batch = []
+        Booking.objects.bulk_create(batch)
+        rollup.rebuild()
+
+        self.stdout.write(
+            f"Seeded {count} bookings in {time.perf_counter() - started:.1f}s"
+        )
+
+    def run(self, export_format):
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        peak = rss_before
+
+        bookings = ("Bookings", exports.BOOKING_COLUMNS, exports.booking_rows())
+        usage = ("Usage by Space", exports.USAGE_COLUMNS, exports.usage_rows())
+        if export_format == "xlsx":
+            stream = exports.stream_xlsx([bookings, usage])
+        else:
+            stream = exports.stream_csv(bookings[1], bookings[2])
+
+        rows = Booking.objects.using("main").count()
+        size = 0
+        started = time.perf_counter()
+        for i, chunk in enumerate(stream):
+            size += len(chunk)
+            if i % 10 == 0:
+                peak = max(peak, process.memory_info().rss)
+        elapsed = time.perf_counter() - started
+        peak = max(peak, process.memory_info().rss)
+
+        self.stdout.write(f"Format:        {export_format}")
+        self.stdout.write(f"Rows:          {rows}")
+        self.stdout.write(f"Output:        {size / 1024 / 1024:.1f} MiB")
+        self.stdout.write(f"Elapsed:       {elapsed:.2f}s")
+        self.stdout.write(f"Rows/second:   {rows / elapsed if elapsed else 0:,.0f}")
+        self.stdout.write(f"RSS before:    {rss_before / 1024 / 1024:.1f} MiB")
+        self.stdout.write(f"Peak RSS:      {peak / 1024 / 1024:.1f} MiB")
+        self.stdout.write(f"RSS growth:    {(peak - rss_before) / 1024 / 1024:.1f} MiB")
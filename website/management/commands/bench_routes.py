@@ -0,0 +1,101 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from website import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every named route in website/urls.py against a seeded copy "
+        "of both databases, check each against its query budget, and write "
+        "query counts and p50/p95 latency to a JSON baseline. Runs on "
+        "throwaway test databases; the real ones are never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(benchmarks.SCALES), default="full")
+        parser.add_argument("--bookings", type=int, help="Override the booking count")
+        parser.add_argument("--repeat", type=int, default=20, help="Requests per route")
+        parser.add_argument("--output", default="route_baseline.json")
+        parser.add_argument(
+            "--compare",
+            help="Earlier baseline; fail if a route's p95 grew more than --tolerance",
+        )
+        parser.add_argument("--tolerance", type=float, default=0.25)
+
+    def handle(self, *args, **options):
+        scale = dict(benchmarks.SCALES[options["scale"]])
+        if options["bookings"] is not None:
+            scale["bookings"] = options["bookings"]
+
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default", "main"}
+        )
+        try:
+            started = time.perf_counter()
+            data = benchmarks.seed(**scale)
+            self.stdout.write(
+                f"Seeded {scale} in {time.perf_counter() - started:.1f}s"
+            )
+            results = benchmarks.sweep(self.clients(data), data, repeat=options["repeat"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.report(results)
+
+        with open(options["output"], "w") as f:
+            json.dump({"scale": scale, "routes": results}, f, indent=2, sort_keys=True)
+        self.stdout.write(f"Baseline written to {options['output']}")
+
+        failures = [
+            f"{name}: {r['queries']} queries (budget {r['budget']})"
+            for name, r in results.items()
+            if r["queries"] > r["budget"]
+        ]
+        if options["compare"]:
+            failures += self.compare(results, options["compare"], options["tolerance"])
+        if failures:
+            raise CommandError("Route regressions:\n  " + "\n  ".join(failures))
+
+    def clients(self, data):
+        student, staff = Client(), Client()
+        student.force_login(data.student)
+        staff.force_login(data.staff)
+        return {None: Client(), "student": student, "staff": staff}
+
+    def report(self, results):
+        self.stdout.write(f"{'route':<26}{'status':>7}{'queries':>9}{'budget':>8}{'p50 ms':>9}{'p95 ms':>9}")
+        for name, r in results.items():
+            line = (
+                f"{name:<26}{r['status']:>7}{r['queries']:>9}{r['budget']:>8}"
+                f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+            )
+            if r["queries"] > r["budget"]:
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+    def compare(self, results, path, tolerance):
+        with open(path) as f:
+            baseline = json.load(f)["routes"]
+
+        failures = []
+        for name, r in results.items():
+            old = baseline.get(name)
+            if not old:
+                continue
+            if r["queries"] > old["queries"]:
+                failures.append(f"{name}: {old['queries']} -> {r['queries']} queries")
+            if r["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+                failures.append(f"{name}: p95 {old['p95_ms']} -> {r['p95_ms']} ms")
+        return failures
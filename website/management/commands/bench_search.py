@@ -0,0 +1,204 @@
+import datetime
+import json
+import random
+import statistics
+import time
+from functools import reduce
+from operator import and_, or_
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from website import search
+from website.models import Library, LibrarySpace
+
+
+# Vocabulary of the synthetic descriptions, Malay and English mixed
+WORDS = (
+    "bilik perbincangan discussion room quiet senyap study belajar projector "
+    "whiteboard papan makmal komputer lab media seminar mesyuarat meeting "
+    "kuliah lecture tingkat aras floor level wifi power plug kerusi meja "
+    "table chair group kumpulan individu individual pelajar student staf "
+    "staff tempahan booking awal early lewat late kunci key kaunter counter"
+).split()
+
+# Long tail of other words, so that (as in real descriptions) most words
+# are rare and the domain words above are common
+FILLER = [
+    a + b + c
+    for a in ("ka", "se", "ti", "pu", "ra", "me", "lo", "du", "ba", "ni")
+    for b in ("ran", "lih", "tu", "nga", "kas", "mpu", "ser", "dang", "ol", "wi")
+    for c in ("", "an", "kan", "nya", "ing", "er", "s", "i")
+]
+
+QUERIES = [
+    "bilik",
+    "discussion room",
+    "perpus",
+    "quiet study",
+    "makmal komputer",
+    "projector whiteboard",
+    "seminar",
+    "tingkat 3",
+    "kaunter kunci",
+    "shah alam",
+]
+
+ICONTAINS_FIELDS = {
+    "library": ("library_name", "short_name", "address", "city", "state", "notes"),
+    "space": ("space_name", "description", "booking_notes", "room_number", "floor"),
+}
+
+
+def icontains_search(query, limit):
+    """What a LIKE-based search of the same fields looks like: every word
+    must appear in at least one field."""
+    words = search.tokenize(query)
+    results = []
+    for kind, model in (("library", Library), ("space", LibrarySpace)):
+        condition = reduce(and_, (
+            reduce(or_, (Q(**{f"{field}__icontains": word}) for field in ICONTAINS_FIELDS[kind]))
+            for word in words
+        ))
+        results += list(model.objects.filter(condition).values_list("pk", flat=True)[:limit])
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare search backends on synthetic libraries and spaces: LIKE "
+        "(icontains) against the FTS5 index and the pure-Python inverted "
+        "index. Seeds throwaway test databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000, help="Spaces to seed")
+        parser.add_argument("--libraries", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--limit", type=int, default=search.DEFAULT_LIMIT)
+        parser.add_argument("--output", help="Also write the results as JSON")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default", "main"}
+        )
+        try:
+            self.seed(options["rows"], options["libraries"])
+            results = self.run(options["repeat"], options["limit"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.print_results(results)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def seed(self, rows, library_count):
+        started = time.perf_counter()
+        rng = random.Random(0)
+
+        def text(words):
+            # About a third domain words, the rest from the filler tail
+            return " ".join(
+                rng.choice(WORDS) if rng.random() < 0.3
+                else FILLER[min(int(rng.paretovariate(1.1)) - 1, len(FILLER) - 1)]
+                for _ in range(words)
+            )
+
+        cities = ["Shah Alam", "Arau", "Machang", "Jasin", "Dungun", "Kota Samarahan"]
+
+        Library.objects.bulk_create(
+            [
+                Library(
+                    library_code=f"L{i:04}",
+                    library_name=f"Perpustakaan {rng.choice(WORDS).title()} {i:04}",
+                    city=cities[i % len(cities)],
+                    notes=text(12),
+                )
+                for i in range(library_count)
+            ],
+            batch_size=2000,
+        )
+
+        space_types = [code for code, _ in LibrarySpace.SPACE_TYPES]
+        batch = []
+        for i in range(rows):
+            batch.append(
+                LibrarySpace(
+                    library_id=f"L{i % library_count:04}",
+                    space_name=f"{rng.choice(['Bilik', 'Room', 'Makmal'])} {rng.choice(WORDS).title()} {i}",
+                    description=text(20),
+                    booking_notes=text(6),
+                    floor=f"Tingkat {i % 5}",
+                    space_type=space_types[i % len(space_types)],
+                    capacity=2 + i % 12,
+                    available_from=datetime.time(8),
+                    available_to=datetime.time(22),
+                )
+            )
+            if len(batch) == 2000:
+                LibrarySpace.objects.bulk_create(batch)
+                batch = []
+        LibrarySpace.objects.bulk_create(batch)
+
+        seeded = time.perf_counter()
+        documents = search.rebuild()
+        indexed = time.perf_counter()
+        search.INDEX.load()
+        loaded = time.perf_counter()
+
+        self.stdout.write(
+            f"Seeded {library_count} libraries and {rows} spaces in {seeded - started:.1f}s; "
+            f"indexed {documents} documents in {indexed - seeded:.1f}s; "
+            f"built the Python index in {loaded - indexed:.1f}s"
+        )
+
+    def run(self, repeat, limit):
+        backends = {
+            "icontains": lambda q: icontains_search(q, limit),
+            "fts5": lambda q: search.search(q, ["library", "space"], limit, backend="fts"),
+            "python": lambda q: search.search(q, ["library", "space"], limit, backend="python"),
+        }
+        results = []
+        for query in QUERIES:
+            row = {"query": query}
+            for name, run in backends.items():
+                hits = run(query)
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    run(query)
+                    timings.append((time.perf_counter() - started) * 1000)
+                row[name] = {
+                    "hits": len(hits),
+                    "p50_ms": round(statistics.median(timings), 2),
+                    "max_ms": round(max(timings), 2),
+                }
+            results.append(row)
+        return results
+
+    def print_results(self, results):
+        w = self.stdout.write
+        w("")
+        w(f"{'query':<22}" + "".join(f"{name:>22}" for name in ("icontains", "fts5", "python")))
+        w(f"{'':<22}" + f"{'hits   p50 ms':>22}" * 3)
+        for row in results:
+            w(
+                f"{row['query']:<22}"
+                + "".join(
+                    f"{row[name]['hits']:>12}{row[name]['p50_ms']:>10.1f}"
+                    for name in ("icontains", "fts5", "python")
+                )
+            )
+        for name in ("icontains", "fts5", "python"):
+            total = sum(row[name]["p50_ms"] for row in results)
+            w(f"Total p50 {name}: {total:.1f} ms")
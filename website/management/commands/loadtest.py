@@ -0,0 +1,169 @@
+import datetime
+import json
+import logging
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from website import benchmarks, loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of browse, availability, booking, cancel and approve "
+        "traffic with N concurrent virtual users and report throughput, tail "
+        "latency, error and conflict rates and SQLite lock wait. Without "
+        "--url it seeds throwaway test databases and uses the Django test "
+        "client in this process; with --url it drives a running server "
+        "(which must share this settings module) using existing users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+        parser.add_argument("--requests", type=int, help="Stop after this many requests instead")
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{k}={v}" for k, v in loadtest.DEFAULT_MIX.items()),
+            help="Scenario weights, e.g. browse=50,availability=30,book=12,cancel=4,approve=4",
+        )
+        parser.add_argument("--days", type=int, default=14, help="Days ahead to book into")
+        parser.add_argument(
+            "--scale", choices=sorted(benchmarks.SCALES), default="test",
+            help="Dataset to seed for in-process runs",
+        )
+        parser.add_argument("--seed", type=int, help="Random seed for a repeatable run")
+        parser.add_argument("--server-workers", type=int, default=1,
+                            help="Worker processes behind --url, for the sizing estimate")
+        parser.add_argument("--target-rps", type=float,
+                            help="Expected peak requests/second to size workers for")
+        parser.add_argument("--output", help="Also write the report as JSON")
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options["mix"])
+        except ValueError as e:
+            raise CommandError(e)
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        duration = None if options["requests"] else options["duration"]
+        first_day = timezone.localdate() + datetime.timedelta(days=1)
+
+        if options["url"]:
+            report = self.run_live(options, mix, duration, first_day)
+        else:
+            report = self.run_in_process(options, mix, duration, first_day)
+
+        if options["target_rps"]:
+            report["target_rps"] = options["target_rps"]
+            report["server_workers"] = options["server_workers"]
+            report["workers_needed"] = loadtest.workers_needed(
+                report, options["server_workers"], options["target_rps"]
+            )
+
+        self.print_report(report)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def run_live(self, options, mix, duration, first_day):
+        url = options["url"]
+        students = list(
+            User.objects.filter(is_active=True, is_staff=False)
+            .order_by("pk")[: options["concurrency"]]
+        )
+        staff = User.objects.filter(is_active=True, is_staff=True).order_by("pk").first()
+        if not students or not staff:
+            raise CommandError("Live runs need at least one active student and one staff user")
+
+        pools = loadtest.Pools(students, first_day, options["days"])
+        lock_before = loadtest.lock_wait_seconds(url)
+        stats, elapsed = loadtest.run(
+            lambda user: loadtest.LiveTarget(url, user),
+            students, staff, pools, mix, options["concurrency"],
+            duration=duration, total=options["requests"], seed=options["seed"],
+        )
+        lock_wait = loadtest.lock_wait_seconds(url) - lock_before
+        report = loadtest.summarize(stats, elapsed, lock_wait)
+        report["mode"] = f"live {url}"
+        return report
+
+    def run_in_process(self, options, mix, duration, first_day):
+        scale = benchmarks.SCALES[options["scale"]]
+
+        # Stale cancel/approve targets 404 by design; keep them out of the output
+        request_logger = logging.getLogger("django.request")
+        log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default", "main"}
+        )
+        try:
+            started = time.perf_counter()
+            data = benchmarks.seed(**scale, first_day=first_day)
+            self.stdout.write(f"Seeded {scale} in {time.perf_counter() - started:.1f}s")
+
+            students = list(
+                User.objects.filter(is_staff=False).order_by("pk")[: options["concurrency"]]
+            )
+            pools = loadtest.Pools(students, first_day, options["days"])
+            lock_before = loadtest.lock_wait_seconds()
+            stats, elapsed = loadtest.run(
+                loadtest.ClientTarget,
+                students, data.staff, pools, mix, options["concurrency"],
+                duration=duration, total=options["requests"], seed=options["seed"],
+            )
+            lock_wait = loadtest.lock_wait_seconds() - lock_before
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            request_logger.setLevel(log_level)
+
+        report = loadtest.summarize(stats, elapsed, lock_wait)
+        report["mode"] = "in-process test client"
+        return report
+
+    def print_report(self, report):
+        w = self.stdout.write
+        w(f"Mode:              {report['mode']}")
+        w(f"Requests:          {report['requests']} in {report['elapsed_seconds']}s")
+        w(f"Throughput:        {report['throughput_rps']} req/s")
+        w(f"Latency p50/p95/p99: {report['p50_ms']} / {report['p95_ms']} / {report['p99_ms']} ms")
+        w(f"Error rate:        {report['error_rate']:.2%}")
+        w(f"Conflict rate:     {report['conflict_rate']:.2%} of booking attempts")
+        w(
+            f"SQLite lock wait:  {report['lock_wait_seconds']}s total, "
+            f"{report['lock_wait_ms_per_write']} ms per write"
+        )
+        w("")
+        w(f"{'scenario':<14}{'requests':>9}{'errors':>8}{'conflicts':>10}{'skipped':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for name, s in report["scenarios"].items():
+            w(
+                f"{name:<14}{s['requests']:>9}{s['errors']:>8}{s['conflicts']:>10}{s['skipped']:>9}"
+                f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}"
+            )
+
+        if "workers_needed" in report:
+            w("")
+            if report["workers_needed"] is None:
+                w("No throughput measured; cannot size workers.")
+            else:
+                w(
+                    f"Workers for {report['target_rps']} req/s: {report['workers_needed']} "
+                    f"(measured {report['throughput_rps']} req/s on "
+                    f"{report['server_workers']} worker(s), assuming linear scaling)"
+                )
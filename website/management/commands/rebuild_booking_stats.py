@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from website import rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the BookingDailyStat rollup from every booking."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="main")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = rollup.rebuild(
+            using=options["database"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily stat rows."))
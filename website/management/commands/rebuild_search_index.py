@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from website import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search documents of every branch, library and space."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="main")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        documents = search.rebuild(
+            using=options["database"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Indexed {documents} documents."))
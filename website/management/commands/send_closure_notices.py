@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from website import closures
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue notices to the holders of bookings that newly added closures "
+        "overlap. `send_outbox` delivers them."
+    )
+
+    def handle(self, *args, **options):
+        announced, queued = closures.send_notices()
+        self.stdout.write(self.style.SUCCESS(
+            f"Announced {announced} closures in {queued} notices."
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from website import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued notification emails as per-user digests. Runs as a "
+        "worker until interrupted; --once drains the due emails and exits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument(
+            "--interval", type=float, default=5,
+            help="Seconds to sleep when nothing is due",
+        )
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        totals = {"rows": 0, "emails": 0, "failed": 0}
+        try:
+            while True:
+                stats = outbox.deliver(batch_size=options["batch_size"])
+                for key, value in stats.items():
+                    totals[key] += value
+                if stats["rows"]:
+                    self.stdout.write(
+                        f"{stats['rows']} notifications in {stats['emails']} emails, "
+                        f"{stats['failed']} failed"
+                    )
+                    # A full batch means more are probably due
+                    if stats["rows"] == options["batch_size"]:
+                        continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {totals['emails']} emails for {totals['rows']} notifications; "
+            f"{totals['failed']} failed."
+        ))
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:40
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copy of website.rollup.rebuild at the time of this migration
+def _minutes(start_time, end_time):
+    minutes = (
+        (end_time.hour * 60 + end_time.minute)
+        - (start_time.hour * 60 + start_time.minute)
+    )
+    return max(minutes, 0)
+
+
+def fill_booking_daily_stats(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Booking = apps.get_model("website", "Booking")
+    BookingDailyStat = apps.get_model("website", "BookingDailyStat")
+
+    totals = defaultdict(lambda: [0, 0])
+    rows = (
+        Booking.objects.using(alias)
+        .order_by()
+        .values_list("booking_date", "space_id", "status", "payment_status", "start_time", "end_time")
+        .iterator(chunk_size=2000)
+    )
+    for booking_date, space_id, status, payment_status, start, end in rows:
+        key = (booking_date, space_id, status, payment_status or "UNPAID")
+        totals[key][0] += 1
+        totals[key][1] += _minutes(start, end)
+
+    BookingDailyStat.objects.using(alias).bulk_create(
+        (
+            BookingDailyStat(
+                date=key[0],
+                space_id=key[1],
+                status=key[2],
+                payment_status=key[3],
+                booking_count=count,
+                booked_minutes=minutes,
+            )
+            for key, (count, minutes) in totals.items()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0012_booking_user_db_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('CANCELLED', 'Cancelled')], max_length=20)),
+                ('payment_status', models.CharField(choices=[('UNPAID', 'Unpaid'), ('PAID', 'Paid'), ('FAILED', 'Failed')], max_length=10)),
+                ('booking_count', models.IntegerField(default=0)),
+                ('booked_minutes', models.IntegerField(default=0)),
+                ('space', models.ForeignKey(db_column='space_id', on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='website.libraryspace')),
+            ],
+            options={
+                'db_table': 'website_booking_daily_stat',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'space', 'status', 'payment_status'), name='unique_booking_daily_stat')],
+            },
+        ),
+        migrations.RunPython(fill_booking_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:09
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+# Copy of LibrarySpace.AMENITY_BITS at the time of this migration
+AMENITY_BITS = {
+    "has_projector": 1,
+    "has_whiteboard": 2,
+    "has_wifi": 4,
+    "has_power_plug": 8,
+    "has_network_node": 16,
+    "wheelchair_accessible": 32,
+}
+
+
+def fill_amenity_mask(apps, schema_editor):
+    LibrarySpace = apps.get_model("website", "LibrarySpace")
+    spaces = LibrarySpace.objects.using(schema_editor.connection.alias)
+    for field, bit in AMENITY_BITS.items():
+        spaces.filter(**{field: True}).update(amenity_mask=F("amenity_mask") + bit)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0014_booking_date_start_time_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='libraryspace',
+            name='amenity_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='libraryspace',
+            index=models.Index(fields=['library', 'is_active', 'amenity_mask'], name='space_library_amenity_idx'),
+        ),
+        migrations.RunPython(fill_amenity_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:16
+
+from django.db import OperationalError, migrations, models
+
+
+# Copy of website.search's document builders at the time of this migration
+def _text(*parts):
+    return " ".join(str(part) for part in parts if part)
+
+
+def fill_search_documents(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    SearchDocument = apps.get_model("website", "SearchDocument")
+    documents = []
+
+    for branch in apps.get_model("website", "Branch").objects.using(alias):
+        documents.append(SearchDocument(
+            kind="branch", key=branch.code,
+            title=branch.name, body=_text(branch.code, branch.location),
+        ))
+    for library in apps.get_model("website", "Library").objects.using(alias):
+        documents.append(SearchDocument(
+            kind="library", key=library.library_code,
+            title=_text(library.library_name, library.short_name),
+            body=_text(
+                library.library_code, library.library_type, library.address,
+                library.postcode, library.city, library.state, library.notes,
+            ),
+        ))
+    for space in apps.get_model("website", "LibrarySpace").objects.using(alias):
+        documents.append(SearchDocument(
+            kind="space", key=str(space.space_id),
+            title=space.space_name,
+            body=_text(
+                space.get_space_type_display() if space.space_type else "",
+                space.room_number, space.floor, space.description, space.booking_notes,
+            ),
+        ))
+
+    SearchDocument.objects.using(alias).bulk_create(documents, batch_size=2000)
+
+
+# FTS5 index over website_search_document, kept in step by triggers.
+# Skipped on other backends and on SQLite builds without FTS5; search
+# then uses its in-process index instead.
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE website_search USING fts5(
+        title, body,
+        content='website_search_document', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER website_search_ai AFTER INSERT ON website_search_document BEGIN
+        INSERT INTO website_search(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER website_search_ad AFTER DELETE ON website_search_document BEGIN
+        INSERT INTO website_search(website_search, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER website_search_au AFTER UPDATE ON website_search_document BEGIN
+        INSERT INTO website_search(website_search, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO website_search(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+DROP_FTS = [
+    "DROP TRIGGER IF EXISTS website_search_au",
+    "DROP TRIGGER IF EXISTS website_search_ad",
+    "DROP TRIGGER IF EXISTS website_search_ai",
+    "DROP TABLE IF EXISTS website_search",
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        except OperationalError:
+            return
+        cursor.execute("DROP TABLE temp.fts5_probe")
+        for sql in CREATE_FTS:
+            cursor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in DROP_FTS:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0015_libraryspace_amenity_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('branch', 'Branch'), ('library', 'Library'), ('space', 'Space')], max_length=10)),
+                ('key', models.CharField(max_length=50)),
+                ('title', models.TextField()),
+                ('body', models.TextField(blank=True)),
+            ],
+            options={
+                'db_table': 'website_search_document',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'key'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
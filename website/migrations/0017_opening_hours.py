@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0016_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('opens_at', models.TimeField(blank=True, null=True)),
+                ('closes_at', models.TimeField(blank=True, null=True)),
+                ('reason', models.CharField(blank=True, max_length=150)),
+                ('library', models.ForeignKey(blank=True, db_column='library_code', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='opening_exceptions', to='website.library')),
+                ('space', models.ForeignKey(blank=True, db_column='space_id', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='opening_exceptions', to='website.libraryspace')),
+            ],
+            options={
+                'db_table': 'website_opening_exception',
+                'ordering': ['date', 'opens_at'],
+                'indexes': [models.Index(fields=['date'], name='website_ope_date_6f75ff_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('library__isnull', False), ('space__isnull', True)), models.Q(('library__isnull', True), ('space__isnull', False)), _connector='OR'), name='opening_exception_library_or_space'), models.CheckConstraint(condition=models.Q(models.Q(('closes_at__isnull', True), ('opens_at__isnull', True)), models.Q(('closes_at__isnull', False), ('opens_at__isnull', False)), _connector='OR'), name='opening_exception_both_times_or_neither')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('opens_at', models.TimeField()),
+                ('closes_at', models.TimeField()),
+                ('library', models.ForeignKey(blank=True, db_column='library_code', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='opening_hours_rules', to='website.library')),
+                ('space', models.ForeignKey(blank=True, db_column='space_id', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='opening_hours_rules', to='website.libraryspace')),
+            ],
+            options={
+                'db_table': 'website_opening_hours',
+                'ordering': ['weekday', 'opens_at'],
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('library__isnull', False), ('space__isnull', True)), models.Q(('library__isnull', True), ('space__isnull', False)), _connector='OR'), name='opening_hours_library_or_space')],
+            },
+        ),
+    ]
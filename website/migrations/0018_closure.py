@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0017_opening_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Closure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('reason', models.CharField(max_length=150)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notices_sent_at', models.DateTimeField(blank=True, null=True)),
+                ('branch', models.ForeignKey(blank=True, db_column='branch_code', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='closures', to='website.branch')),
+                ('campus', models.ForeignKey(blank=True, db_column='campus_code', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='closures', to='website.campus')),
+                ('library', models.ForeignKey(blank=True, db_column='library_code', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='closures', to='website.library')),
+                ('space', models.ForeignKey(blank=True, db_column='space_id', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='closures', to='website.libraryspace')),
+            ],
+            options={
+                'db_table': 'website_closure',
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['ends_at', 'starts_at'], name='website_clo_ends_at_cd71fa_idx'), models.Index(fields=['notices_sent_at'], name='website_clo_notices_d88776_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('branch__isnull', False), ('campus__isnull', True), ('library__isnull', True), ('space__isnull', True)), models.Q(('branch__isnull', True), ('campus__isnull', False), ('library__isnull', True), ('space__isnull', True)), models.Q(('branch__isnull', True), ('campus__isnull', True), ('library__isnull', False), ('space__isnull', True)), models.Q(('branch__isnull', True), ('campus__isnull', True), ('library__isnull', True), ('space__isnull', False)), _connector='OR'), name='closure_one_scope'), models.CheckConstraint(condition=models.Q(('ends_at__gt', models.F('starts_at'))), name='closure_ends_after_start')],
+            },
+        ),
+    ]
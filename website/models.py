@@ -1,5 +1,5 @@
 # website/models.py
-from django.db import models
+from django.db import models, router, transaction
 from django.conf import settings
 
 
@@ -126,6 +126,17 @@ class LibrarySpace(models.Model):
         ("restricted", "Restricted"),
     ]
 
+    # Bit of each filterable amenity in amenity_mask. Any combination of
+    # amenity filters becomes one predicate: amenity_mask & wanted = wanted
+    AMENITY_BITS = {
+        "has_projector": 1,
+        "has_whiteboard": 2,
+        "has_wifi": 4,
+        "has_power_plug": 8,
+        "has_network_node": 16,
+        "wheelchair_accessible": 32,
+    }
+
     # --- Identity ---
     space_id = models.AutoField(primary_key=True)
 
@@ -160,6 +171,8 @@ class LibrarySpace(models.Model):
     has_power_plug = models.BooleanField(default=False)
     has_network_node = models.BooleanField(default=False)
 
+    # Denormalized from the amenity flags above; maintained by save()
+    amenity_mask = models.PositiveSmallIntegerField(default=0, editable=False)
 
     noise_level = models.CharField(
         max_length=20,
@@ -206,10 +219,28 @@ class LibrarySpace(models.Model):
     class Meta:
         db_table = "website_space"
         ordering = ["space_name"]
+        indexes = [
+            models.Index(
+                fields=["library", "is_active", "amenity_mask"],
+                name="space_library_amenity_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.space_name} ({self.library.library_code})"
 
+    def compute_amenity_mask(self):
+        return sum(
+            bit for field, bit in self.AMENITY_BITS.items() if getattr(self, field)
+        )
+
+    def save(self, *args, **kwargs):
+        self.amenity_mask = self.compute_amenity_mask()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & self.AMENITY_BITS.keys():
+            kwargs["update_fields"] = {*update_fields, "amenity_mask"}
+        super().save(*args, **kwargs)
+
 
 # ------------------------------
 # Booking Model
@@ -223,11 +254,16 @@ class Booking(models.Model):
         ("CANCELLED", "Cancelled"),
     ]
 
+    # Statuses that no longer hold the slot
+    INACTIVE_STATUSES = ("CANCELLED", "REJECTED")
+
     # Who made the booking
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        related_name="bookings"
+        related_name="bookings",
+        # auth_user lives in the "default" database, not in main.db
+        db_constraint=False,
     )
 
     # Which space is booked
@@ -239,6 +275,15 @@ class Booking(models.Model):
         related_name="bookings"
     )
 
+    # Set when the booking was made as part of a repeating series
+    series = models.ForeignKey(
+        "BookingSeries",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="bookings",
+    )
+
     # When the booking happens
     booking_date = models.DateField()
     start_time = models.TimeField()
@@ -283,6 +328,8 @@ class Booking(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["space", "booking_date"]),
+            # booking_report pages through bookings newest first
+            models.Index(fields=["booking_date", "start_time"]),
         ]
 
     def __str__(self):
@@ -292,6 +339,417 @@ class Booking(models.Model):
             f"{self.start_time}-{self.end_time}"
         )
 
+    def save(self, *args, **kwargs):
+        # The rollup reads the stored row in pre_save (website/signals.py);
+        # keep that read and this write in one transaction, or a change
+        # committed in between would be subtracted from the rollup twice
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+# ------------------------------
+# Booking Series Model
+# ------------------------------
+class BookingSeries(models.Model):
+    """The rule a repeating booking was made from, e.g. every Monday and
+    Wednesday until the end of the semester.
+
+    Expanded into dates by website/recurrence.py; the bookings it produced
+    point back here through Booking.series.
+    """
+
+    FREQUENCY_CHOICES = [
+        ("DAILY", "Daily"),
+        ("WEEKLY", "Weekly"),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="booking_series",
+        # auth_user lives in the "default" database, not in main.db
+        db_constraint=False,
+    )
+    space = models.ForeignKey(
+        LibrarySpace,
+        to_field="space_id",
+        db_column="space_id",
+        on_delete=models.CASCADE,
+        related_name="booking_series",
+    )
+
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default="WEEKLY")
+    interval = models.PositiveSmallIntegerField(default=1)
+    # Comma-separated weekday numbers (0 = Monday) for weekly series
+    weekdays = models.CharField(max_length=20, blank=True)
+    starts_on = models.DateField()
+    until = models.DateField()
+    # ISO dates left out of the series
+    exceptions = models.JSONField(default=list, blank=True)
+
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "website_booking_series"
+        ordering = ["-created_at"]
+
+    @property
+    def weekday_list(self):
+        return [int(d) for d in self.weekdays.split(",") if d]
+
+    def __str__(self):
+        return (
+            f"{self.space_id} | {self.get_frequency_display()} "
+            f"{self.starts_on}-{self.until} {self.start_time}-{self.end_time}"
+        )
+
+
+# ------------------------------
+# Booking Daily Stat Model
+# ------------------------------
+class BookingDailyStat(models.Model):
+    """Per-day rollup of bookings, kept current by website/rollup.py."""
+
+    date = models.DateField()
+
+    space = models.ForeignKey(
+        LibrarySpace,
+        to_field="space_id",
+        db_column="space_id",
+        on_delete=models.CASCADE,
+        related_name="daily_stats"
+    )
+
+    status = models.CharField(
+        max_length=20,
+        choices=Booking.STATUS_CHOICES
+    )
+
+    payment_status = models.CharField(
+        max_length=10,
+        choices=Booking.PAYMENT_STATUS_CHOICES
+    )
+
+    booking_count = models.IntegerField(default=0)
+    booked_minutes = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "website_booking_daily_stat"
+        ordering = ["date"]
+        constraints = [
+            # Also serves date-range scans (date is the leading column)
+            models.UniqueConstraint(
+                fields=["date", "space", "status", "payment_status"],
+                name="unique_booking_daily_stat",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} | {self.space_id} | {self.status}/{self.payment_status}"
+
+# ------------------------------
+# Opening Hours Models
+# ------------------------------
+class OpeningHours(models.Model):
+    """One open interval in the weekly schedule of a library or a space.
+
+    A weekday can have several rows (e.g. closed over lunch); a weekday
+    without rows is closed once the library or space has any row at all.
+    Compiled into per-space open intervals by website/opening_hours.py.
+    """
+
+    WEEKDAYS = [
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    ]
+
+    library = models.ForeignKey(
+        Library,
+        to_field="library_code",
+        db_column="library_code",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="opening_hours_rules",
+    )
+    space = models.ForeignKey(
+        LibrarySpace,
+        to_field="space_id",
+        db_column="space_id",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="opening_hours_rules",
+    )
+
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAYS)
+    opens_at = models.TimeField()
+    # 00:00 means midnight at the end of the day
+    closes_at = models.TimeField()
+
+    class Meta:
+        db_table = "website_opening_hours"
+        ordering = ["weekday", "opens_at"]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(library__isnull=False, space__isnull=True)
+                    | models.Q(library__isnull=True, space__isnull=False)
+                ),
+                name="opening_hours_library_or_space",
+            ),
+        ]
+
+    def __str__(self):
+        owner = self.library_id or f"space {self.space_id}"
+        return f"{owner} | {self.get_weekday_display()} {self.opens_at}-{self.closes_at}"
+
+
+class OpeningException(models.Model):
+    """Different hours on one date: a public holiday, renovation, exam week.
+
+    Rows for a date replace that date's weekly schedule. A row without
+    times closes the library or space for the whole day.
+    """
+
+    library = models.ForeignKey(
+        Library,
+        to_field="library_code",
+        db_column="library_code",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="opening_exceptions",
+    )
+    space = models.ForeignKey(
+        LibrarySpace,
+        to_field="space_id",
+        db_column="space_id",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="opening_exceptions",
+    )
+
+    date = models.DateField()
+    opens_at = models.TimeField(null=True, blank=True)
+    closes_at = models.TimeField(null=True, blank=True)
+    reason = models.CharField(max_length=150, blank=True)
+
+    class Meta:
+        db_table = "website_opening_exception"
+        ordering = ["date", "opens_at"]
+        indexes = [
+            models.Index(fields=["date"]),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(library__isnull=False, space__isnull=True)
+                    | models.Q(library__isnull=True, space__isnull=False)
+                ),
+                name="opening_exception_library_or_space",
+            ),
+            models.CheckConstraint(
+                condition=models.Q(opens_at__isnull=True, closes_at__isnull=True)
+                | models.Q(opens_at__isnull=False, closes_at__isnull=False),
+                name="opening_exception_both_times_or_neither",
+            ),
+        ]
+
+    @property
+    def is_closed(self):
+        return self.opens_at is None
+
+    def __str__(self):
+        owner = self.library_id or f"space {self.space_id}"
+        hours = "closed" if self.is_closed else f"{self.opens_at}-{self.closes_at}"
+        return f"{owner} | {self.date} {hours}"
+
+
+# ------------------------------
+# Closure Model
+# ------------------------------
+class Closure(models.Model):
+    """A period when a branch, campus, library or space takes no bookings:
+    renovation, a semester break, a public holiday across a branch.
+
+    Unlike OpeningException it spans any datetime range and any scope.
+    Looked up through the in-memory calendar in website/closures.py.
+    """
+
+    SCOPES = ("space", "library", "campus", "branch")
+
+    branch = models.ForeignKey(
+        Branch,
+        to_field="code",
+        db_column="branch_code",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="closures",
+    )
+    campus = models.ForeignKey(
+        Campus,
+        to_field="campus_code",
+        db_column="campus_code",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="closures",
+    )
+    library = models.ForeignKey(
+        Library,
+        to_field="library_code",
+        db_column="library_code",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="closures",
+    )
+    space = models.ForeignKey(
+        LibrarySpace,
+        to_field="space_id",
+        db_column="space_id",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="closures",
+    )
+
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    reason = models.CharField(max_length=150)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by the send_closure_notices job once affected bookings are told
+    notices_sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "website_closure"
+        ordering = ["starts_at"]
+        indexes = [
+            # Overlap queries: ends_at > start AND starts_at < end
+            models.Index(fields=["ends_at", "starts_at"]),
+            models.Index(fields=["notices_sent_at"]),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(branch__isnull=False, campus__isnull=True, library__isnull=True, space__isnull=True)
+                    | models.Q(branch__isnull=True, campus__isnull=False, library__isnull=True, space__isnull=True)
+                    | models.Q(branch__isnull=True, campus__isnull=True, library__isnull=False, space__isnull=True)
+                    | models.Q(branch__isnull=True, campus__isnull=True, library__isnull=True, space__isnull=False)
+                ),
+                name="closure_one_scope",
+            ),
+            models.CheckConstraint(
+                condition=models.Q(ends_at__gt=models.F("starts_at")),
+                name="closure_ends_after_start",
+            ),
+        ]
+
+    @property
+    def scope(self):
+        """(kind, key) of what is closed, e.g. ("library", "PTAR")."""
+        for kind in self.SCOPES:
+            key = getattr(self, f"{kind}_id")
+            if key is not None:
+                return kind, key
+        return None, None
+
+    def __str__(self):
+        kind, key = self.scope
+        return f"{kind} {key} | {self.starts_at:%Y-%m-%d %H:%M}-{self.ends_at:%Y-%m-%d %H:%M} | {self.reason}"
+
+
+# ------------------------------
+# Email Outbox Model
+# ------------------------------
+class OutboxEmail(models.Model):
+    """One notification waiting to be emailed (see website/outbox.py).
+
+    Written in the same transaction as the change it reports; the
+    send_outbox worker coalesces a user's rows of one kind into a single
+    digest email.
+    """
+
+    KIND_CHOICES = [
+        ("created", "Booking received"),
+        ("approved", "Booking approved"),
+        ("rejected", "Booking rejected"),
+        ("cancelled", "Booking cancelled"),
+        ("closure", "Closure"),
+    ]
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("SENT", "Sent"),
+        ("FAILED", "Failed"),
+    ]
+
+    # auth_user lives in the "default" database; resolved when sending
+    user_id = models.IntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # One line of the digest, e.g. "Discussion Room 1, 04 Mar 2030 10:00-11:00"
+    summary = models.CharField(max_length=300)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="PENDING")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Not sent before this; also how long a worker's claim lasts
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "website_email_outbox"
+        ordering = ["created_at", "id"]
+        indexes = [
+            # The worker's poll: PENDING rows that are due
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} | user {self.user_id} | {self.status} | {self.summary}"
+
+
+# ------------------------------
+# Search Document Model
+# ------------------------------
+class SearchDocument(models.Model):
+    """Searchable text of one branch, library or space (see website/search.py)."""
+
+    KIND_CHOICES = [
+        ("branch", "Branch"),
+        ("library", "Library"),
+        ("space", "Space"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=50)
+    title = models.TextField()
+    body = models.TextField(blank=True)
+
+    class Meta:
+        db_table = "website_search_document"
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "key"], name="unique_search_document"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.key} | {self.title}"
+
 # FPX simulation fields
 payment_method = models.CharField(
     max_length=20,
@@ -0,0 +1,217 @@
+# website/opening_hours.py
+#
+# When each space is open, day by day.
+#
+# A space is open when both its library and the space itself are open:
+#
+#   library: its OpeningException rows for the date, else its
+#            OpeningHours rows for the weekday, else all day
+#   space:   its OpeningException rows for the date, else its
+#            OpeningHours rows for the weekday, else
+#            available_from-available_to
+#
+# OPENING_HOURS caches those rules compiled per space: the intersected
+# open intervals for each weekday, plus the dates where an exception
+# overrides them. A lookup is two dict hits, with no parsing or queries.
+# Saving or deleting a rule or a space invalidates it (see
+# website/signals.py). Closures (website/closures.py) are subtracted at
+# lookup time, since they span arbitrary dates.
+#
+# Intervals are (start, end) minutes since midnight, sorted and merged;
+# DAY_MINUTES is midnight at the end of the day.
+import datetime
+from collections import defaultdict
+
+from django.utils import timezone
+
+from website import closures
+from website.cache_utils import VersionedCache
+from website.models import LibrarySpace, OpeningException, OpeningHours
+
+
+DAY_MINUTES = 24 * 60
+ALL_DAY = ((0, DAY_MINUTES),)
+CLOSED = ()
+
+# Exceptions further back than this are left out of the table
+EXCEPTION_HISTORY_DAYS = 7
+
+
+def minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _span(opens_at, closes_at):
+    start = minutes(opens_at)
+    end = minutes(closes_at) or DAY_MINUTES
+    return (start, end) if end > start else None
+
+
+def merge(intervals):
+    """Sorted tuple of `intervals` with overlapping or touching ones joined."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+def intersect(a, b):
+    """Intervals open in both of two merged interval tuples."""
+    out = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start < end:
+            out.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return tuple(out)
+
+
+def subtract(a, b):
+    """Parts of merged intervals `a` not covered by merged intervals `b`."""
+    out = []
+    j = 0
+    for start, end in a:
+        while j < len(b) and b[j][1] <= start:
+            j += 1
+        cursor = start
+        k = j
+        while k < len(b) and b[k][0] < end:
+            if b[k][0] > cursor:
+                out.append((cursor, b[k][0]))
+            cursor = max(cursor, b[k][1])
+            k += 1
+        if cursor < end:
+            out.append((cursor, end))
+    return tuple(out)
+
+
+class SpaceHours:
+    """Open intervals of one space: per weekday, and on exception dates."""
+
+    __slots__ = ("weekly", "dates")
+
+    def __init__(self, weekly, dates):
+        self.weekly = weekly
+        self.dates = dates
+
+    def __getstate__(self):
+        return self.weekly, self.dates
+
+    def __setstate__(self, state):
+        self.weekly, self.dates = state
+
+    def intervals(self, day):
+        return self.dates.get(day, self.weekly[day.weekday()])
+
+
+def _load_opening_hours():
+    since = timezone.localdate() - datetime.timedelta(days=EXCEPTION_HISTORY_DAYS)
+
+    weekly_rules = {"library": defaultdict(lambda: [[] for _ in range(7)]),
+                    "space": defaultdict(lambda: [[] for _ in range(7)])}
+    rules = OpeningHours.objects.order_by().values_list(
+        "library_id", "space_id", "weekday", "opens_at", "closes_at"
+    )
+    for library_id, space_id, weekday, opens_at, closes_at in rules:
+        week = (
+            weekly_rules["library"][library_id] if library_id
+            else weekly_rules["space"][space_id]
+        )
+        span = _span(opens_at, closes_at)
+        if span:
+            week[weekday].append(span)
+
+    date_rules = {"library": defaultdict(lambda: defaultdict(list)),
+                  "space": defaultdict(lambda: defaultdict(list))}
+    exceptions = OpeningException.objects.filter(date__gte=since).order_by().values_list(
+        "library_id", "space_id", "date", "opens_at", "closes_at"
+    )
+    for library_id, space_id, date, opens_at, closes_at in exceptions:
+        dates = (
+            date_rules["library"][library_id] if library_id
+            else date_rules["space"][space_id]
+        )
+        # A row without times still marks the date (closed all day)
+        spans = dates[date]
+        if opens_at is not None:
+            span = _span(opens_at, closes_at)
+            if span:
+                spans.append(span)
+
+    # Most spaces share a handful of distinct interval tuples
+    interned = {}
+
+    def intern(intervals):
+        return interned.setdefault(intervals, intervals)
+
+    library_weeks = {
+        library_id: [merge(day) for day in week]
+        for library_id, week in weekly_rules["library"].items()
+    }
+
+    spaces = {}
+    rows = LibrarySpace.objects.order_by().values_list(
+        "space_id", "library_id", "available_from", "available_to"
+    )
+    for space_id, library_id, available_from, available_to in rows:
+        library_week = library_weeks.get(library_id, [ALL_DAY] * 7)
+        if space_id in weekly_rules["space"]:
+            own_week = [merge(day) for day in weekly_rules["space"][space_id]]
+        else:
+            span = _span(available_from, available_to)
+            own_week = [(span,) if span else CLOSED] * 7
+
+        weekly = tuple(
+            intern(intersect(library_week[d], own_week[d])) for d in range(7)
+        )
+
+        library_dates = date_rules["library"].get(library_id, {})
+        own_dates = date_rules["space"].get(space_id, {})
+        dates = {}
+        for day in library_dates.keys() | own_dates.keys():
+            weekday = day.weekday()
+            library_day = merge(library_dates[day]) if day in library_dates else library_week[weekday]
+            own_day = merge(own_dates[day]) if day in own_dates else own_week[weekday]
+            dates[day] = intern(intersect(library_day, own_day))
+
+        spaces[space_id] = SpaceHours(weekly, dates)
+
+    return spaces
+
+
+OPENING_HOURS = VersionedCache("opening_hours", _load_opening_hours)
+
+
+def intervals(space_id, day, available_from, available_to):
+    """((start_minute, end_minute), ...) when a space is open on `day`."""
+    hours = OPENING_HOURS.get().get(space_id)
+    if hours is None:
+        # Saved by another process since our table was built
+        span = _span(available_from, available_to)
+        open_ = (span,) if span else CLOSED
+    else:
+        open_ = hours.intervals(day)
+
+    closed = closures.closed_minutes(space_id, day)
+    if closed and open_:
+        return subtract(open_, merge(closed))
+    return open_
+
+
+def open_intervals(space, day):
+    return intervals(space.pk, day, space.available_from, space.available_to)
+
+
+def is_open(space, day, start_time, end_time):
+    """Whether `space` is open for the whole of start_time-end_time."""
+    start, end = minutes(start_time), minutes(end_time)
+    return any(s <= start and end <= e for s, e in open_intervals(space, day))
@@ -0,0 +1,195 @@
+# website/outbox.py
+#
+# Email notifications through an outbox table (OutboxEmail).
+#
+# Views and jobs call enqueue() inside the transaction that changes the
+# booking, so a notification exists exactly when the change commits and
+# no request ever waits on SMTP. `manage.py send_outbox` runs deliver()
+# in a loop:
+#
+#   1. claim up to batch_size due PENDING rows by pushing their
+#      next_attempt_at CLAIM_SECONDS ahead, so other workers skip them
+#   2. coalesce them per (user, kind) into one digest each: one
+#      "10 bookings approved" email instead of ten
+#   3. send the digests over one SMTP connection, reopened after an error
+#   4. mark the rows of sent digests SENT; retry the rest with
+#      exponential backoff, giving up (FAILED) after MAX_ATTEMPTS
+#
+# New rows wait DIGEST_SECONDS before they are due, so a burst of changes
+# for one user (a bulk approval, a recurring series) shares a digest.
+import datetime
+import smtplib
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from website.models import OutboxEmail
+
+
+DIGEST_SECONDS = 30
+CLAIM_SECONDS = 300
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+MAX_ATTEMPTS = 6
+BATCH_SIZE = 200
+
+# (subject for one row, subject for several, first line of the body)
+TEMPLATES = {
+    "created": (
+        "Booking received",
+        "{n} bookings received",
+        "We have received your booking request:",
+    ),
+    "approved": (
+        "Booking approved",
+        "{n} bookings approved",
+        "A librarian has approved your booking:",
+    ),
+    "rejected": (
+        "Booking rejected",
+        "{n} bookings rejected",
+        "A librarian has rejected your booking:",
+    ),
+    "cancelled": (
+        "Booking cancelled",
+        "{n} bookings cancelled",
+        "Your booking has been cancelled:",
+    ),
+    "closure": (
+        "A closure affects your booking",
+        "A closure affects {n} of your bookings",
+        "These bookings fall within a closure. Please choose another time, "
+        "or cancel them under My Bookings:",
+    ),
+}
+
+
+def booking_summary(booking):
+    """One digest line for a booking."""
+    space_name = getattr(booking, "space_name", None) or booking.space.space_name
+    return (
+        f"{space_name}, {booking.booking_date:%d %b %Y} "
+        f"{booking.start_time:%H:%M}-{booking.end_time:%H:%M}"
+    )
+
+
+def enqueue(kind, bookings, summary=booking_summary, using="main"):
+    """Queue a `kind` notification to the holder of each of `bookings`.
+
+    Call it inside the transaction that made the change.
+    """
+    due = timezone.now() + datetime.timedelta(seconds=DIGEST_SECONDS)
+    return OutboxEmail.objects.using(using).bulk_create([
+        OutboxEmail(
+            user_id=booking.user_id,
+            kind=kind,
+            summary=summary(booking)[:300],
+            next_attempt_at=due,
+        )
+        for booking in bookings
+    ])
+
+
+def backoff(attempts):
+    """Seconds to wait after the `attempts`-th failed try."""
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def _claim(now, batch_size, using):
+    with transaction.atomic(using=using):
+        rows = list(
+            OutboxEmail.objects.using(using).select_for_update()
+            .filter(status="PENDING", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if rows:
+            OutboxEmail.objects.using(using).filter(pk__in=[r.pk for r in rows]).update(
+                next_attempt_at=now + datetime.timedelta(seconds=CLAIM_SECONDS)
+            )
+    return rows
+
+
+def _digest(kind, rows, recipient):
+    one, several, intro = TEMPLATES[kind]
+    subject = one if len(rows) == 1 else several.format(n=len(rows))
+    lines = "\n".join(f"- {row.summary}" for row in rows)
+    return EmailMessage(f"SpaceBook: {subject}", f"{intro}\n\n{lines}\n", to=[recipient])
+
+
+def _record(rows, sent, errors, now, using):
+    """Store the outcome of one batch: `sent` row ids, `errors`
+    {id: (text, permanent)}."""
+    outbox = OutboxEmail.objects.using(using)
+    if sent:
+        outbox.filter(pk__in=sent).update(
+            status="SENT", sent_at=now, attempts=F("attempts") + 1, last_error=""
+        )
+
+    # One UPDATE per distinct outcome, not per row
+    outcomes = defaultdict(list)
+    for row in rows:
+        if row.pk not in errors:
+            continue
+        error, permanent = errors[row.pk]
+        attempts = row.attempts + 1
+        if permanent or attempts >= MAX_ATTEMPTS:
+            outcomes["FAILED", attempts, error, None].append(row.pk)
+        else:
+            retry_at = now + datetime.timedelta(seconds=backoff(attempts))
+            outcomes["PENDING", attempts, error, retry_at].append(row.pk)
+
+    for (status, attempts, error, retry_at), ids in outcomes.items():
+        changes = {"status": status, "attempts": attempts, "last_error": error}
+        if retry_at:
+            changes["next_attempt_at"] = retry_at
+        outbox.filter(pk__in=ids).update(**changes)
+
+
+def deliver(batch_size=BATCH_SIZE, now=None, using="main"):
+    """Send one batch of due notifications.
+
+    Returns {"rows": claimed, "emails": digests sent, "failed": rows that
+    failed this time}.
+    """
+    now = now or timezone.now()
+    rows = _claim(now, batch_size, using)
+    if not rows:
+        return {"rows": 0, "emails": 0, "failed": 0}
+
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row.user_id, row.kind].append(row)
+    recipients = dict(
+        User.objects.filter(pk__in={user_id for user_id, _ in groups})
+        .exclude(email="")
+        .values_list("pk", "email")
+    )
+
+    sent, errors, emails = [], {}, 0
+    connection = get_connection()
+    try:
+        for (user_id, kind), group in groups.items():
+            if user_id not in recipients:
+                for row in group:
+                    errors[row.pk] = ("The user has no email address.", True)
+                continue
+            try:
+                connection.open()
+                connection.send_messages([_digest(kind, group, recipients[user_id])])
+            except (smtplib.SMTPException, OSError) as e:
+                # Start the next digest on a fresh connection
+                connection.close()
+                for row in group:
+                    errors[row.pk] = (f"{type(e).__name__}: {e}", False)
+            else:
+                sent += [row.pk for row in group]
+                emails += 1
+    finally:
+        connection.close()
+
+    _record(rows, sent, errors, now, using)
+    return {"rows": len(rows), "emails": emails, "failed": len(errors)}
@@ -0,0 +1,117 @@
+# website/pagination.py
+#
+# Keyset (cursor) pagination. Instead of OFFSET, each page asks for rows
+# strictly after the last row of the previous page in the queryset's
+# ordering, so deep pages cost the same as the first one.
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps([str(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, model, ordering):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor(token)
+
+    if not isinstance(raw, list) or len(raw) != len(ordering):
+        raise InvalidCursor(token)
+
+    values = []
+    for field_name, value in zip(ordering, raw):
+        field = model._meta.get_field(field_name.lstrip("-"))
+        try:
+            values.append(field.to_python(value))
+        except ValidationError:
+            raise InvalidCursor(token)
+    return values
+
+
+def _after(ordering, values):
+    # (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+    condition = Q()
+    equal = Q()
+    for field_name, value in zip(ordering, values):
+        name = field_name.lstrip("-")
+        lookup = "lt" if field_name.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+        self.next_url = None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return not self.cursor
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """One page of `queryset` ordered by `ordering`.
+
+    The last entry of `ordering` must be unique (usually the pk) so the
+    order is total. An unreadable cursor falls back to the first page.
+    """
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        try:
+            values = decode_cursor(cursor, queryset.model, ordering)
+        except InvalidCursor:
+            cursor = None
+        else:
+            queryset = queryset.filter(_after(ordering, values))
+
+    rows = list(queryset[: page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        meta = queryset.model._meta
+        next_cursor = encode_cursor(
+            [getattr(last, meta.get_field(f.lstrip("-")).attname) for f in ordering]
+        )
+
+    return KeysetPage(rows, next_cursor, cursor)
+
+
+def paginate(request, queryset, ordering, page_size=DEFAULT_PAGE_SIZE):
+    """keyset_page() for a list view: reads ?cursor= and sets page.next_url
+    to the same query string with the next cursor, for "load more" links
+    and htmx infinite scroll."""
+    page = keyset_page(queryset, ordering, request.GET.get("cursor"), page_size)
+    if page.has_next:
+        params = request.GET.copy()
+        params["cursor"] = page.next_cursor
+        page.next_url = "?" + params.urlencode()
+    return page
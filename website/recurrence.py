@@ -0,0 +1,66 @@
+# website/recurrence.py
+#
+# Expands a repeating booking into its dates. Covers the part of an
+# iCalendar RRULE that room bookings need: FREQ=DAILY or WEEKLY with an
+# INTERVAL, BYDAY for weekly series and an inclusive UNTIL, plus EXDATE
+# style exceptions.
+#
+# Booking the expanded dates is website/reservations.py:reserve_series.
+import datetime
+
+
+# A semester of daily bookings, or several of weekly ones
+MAX_OCCURRENCES = 120
+
+
+def expand(starts_on, until, frequency="WEEKLY", interval=1, weekdays=None, exceptions=()):
+    """Dates of the series in order, without the exceptions.
+
+    Weekly series repeat on `weekdays` (0 = Monday), by default the
+    weekday of `starts_on`, every `interval` weeks. Raises ValueError for
+    an unknown frequency or more than MAX_OCCURRENCES dates.
+    """
+    if interval < 1:
+        raise ValueError("The interval must be at least 1.")
+    skip = set(exceptions)
+
+    def occurrences():
+        if frequency == "DAILY":
+            day = starts_on
+            while day <= until:
+                yield day
+                day += datetime.timedelta(days=interval)
+        elif frequency == "WEEKLY":
+            days = sorted(set(weekdays)) if weekdays else [starts_on.weekday()]
+            week = starts_on - datetime.timedelta(days=starts_on.weekday())
+            while week <= until:
+                for weekday in days:
+                    day = week + datetime.timedelta(days=weekday)
+                    if starts_on <= day <= until:
+                        yield day
+                week += datetime.timedelta(weeks=interval)
+        else:
+            raise ValueError(f"Unknown frequency {frequency!r}.")
+
+    dates = []
+    for day in occurrences():
+        if day in skip:
+            continue
+        dates.append(day)
+        if len(dates) > MAX_OCCURRENCES:
+            raise ValueError(
+                f"A series can have at most {MAX_OCCURRENCES} bookings."
+            )
+    return dates
+
+
+def expand_series(series):
+    """expand() for a BookingSeries."""
+    return expand(
+        series.starts_on,
+        series.until,
+        series.frequency,
+        series.interval,
+        series.weekday_list,
+        [datetime.date.fromisoformat(d) for d in series.exceptions],
+    )
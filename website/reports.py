@@ -0,0 +1,120 @@
+# website/reports.py
+#
+# Booking report figures. Everything on the summary cards and the usage
+# tables comes from one grouped, conditionally aggregated query over the
+# BookingDailyStat rollup (website/rollup.py), so a report over any date
+# range reads at most days x spaces rows instead of every booking.
+from collections import OrderedDict
+
+from django.db.models import Max, Min, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date
+
+from website.models import Booking, BookingDailyStat
+
+
+SUMMARY_COUNTS = {
+    "approved": Q(status="APPROVED"),
+    "pending": Q(status="PENDING"),
+    "cancelled": Q(status="CANCELLED"),
+    "rejected": Q(status="REJECTED"),
+    "paid": Q(payment_status="PAID"),
+    "unpaid": Q(payment_status="UNPAID"),
+}
+
+# Only bookings that still hold their slot count as used time
+ACTIVE = ~Q(status__in=Booking.INACTIVE_STATUSES)
+
+
+def _as_date(value):
+    if not value or hasattr(value, "year"):
+        return value or None
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def daily_stats(start_date=None, end_date=None, using="main"):
+    stats = BookingDailyStat.objects.using(using)
+
+    start_date = _as_date(start_date)
+    end_date = _as_date(end_date)
+    if start_date:
+        stats = stats.filter(date__gte=start_date)
+    if end_date:
+        stats = stats.filter(date__lte=end_date)
+
+    return stats
+
+
+def usage_by_space(start_date=None, end_date=None, using="main"):
+    """Per-space counts, busiest first, in a single GROUP BY query."""
+    annotations = {
+        "total": Coalesce(Sum("booking_count"), 0),
+        "booked_minutes": Coalesce(Sum("booked_minutes", filter=ACTIVE), 0),
+        "first_date": Min("date"),
+        "last_date": Max("date"),
+    }
+    for name, condition in SUMMARY_COUNTS.items():
+        annotations[name] = Coalesce(Sum("booking_count", filter=condition), 0)
+
+    return list(
+        daily_stats(start_date, end_date, using=using)
+        .order_by()
+        .values(
+            "space_id",
+            "space__space_name",
+            "space__library__library_code",
+            "space__library__library_name",
+        )
+        .annotate(**annotations)
+        .filter(total__gt=0)
+        .order_by("-total", "space__space_name")
+    )
+
+
+def usage_by_library(usage_rows):
+    """Per-library totals, folded from the per-space rows."""
+    libraries = OrderedDict()
+    for row in usage_rows:
+        code = row["space__library__library_code"]
+        entry = libraries.setdefault(
+            code,
+            {
+                "library_code": code,
+                "library_name": row["space__library__library_name"],
+                "spaces": 0,
+                "total": 0,
+                "booked_minutes": 0,
+            },
+        )
+        entry["spaces"] += 1
+        entry["total"] += row["total"]
+        entry["booked_minutes"] += row["booked_minutes"]
+
+    return sorted(libraries.values(), key=lambda e: -e["total"])
+
+
+def summarize(usage_rows, start_date=None, end_date=None):
+    """Report totals, summed from the per-space rows."""
+    summary = {"total": 0, "booked_minutes": 0}
+    summary.update({name: 0 for name in SUMMARY_COUNTS})
+
+    for row in usage_rows:
+        for name in summary:
+            summary[name] += row[name]
+
+    # Average over the requested range, or the span that has data
+    first = _as_date(start_date) or min(
+        (row["first_date"] for row in usage_rows), default=None
+    )
+    last = _as_date(end_date) or max(
+        (row["last_date"] for row in usage_rows), default=None
+    )
+    days = (last - first).days + 1 if first and last and last >= first else 0
+
+    summary["days"] = days
+    summary["avg_per_day"] = round(summary["total"] / days, 1) if days else 0
+    summary["booked_hours"] = round(summary["booked_minutes"] / 60, 1)
+    return summary
@@ -0,0 +1,140 @@
+# website/reservations.py
+#
+# Atomic booking writes. The form check (website/booking_index.py) is a
+# fast pre-check only; the authoritative overlap check happens here,
+# inside a transaction that serializes writers per LibrarySpace:
+#
+#   * SQLite: the "main" connection opens transactions with
+#     BEGIN IMMEDIATE (see DATABASES in settings), so the write lock is
+#     taken before we read.
+#   * Other backends: SELECT ... FOR UPDATE on the space row.
+#
+# That locked row also supplies buffer_minutes, so the overlap query
+# honours the buffer without another round trip.
+#
+# reserve_series() books a whole repeating series under one lock: one
+# range query for the clashes, an in-memory sweep, one bulk insert.
+from django.db import transaction
+from django.db.models import Q
+
+from website import booking_index, rollup
+from website.booking_rules import buffered, calendar_violation
+from website.cache_utils import bump_version
+from website.models import Booking, LibrarySpace
+
+
+class BookingConflict(Exception):
+    """Raised when the slot was taken before our write got the lock."""
+
+
+def conflicting_bookings(space_id, booking_date, start_time, end_time, using="main"):
+    """Active bookings overlapping a slot; on any date if booking_date is None."""
+    bookings = Booking.objects.using(using).filter(space_id=space_id)
+    if booking_date is not None:
+        bookings = bookings.filter(booking_date=booking_date)
+    return (
+        bookings
+        .exclude(status__in=Booking.INACTIVE_STATUSES)
+        .filter(Q(start_time__lt=end_time) & Q(end_time__gt=start_time))
+    )
+
+
+def reserve(booking, using="main"):
+    """Save a new booking unless it overlaps an active one, or comes
+    within the space's buffer_minutes of one.
+
+    Raises BookingConflict if another request got there first.
+    """
+    with transaction.atomic(using=using):
+        # Blocks concurrent reservations for the same space until commit
+        # (a no-op on SQLite, which is already holding the write lock).
+        space = LibrarySpace.objects.using(using).select_for_update().filter(
+            space_id=booking.space_id
+        ).only("space_id", "buffer_minutes").first()
+
+        start_time, end_time = buffered(
+            booking.start_time, booking.end_time, space.buffer_minutes if space else 0
+        )
+        conflicts = conflicting_bookings(
+            booking.space_id,
+            booking.booking_date,
+            start_time,
+            end_time,
+            using=using,
+        )
+        if booking.pk:
+            conflicts = conflicts.exclude(pk=booking.pk)
+
+        if conflicts.exists():
+            raise BookingConflict(
+                "This time slot is already booked. Please choose another time."
+            )
+
+        booking.save(using=using)
+
+    return booking
+
+
+def reserve_series(series, dates, status="PENDING", using="main"):
+    """Book `series` on every one of `dates` (sorted) that is free.
+
+    Saves the series, then, in the same transaction, finds every active
+    booking that clashes with any occurrence in one range query over the
+    (space, booking_date) index, sweeps the dates against them in memory
+    and bulk-inserts the rest. Returns (created bookings, {date: reason}
+    for the dates left out).
+    """
+    if not dates:
+        return [], {}
+
+    with transaction.atomic(using=using):
+        space = LibrarySpace.objects.using(using).select_for_update().get(
+            space_id=series.space_id
+        )
+        series.save(using=using)
+
+        start_time, end_time = buffered(
+            series.start_time, series.end_time, space.buffer_minutes
+        )
+        clashes = (
+            conflicting_bookings(series.space_id, None, start_time, end_time, using=using)
+            .filter(booking_date__range=(dates[0], dates[-1]))
+            .order_by("booking_date")
+            .values_list("booking_date", flat=True)
+        )
+        # Sweep the dates and the clashes, both sorted, side by side
+        clashes = iter(clashes)
+        clash = next(clashes, None)
+
+        failed = {}
+        free = []
+        for day in dates:
+            while clash is not None and clash < day:
+                clash = next(clashes, None)
+            if clash == day:
+                failed[day] = "Already booked."
+                continue
+            problem = calendar_violation(space, day, series.start_time, series.end_time)
+            if problem:
+                failed[day] = problem
+            else:
+                free.append(day)
+
+        bookings = Booking.objects.using(using).bulk_create([
+            Booking(
+                user_id=series.user_id,
+                space=space,
+                series=series,
+                booking_date=day,
+                start_time=series.start_time,
+                end_time=series.end_time,
+                status=status,
+            )
+            for day in free
+        ])
+        # bulk_create() skips the signals that keep these in step
+        rollup.apply_many(bookings, using=using)
+
+    booking_index.invalidate_on_commit(series.space_id, using=using)
+    bump_version("booking_counts")
+    return bookings, failed
@@ -0,0 +1,181 @@
+# website/rollup.py
+#
+# Keeps BookingDailyStat in step with Booking. Each booking contributes
+# one to booking_count and its length to booked_minutes of the row keyed
+# by (date, space, status, payment_status). Saves move the contribution
+# from the old key to the new one; deletes remove it.
+#
+# Migration 0013 fills it from existing bookings; repair it later with:
+#   python manage.py rebuild_booking_stats
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from website.models import Booking, BookingDailyStat
+
+
+KEY_FIELDS = ("booking_date", "space_id", "status", "payment_status")
+SNAPSHOT_FIELDS = KEY_FIELDS + ("start_time", "end_time")
+
+
+def booked_minutes(start_time, end_time):
+    minutes = (
+        (end_time.hour * 60 + end_time.minute)
+        - (start_time.hour * 60 + start_time.minute)
+    )
+    return max(minutes, 0)
+
+
+def snapshot(booking):
+    """(key, minutes) of a booking, or None if its fields aren't loaded."""
+    values = booking.__dict__
+    if any(f not in values for f in SNAPSHOT_FIELDS):
+        return None
+    return _snapshot(values)
+
+
+def _snapshot(values):
+    meta = Booking._meta
+    key = (
+        meta.get_field("booking_date").to_python(values["booking_date"]),
+        values["space_id"],
+        values["status"],
+        # legacy rows in main.db may have a NULL payment status
+        values["payment_status"] or "UNPAID",
+    )
+    minutes = booked_minutes(
+        meta.get_field("start_time").to_python(values["start_time"]),
+        meta.get_field("end_time").to_python(values["end_time"]),
+    )
+    return key, minutes
+
+
+def affected_by(update_fields):
+    """Whether a save with these update_fields can move the booking's
+    rollup contribution."""
+    if update_fields is None:
+        return True
+    # update_fields may name the foreign key either way
+    names = {"space_id" if name == "space" else name for name in update_fields}
+    return not names.isdisjoint(SNAPSHOT_FIELDS)
+
+
+def apply(key, count, minutes, using="main"):
+    """Add `count` bookings and `minutes` to the rollup row for `key`."""
+    if not count and not minutes:
+        return
+
+    booking_date, space_id, status, payment_status = key
+    lookup = {
+        "date": booking_date,
+        "space_id": space_id,
+        "status": status,
+        "payment_status": payment_status,
+    }
+    rows = BookingDailyStat.objects.using(using).filter(**lookup)
+
+    # No savepoint needed: the UPDATE either lands or raises, and the
+    # INSERT below has its own
+    with transaction.atomic(using=using, savepoint=False):
+        updated = rows.update(
+            booking_count=F("booking_count") + count,
+            booked_minutes=F("booked_minutes") + minutes,
+        )
+        if updated:
+            return
+
+        try:
+            with transaction.atomic(using=using):
+                BookingDailyStat.objects.using(using).create(
+                    booking_count=count, booked_minutes=minutes, **lookup
+                )
+        except IntegrityError:
+            # Someone else created the row between our UPDATE and INSERT
+            rows.update(
+                booking_count=F("booking_count") + count,
+                booked_minutes=F("booked_minutes") + minutes,
+            )
+
+
+def stored_snapshot(booking, using):
+    stored = (
+        Booking.objects.using(using).filter(pk=booking.pk).values(*SNAPSHOT_FIELDS).first()
+    )
+    return _snapshot(stored) if stored else None
+
+
+def booking_saved(booking, previous, using="main"):
+    current = snapshot(booking)
+    if current is None:
+        # Saved from a .only()/.defer() instance
+        current = stored_snapshot(booking, using)
+
+    if current == previous:
+        return current
+
+    # Booking.save() has already opened the transaction
+    with transaction.atomic(using=using, savepoint=False):
+        if previous:
+            apply(previous[0], -1, -previous[1], using=using)
+        if current:
+            apply(current[0], 1, current[1], using=using)
+
+    return current
+
+
+def booking_deleted(booking, previous, using="main"):
+    current = previous or snapshot(booking)
+    if current:
+        apply(current[0], -1, -current[1], using=using)
+
+
+def apply_many(bookings, sign=1, using="main"):
+    """Fold a batch of bookings in (sign=1) or out (sign=-1) of the rollup.
+
+    For bulk_create() and queryset.update() paths, which skip signals.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for booking in bookings:
+        current = snapshot(booking)
+        if current:
+            totals[current[0]][0] += sign
+            totals[current[0]][1] += sign * current[1]
+
+    with transaction.atomic(using=using):
+        for key, (count, minutes) in totals.items():
+            apply(key, count, minutes, using=using)
+
+
+def rebuild(using="main", batch_size=2000):
+    """Recompute every BookingDailyStat row from website_booking."""
+    totals = defaultdict(lambda: [0, 0])
+    rows = (
+        Booking.objects.using(using)
+        .order_by()
+        .values_list(*SNAPSHOT_FIELDS)
+        .iterator(chunk_size=batch_size)
+    )
+    for booking_date, space_id, status, payment_status, start, end in rows:
+        key = (booking_date, space_id, status, payment_status or "UNPAID")
+        totals[key][0] += 1
+        totals[key][1] += booked_minutes(start, end)
+
+    with transaction.atomic(using=using):
+        BookingDailyStat.objects.using(using).all().delete()
+        BookingDailyStat.objects.using(using).bulk_create(
+            (
+                BookingDailyStat(
+                    date=key[0],
+                    space_id=key[1],
+                    status=key[2],
+                    payment_status=key[3],
+                    booking_count=count,
+                    booked_minutes=minutes,
+                )
+                for key, (count, minutes) in totals.items()
+            ),
+            batch_size=batch_size,
+        )
+
+    return len(totals)
@@ -0,0 +1,427 @@
+# website/search.py
+#
+# Full-text search over branches, libraries and spaces.
+#
+# Every searchable object has one SearchDocument row (title + body text),
+# kept current by the signals in website/signals.py. On SQLite the FTS5
+# table website_search indexes those rows; migration 0016 creates it
+# together with the triggers that mirror every insert, update and delete.
+# Queries are ranked with bm25(), title matches weighing more than body
+# matches.
+#
+# Other backends, or a SQLite build without FTS5, fall back to
+# InvertedIndex: a process-local index built from the same documents and
+# scored the same way. Both backends share tokenize() and query_terms():
+#
+#   - case and accents are folded ("Café" matches "cafe")
+#   - every query word is a prefix ("perpus" matches "perpustakaan")
+#   - common Malay/English pairs match each other ("bilik" finds "room")
+#   - every query word (or one of its alternatives) must match
+#
+# Rebuild everything with: python manage.py rebuild_search_index
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from django.db import connections
+
+from website.models import Branch, Library, LibrarySpace, SearchDocument
+
+
+FTS_TABLE = "website_search"
+
+# bm25() weights of the title and body columns
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+DEFAULT_LIMIT = 50
+
+# Longer queries are cut; each word is another AND term
+MAX_QUERY_WORDS = 8
+
+# Words that mean the same in Malay and English. A query word from a group
+# matches any word of the group.
+SYNONYM_GROUPS = [
+    ("perpustakaan", "pustaka", "library"),
+    ("bilik", "room"),
+    ("perbincangan", "diskusi", "discussion"),
+    ("bacaan", "membaca", "reading"),
+    ("belajar", "pembelajaran", "study"),
+    ("senyap", "quiet"),
+    ("makmal", "lab", "laboratory"),
+    ("komputer", "computer"),
+    ("kuliah", "lecture"),
+    ("mesyuarat", "meeting"),
+    ("seminar", "bengkel", "workshop"),
+    ("tingkat", "aras", "floor", "level"),
+    ("kampus", "campus"),
+    ("cawangan", "branch"),
+    ("pusat", "centre", "center"),
+    ("utama", "main"),
+    ("awam", "public"),
+    ("pelajar", "student", "students"),
+    ("kakitangan", "staf", "staff"),
+    ("papan", "whiteboard"),
+    ("projektor", "projector"),
+]
+
+SYNONYMS = {word: group for group in SYNONYM_GROUPS for word in group}
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    """Case- and accent-folded words of `text`, split like FTS5's
+    unicode61 tokenizer with remove_diacritics 2."""
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return _WORD.findall(folded)
+
+
+def query_terms(query):
+    """[(alternatives of word 1), (alternatives of word 2), ...] for `query`.
+
+    Each alternative is matched as a prefix.
+    """
+    terms = []
+    for word in dict.fromkeys(tokenize(query)):
+        group = SYNONYMS.get(word, ())
+        terms.append((word, *(w for w in group if w != word)))
+        if len(terms) == MAX_QUERY_WORDS:
+            break
+    return terms
+
+
+# -----------------------------
+# Documents
+# -----------------------------
+def _text(*parts):
+    return " ".join(str(part) for part in parts if part)
+
+
+def branch_document(branch):
+    return branch.name, _text(branch.code, branch.location)
+
+
+def library_document(library):
+    return (
+        _text(library.library_name, library.short_name),
+        _text(
+            library.library_code,
+            library.library_type,
+            library.address,
+            library.postcode,
+            library.city,
+            library.state,
+            library.notes,
+        ),
+    )
+
+
+def space_document(space):
+    return (
+        space.space_name,
+        _text(
+            space.get_space_type_display() if space.space_type else "",
+            space.room_number,
+            space.floor,
+            space.description,
+            space.booking_notes,
+        ),
+    )
+
+
+# kind -> (model, builder)
+KINDS = {
+    "branch": (Branch, branch_document),
+    "library": (Library, library_document),
+    "space": (LibrarySpace, space_document),
+}
+
+_KIND_OF_MODEL = {model: kind for kind, (model, _) in KINDS.items()}
+
+
+def kind_of(instance):
+    return _KIND_OF_MODEL.get(type(instance))
+
+
+def index_object(instance, using="main"):
+    """Create or refresh the document of a branch, library or space."""
+    kind = kind_of(instance)
+    title, body = KINDS[kind][1](instance)
+    key = str(instance.pk)
+
+    documents = SearchDocument.objects.using(using)
+    if not documents.filter(kind=kind, key=key).update(title=title, body=body):
+        documents.create(kind=kind, key=key, title=title, body=body)
+    INDEX.document_saved(kind, key, title, body)
+
+
+def remove_object(instance, using="main"):
+    kind = kind_of(instance)
+    key = str(instance.pk)
+    SearchDocument.objects.using(using).filter(kind=kind, key=key).delete()
+    INDEX.document_deleted(kind, key)
+
+
+def rebuild(using="main", batch_size=2000):
+    """Recreate every document from the database. Returns the count."""
+    SearchDocument.objects.using(using).all().delete()
+
+    total = 0
+    for kind, (model, build) in KINDS.items():
+        batch = []
+        for instance in model.objects.using(using).order_by().iterator(chunk_size=batch_size):
+            title, body = build(instance)
+            batch.append(SearchDocument(kind=kind, key=str(instance.pk), title=title, body=body))
+            if len(batch) == batch_size:
+                SearchDocument.objects.using(using).bulk_create(batch)
+                total += len(batch)
+                batch = []
+        SearchDocument.objects.using(using).bulk_create(batch)
+        total += len(batch)
+
+    if fts_enabled(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    INDEX.invalidate()
+    return total
+
+
+# -----------------------------
+# SQLite FTS5
+# -----------------------------
+_fts_tables = {}
+
+
+def fts_enabled(using="main"):
+    """Whether `using` has the FTS5 table (checked once per process)."""
+    if using not in _fts_tables:
+        connection = connections[using]
+        _fts_tables[using] = (
+            connection.vendor == "sqlite"
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[using]
+
+
+def fts_match(terms):
+    """FTS5 MATCH expression for query_terms() output."""
+    return " AND ".join(
+        "(" + " OR ".join(f'"{word}"*' for word in alternatives) + ")"
+        for alternatives in terms
+    )
+
+
+def _search_fts(terms, kinds, limit, using):
+    sql = (
+        f"SELECT d.kind, d.key FROM {FTS_TABLE} "
+        f"JOIN {SearchDocument._meta.db_table} d ON d.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s"
+    )
+    params = [fts_match(terms)]
+    if kinds:
+        sql += f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+        params += kinds
+    sql += f" ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s"
+    params += [TITLE_WEIGHT, BODY_WEIGHT, limit]
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+# -----------------------------
+# Pure-Python fallback
+# -----------------------------
+# Other worker processes don't see our signals, so never trust the index
+# for longer than this.
+INDEX_TTL_SECONDS = 300
+
+# bm25 parameters, FTS5's defaults
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class InvertedIndex:
+    """word -> {document: weight}, scored like bm25().
+
+    A posting's weight is its saturated, length-normalised term frequency
+    (title and body weighted as in FTS5), so a query only multiplies by
+    the word's idf. Average lengths are taken at load time; later single
+    updates reuse them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._postings = defaultdict(dict)
+        self._docs = {}
+        self._words = []
+        self._words_dirty = False
+        self._averages = (1.0, 1.0)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def load(self, using="main"):
+        rows = SearchDocument.objects.using(using).values_list("kind", "key", "title", "body")
+        tokenized = [
+            ((kind, key), tokenize(title), tokenize(body))
+            for kind, key, title, body in rows.iterator(chunk_size=2000)
+        ]
+        count = len(tokenized) or 1
+        averages = (
+            sum(len(title) for _, title, _ in tokenized) / count or 1.0,
+            sum(len(body) for _, _, body in tokenized) / count or 1.0,
+        )
+
+        postings = defaultdict(dict)
+        docs = {}
+        for doc, title, body in tokenized:
+            docs[doc] = self._add(postings, averages, doc, title, body)
+
+        with self._lock:
+            self._postings = postings
+            self._docs = docs
+            self._averages = averages
+            self._words = sorted(postings)
+            self._words_dirty = False
+            self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _add(postings, averages, doc, title_words, body_words):
+        hits = defaultdict(lambda: [0, 0])
+        for word in title_words:
+            hits[word][0] += 1
+        for word in body_words:
+            hits[word][1] += 1
+
+        title_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(title_words) / averages[0])
+        body_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(body_words) / averages[1])
+        for word, (in_title, in_body) in hits.items():
+            postings[word][doc] = (
+                TITLE_WEIGHT * in_title * (BM25_K1 + 1) / (in_title + title_norm)
+                + BODY_WEIGHT * in_body * (BM25_K1 + 1) / (in_body + body_norm)
+            )
+        return tuple(hits)
+
+    def _drop(self, doc):
+        for word in self._docs.pop(doc, ()):
+            postings = self._postings.get(word)
+            if postings is not None:
+                postings.pop(doc, None)
+                if not postings:
+                    del self._postings[word]
+                    self._words_dirty = True
+
+    def document_saved(self, kind, key, title, body):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            doc = (kind, key)
+            self._drop(doc)
+            self._docs[doc] = self._add(
+                self._postings, self._averages, doc, tokenize(title), tokenize(body)
+            )
+            self._words_dirty = True
+
+    def document_deleted(self, kind, key):
+        with self._lock:
+            if self._loaded_at is not None:
+                self._drop((kind, key))
+
+    def _fresh(self, using):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > INDEX_TTL_SECONDS:
+            self.load(using)
+
+    def _expand(self, prefix):
+        start = bisect.bisect_left(self._words, prefix)
+        end = bisect.bisect_left(self._words, prefix + "\uffff")
+        return self._words[start:end]
+
+    def search(self, terms, kinds=None, limit=DEFAULT_LIMIT, using="main"):
+        self._fresh(using)
+        with self._lock:
+            if self._words_dirty:
+                self._words = sorted(self._postings)
+                self._words_dirty = False
+            total = len(self._docs)
+
+            scores = None
+            for alternatives in terms:
+                # Score of each document for its best alternative
+                term_scores = {}
+                for prefix in alternatives:
+                    for word in self._expand(prefix):
+                        postings = self._postings[word]
+                        idf = max(
+                            math.log((total - len(postings) + 0.5) / (len(postings) + 0.5)),
+                            1e-6,
+                        )
+                        if scores is not None and len(scores) < len(postings):
+                            postings = {
+                                doc: postings[doc] for doc in scores if doc in postings
+                            }
+                        for doc, weight in postings.items():
+                            if idf * weight > term_scores.get(doc, 0.0):
+                                term_scores[doc] = idf * weight
+
+                if scores is not None:
+                    term_scores = {
+                        doc: scores[doc] + score
+                        for doc, score in term_scores.items()
+                        if doc in scores
+                    }
+                scores = term_scores
+                if not scores:
+                    return []
+
+        if kinds:
+            scores = {doc: score for doc, score in scores.items() if doc[0] in kinds}
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda hit: (-hit[1], hit[0]))
+        return [doc for doc, _ in ranked]
+
+
+INDEX = InvertedIndex()
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def search(query, kinds=None, limit=DEFAULT_LIMIT, using="main", backend=None):
+    """[(kind, key), ...] for `query`, best match first.
+
+    `backend` is "fts" or "python"; by default FTS5 when it is available.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    kinds = list(kinds) if kinds else None
+
+    if backend is None:
+        backend = "fts" if fts_enabled(using) else "python"
+    if backend == "fts":
+        return [tuple(row) for row in _search_fts(terms, kinds, limit, using)]
+    return INDEX.search(terms, kinds, limit, using)
+
+
+def search_objects(query, kind, queryset=None, limit=DEFAULT_LIMIT):
+    """Objects of one kind matching `query`, best match first."""
+    model = KINDS[kind][0]
+    if queryset is None:
+        queryset = model.objects.all()
+
+    to_pk = model._meta.pk.to_python
+    keys = [to_pk(key) for _, key in search(query, [kind], limit, using=queryset.db)]
+    found = queryset.in_bulk(keys)
+    return [found[key] for key in keys if key in found]
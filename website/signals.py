@@ -0,0 +1,172 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from website import booking_index, rollup, search
+from website.autocomplete import SUGGESTIONS
+from website.closures import CLOSURES
+from website.cache_utils import bump_version
+from website.context_processors import NAV_BRANCHES
+from website.facets import SPACE_FACETS
+from website.geo import LIBRARY_LOCATIONS
+from website.models import (
+    Booking, Branch, Campus, Closure, Library, LibrarySpace, OpeningException, OpeningHours,
+)
+from website.opening_hours import OPENING_HOURS
+
+
+# -----------------------------
+# Booking conflict index
+# -----------------------------
+@receiver(post_save, sender=Booking)
+def update_booking_index(sender, instance, **kwargs):
+    booking_index.booking_saved(instance, using=kwargs.get("using") or "main")
+
+
+@receiver(post_delete, sender=Booking)
+def remove_from_booking_index(sender, instance, **kwargs):
+    booking_index.booking_deleted(instance, using=kwargs.get("using") or "main")
+
+
+# -----------------------------
+# Daily usage rollup
+# -----------------------------
+@receiver(pre_save, sender=Booking)
+def load_rollup_key(sender, instance, update_fields=None, **kwargs):
+    # The row as stored, before this save changes it. Read here, not in
+    # post_init, so loading bookings for pages and exports costs nothing
+    if not rollup.affected_by(update_fields):
+        return
+    instance._rollup_snapshot = None
+    if instance.pk is not None:
+        instance._rollup_snapshot = rollup.stored_snapshot(
+            instance, kwargs.get("using") or "main"
+        )
+
+
+@receiver(post_save, sender=Booking)
+def update_rollup(sender, instance, created, update_fields=None, **kwargs):
+    if not rollup.affected_by(update_fields):
+        return
+    previous = None if created else instance._rollup_snapshot
+    instance._rollup_snapshot = rollup.booking_saved(
+        instance, previous, using=kwargs.get("using") or "main"
+    )
+
+
+@receiver(post_delete, sender=Booking)
+def remove_from_rollup(sender, instance, origin=None, **kwargs):
+    # Deleting a space or library cascades to its daily stats as well
+    origin_model = getattr(origin, "model", type(origin))
+    if origin_model in (LibrarySpace, Library):
+        return
+
+    # Saved earlier through this instance, or else as loaded
+    rollup.booking_deleted(
+        instance, getattr(instance, "_rollup_snapshot", None), using=kwargs.get("using") or "main"
+    )
+
+
+# -----------------------------
+# Navigation branches
+# -----------------------------
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidate_nav_branches(sender, **kwargs):
+    NAV_BRANCHES.invalidate()
+
+
+# -----------------------------
+# space_list facet counts
+# -----------------------------
+@receiver(post_save, sender=LibrarySpace)
+@receiver(post_delete, sender=LibrarySpace)
+@receiver(post_save, sender=Library)
+@receiver(post_delete, sender=Library)
+def invalidate_space_facets(sender, **kwargs):
+    SPACE_FACETS.invalidate()
+
+
+# -----------------------------
+# Cached list counts
+# -----------------------------
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_counts(sender, **kwargs):
+    bump_version("booking_counts")
+
+
+@receiver(post_save, sender=Library)
+@receiver(post_delete, sender=Library)
+@receiver(post_save, sender=Campus)
+@receiver(post_delete, sender=Campus)
+def invalidate_library_counts(sender, **kwargs):
+    bump_version("library_counts")
+
+
+# -----------------------------
+# Search documents
+# -----------------------------
+@receiver(post_save, sender=Branch)
+@receiver(post_save, sender=Library)
+@receiver(post_save, sender=LibrarySpace)
+def update_search_document(sender, instance, **kwargs):
+    search.index_object(instance, using=kwargs.get("using") or "main")
+
+
+@receiver(post_delete, sender=Branch)
+@receiver(post_delete, sender=Library)
+@receiver(post_delete, sender=LibrarySpace)
+def remove_search_document(sender, instance, **kwargs):
+    search.remove_object(instance, using=kwargs.get("using") or "main")
+
+
+# -----------------------------
+# Autocomplete suggestions
+# -----------------------------
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+@receiver(post_save, sender=Campus)
+@receiver(post_delete, sender=Campus)
+@receiver(post_save, sender=Library)
+@receiver(post_delete, sender=Library)
+@receiver(post_save, sender=LibrarySpace)
+@receiver(post_delete, sender=LibrarySpace)
+def invalidate_suggestions(sender, **kwargs):
+    SUGGESTIONS.invalidate()
+
+
+# -----------------------------
+# Library locations
+# -----------------------------
+@receiver(post_save, sender=Library)
+@receiver(post_delete, sender=Library)
+def invalidate_library_locations(sender, **kwargs):
+    LIBRARY_LOCATIONS.invalidate()
+
+
+# -----------------------------
+# Opening hours
+# -----------------------------
+@receiver(post_save, sender=OpeningHours)
+@receiver(post_delete, sender=OpeningHours)
+@receiver(post_save, sender=OpeningException)
+@receiver(post_delete, sender=OpeningException)
+@receiver(post_save, sender=LibrarySpace)
+@receiver(post_delete, sender=LibrarySpace)
+def invalidate_opening_hours(sender, **kwargs):
+    OPENING_HOURS.invalidate()
+
+
+# -----------------------------
+# Closure calendar
+# -----------------------------
+@receiver(post_save, sender=Closure)
+@receiver(post_delete, sender=Closure)
+@receiver(post_save, sender=LibrarySpace)
+@receiver(post_delete, sender=LibrarySpace)
+@receiver(post_save, sender=Library)
+@receiver(post_delete, sender=Library)
+@receiver(post_save, sender=Campus)
+@receiver(post_delete, sender=Campus)
+def invalidate_closures(sender, **kwargs):
+    CLOSURES.invalidate()
@@ -1,3 +1,1363 @@
-from django.test import TestCase
+import datetime
+import io
+import itertools
+import json
+import os
+import random
+import shutil
+import smtplib
+import tempfile
+import threading
+import time
+import zipfile
+from xml.etree import ElementTree
 
-# Create your tests here.
+import psutil
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.db import connections, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from django.utils import timezone
+from social_django.models import UserSocialAuth
+
+from spacebook_project import metrics
+from website import approvals, benchmarks, booking_index, geo, loadtest, outbox, rollup, search
+from website.autocomplete import SUGGESTIONS, suggest
+from website.closures import CLOSURES, closure_during, send_notices
+from website.availability import free_slots_for_day
+from website.context_processors import NAV_BRANCHES
+from website.facets import SPACE_FACETS, facet_counts, filters_from_params
+from website.forms.forms_booking import BookingForm
+from website.models import (
+    Branch, Campus, Closure, Library, LibrarySpace, Booking, BookingDailyStat, BookingSeries,
+    OpeningException, OpeningHours, OutboxEmail,
+)
+from website.opening_hours import OPENING_HOURS, open_intervals
+from website.pagination import DEFAULT_PAGE_SIZE
+from website.recurrence import expand
+from website.reservations import reserve, reserve_series, BookingConflict
+
+
+def make_space(**kwargs):
+    library, _ = Library.objects.get_or_create(
+        library_code="PTAR", defaults={"library_name": "Perpustakaan Tun Abdul Razak"}
+    )
+    fields = {
+        "library": library,
+        "space_name": "Discussion Room 1",
+        "capacity": 6,
+        "available_from": datetime.time(8, 0),
+        "available_to": datetime.time(22, 0),
+    }
+    fields.update(kwargs)
+    return LibrarySpace.objects.create(**fields)
+
+
+def deliver_outbox(minutes=1):
+    """Run the outbox worker once, `minutes` from now."""
+    return outbox.deliver(now=timezone.now() + datetime.timedelta(minutes=minutes))
+
+
+class SpaceBookTestCase(TestCase):
+    databases = {"default", "main"}
+
+    def setUp(self):
+        # Process-wide caches; don't leak them between tests
+        booking_index.invalidate()
+        NAV_BRANCHES.invalidate()
+        SPACE_FACETS.invalidate()
+        search.INDEX.invalidate()
+        SUGGESTIONS.invalidate()
+        geo.LIBRARY_LOCATIONS.invalidate()
+        OPENING_HOURS.invalidate()
+        CLOSURES.invalidate()
+        cache.clear()
+
+
+class ReservationTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        self.space = make_space()
+        self.day = datetime.date(2030, 3, 4)
+
+    def booking(self, start, end):
+        return Booking(
+            user=self.user,
+            space=self.space,
+            booking_date=self.day,
+            start_time=datetime.time(start),
+            end_time=datetime.time(end),
+        )
+
+    def test_reserve_rejects_overlap(self):
+        reserve(self.booking(10, 12))
+
+        with self.assertRaises(BookingConflict):
+            reserve(self.booking(11, 13))
+
+    def test_reserve_allows_adjacent_and_cancelled_slots(self):
+        first = reserve(self.booking(10, 12))
+        reserve(self.booking(12, 13))
+
+        first.status = "CANCELLED"
+        first.save()
+        reserve(self.booking(10, 11))
+
+        self.assertEqual(
+            Booking.objects.exclude(status="CANCELLED").count(), 2
+        )
+
+    def test_index_only_sees_committed_bookings(self):
+        reserve(self.booking(8, 9))
+        before = booking_index.busy_intervals(self.space.pk, self.day)
+
+        class Abort(Exception):
+            pass
+
+        with self.captureOnCommitCallbacks(using="main", execute=True):
+            with self.assertRaises(Abort):
+                with transaction.atomic(using="main"):
+                    reserve(self.booking(10, 11))
+                    raise Abort
+        self.assertEqual(booking_index.busy_intervals(self.space.pk, self.day), before)
+
+        with self.captureOnCommitCallbacks(using="main", execute=True):
+            reserve(self.booking(12, 13))
+        self.assertEqual(
+            booking_index.busy_intervals(self.space.pk, self.day),
+            before + [(datetime.time(12), datetime.time(13))],
+        )
+
+
+class BookingRuleTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        self.space = make_space(buffer_minutes=15, advance_notice=48)
+        self.day = datetime.date(2030, 3, 4)
+        Booking.objects.create(
+            user=self.user, space=self.space, booking_date=self.day,
+            start_time=datetime.time(10), end_time=datetime.time(11),
+        )
+
+    def errors(self, day, start, end):
+        form = BookingForm(
+            {"booking_date": day.isoformat(), "start_time": start, "end_time": end},
+            space=self.space,
+        )
+        return form.errors.get("__all__", [])
+
+    def test_buffer_advance_notice_and_hours(self):
+        self.assertIn("already booked", self.errors(self.day, "10:30", "11:30")[0])
+        self.assertIn("15 minutes", self.errors(self.day, "11:10", "12:00")[0])
+        self.assertEqual(self.errors(self.day, "11:15", "12:00"), [])
+        self.assertIn("opening hours", self.errors(self.day, "21:00", "23:00")[0])
+
+        tomorrow = timezone.localdate() + datetime.timedelta(days=1)
+        self.assertIn("48 hours", self.errors(tomorrow, "12:00", "13:00")[0])
+
+    def test_rules_cost_no_extra_queries(self):
+        self.errors(self.day, "12:00", "13:00")
+
+        with self.assertNumQueries(0, using="main"):
+            self.errors(self.day, "11:10", "12:00")
+            self.errors(self.day, "12:00", "13:00")
+
+        # One booking-index load per new space-day, as before
+        with self.assertNumQueries(1, using="main"):
+            self.errors(self.day + datetime.timedelta(days=1), "12:00", "13:00")
+
+    def test_reserve_honours_the_buffer_in_the_same_query(self):
+        booking = Booking(
+            user=self.user, space=self.space, booking_date=self.day,
+            start_time=datetime.time(11, 5), end_time=datetime.time(12),
+        )
+        with self.assertRaises(BookingConflict):
+            reserve(booking)
+
+        booking.start_time = datetime.time(11, 15)
+        with CaptureQueriesContext(connections["main"]) as queries:
+            reserve(booking)
+        selects = [q["sql"] for q in queries if q["sql"].startswith("SELECT")]
+        # Lock the space (which also reads its buffer), check overlap
+        self.assertEqual(len(selects), 2)
+
+
+class BookingSeriesTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="lecturer", email="lecturer@uitm.edu.my")
+        self.space = make_space()
+        self.monday = datetime.date(2030, 3, 4)
+
+    def test_expand_weekly_with_interval_and_exceptions(self):
+        dates = expand(
+            self.monday, self.monday + datetime.timedelta(weeks=4), "WEEKLY", 2, [0, 2],
+            exceptions=[self.monday + datetime.timedelta(days=16)],
+        )
+        self.assertEqual(
+            [(d - self.monday).days for d in dates], [0, 2, 14, 28],
+        )
+        self.assertEqual(len(expand(self.monday, self.monday + datetime.timedelta(days=9), "DAILY", 3)), 4)
+        with self.assertRaises(ValueError):
+            expand(self.monday, self.monday.replace(year=2031), "DAILY")
+
+    def test_series_skips_clashes_in_one_range_query(self):
+        Booking.objects.create(
+            user=self.user, space=self.space, booking_date=self.monday + datetime.timedelta(weeks=2),
+            start_time=datetime.time(9, 30), end_time=datetime.time(10, 30),
+        )
+        dates = expand(self.monday, self.monday + datetime.timedelta(weeks=13), "WEEKLY")
+        series = BookingSeries(
+            user=self.user, space=self.space, frequency="WEEKLY",
+            starts_on=dates[0], until=dates[-1],
+            start_time=datetime.time(10), end_time=datetime.time(12),
+        )
+        OPENING_HOURS.get()
+        CLOSURES.get()
+
+        with CaptureQueriesContext(connections["main"]) as queries:
+            created, failed = reserve_series(series, dates)
+        selects = [q["sql"] for q in queries if q["sql"].startswith("SELECT")]
+        inserts = [q["sql"] for q in queries if q["sql"].startswith("INSERT INTO \"website_booking\"")]
+        # Lock the space, find the clashes; one INSERT for 13 bookings
+        self.assertEqual(len(selects), 2)
+        self.assertEqual(len(inserts), 1)
+
+        self.assertEqual(len(created), 13)
+        self.assertEqual(list(failed), [self.monday + datetime.timedelta(weeks=2)])
+        self.assertEqual(series.bookings.count(), 13)
+        self.assertTrue(booking_index.has_conflict(
+            self.space.pk, self.monday, datetime.time(11), datetime.time(13)
+        ))
+        stat = BookingDailyStat.objects.get(date=self.monday, space=self.space)
+        self.assertEqual((stat.booking_count, stat.booked_minutes), (1, 120))
+
+    def test_series_view_reports_failed_dates(self):
+        self.client.force_login(self.user)
+        Booking.objects.create(
+            user=self.user, space=self.space, booking_date=self.monday + datetime.timedelta(weeks=1),
+            start_time=datetime.time(10), end_time=datetime.time(11),
+        )
+
+        response = self.client.post(f"/spacebook/space/{self.space.pk}/book/series/", {
+            "frequency": "WEEKLY",
+            "interval": 1,
+            "weekdays": ["0", "3"],
+            "starts_on": "2030-03-04",
+            "until": "2030-03-31",
+            "start_time": "10:00",
+            "end_time": "11:00",
+            "skip_dates": "2030-03-07",
+        })
+
+        self.assertEqual([str(d) for d, _ in response.context["failed"]], ["2030-03-11"])
+        self.assertEqual(len(response.context["created"]), 6)
+        self.assertContains(response, "Already booked.")
+
+
+class BulkDecisionTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create(username="librarian", email="librarian@uitm.edu.my", is_staff=True)
+        self.ali = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        self.siti = User.objects.create(username="siti", email="siti@student.uitm.edu.my")
+        self.space = make_space()
+        self.day = datetime.date(2030, 3, 4)
+
+    def book(self, user, start, end, status="PENDING"):
+        return Booking.objects.create(
+            user=user, space=self.space, booking_date=self.day,
+            start_time=datetime.time(*start), end_time=datetime.time(*end), status=status,
+        )
+
+    def stats(self):
+        return set(BookingDailyStat.objects.values_list("status", "booking_count", "booked_minutes"))
+
+    def test_approve_by_filter_in_one_update(self):
+        self.book(self.ali, (8, 0), (9, 0), status="APPROVED")
+        clash = self.book(self.siti, (8, 30), (9, 30))
+        first = self.book(self.ali, (10, 0), (11, 0))
+        second = self.book(self.siti, (10, 30), (12, 0))
+        third = self.book(self.siti, (13, 0), (14, 0))
+
+        with CaptureQueriesContext(connections["main"]) as queries:
+            decided, skipped = approvals.decide("APPROVED", space_id=self.space.pk, booking_date=self.day)
+        updates = [q["sql"] for q in queries if q["sql"].startswith('UPDATE "website_booking"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn("\"status\" = 'PENDING'", updates[0])
+
+        self.assertEqual({b.pk for b in decided}, {first.pk, third.pk})
+        self.assertEqual(set(skipped), {clash.pk, second.pk})
+        self.assertEqual(
+            set(Booking.objects.filter(status="PENDING").values_list("pk", flat=True)),
+            {clash.pk, second.pk},
+        )
+
+        incremental = self.stats()
+        rollup.rebuild()
+        self.assertEqual(self.stats(), incremental)
+
+        # decide() leaves the emails to its caller
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_reject_selected_from_the_pending_page(self):
+        first = self.book(self.ali, (10, 0), (11, 0))
+        second = self.book(self.ali, (12, 0), (13, 0))
+        untouched = self.book(self.siti, (14, 0), (15, 0))
+        self.assertTrue(booking_index.has_conflict(self.space.pk, self.day, datetime.time(10), datetime.time(11)))
+        self.client.force_login(self.staff)
+
+        with self.captureOnCommitCallbacks(using="main", execute=True):
+            response = self.client.post(
+                "/spacebook/bookings/pending/bulk/",
+                {"action": "reject", "ids": [first.pk, second.pk]},
+            )
+
+        self.assertRedirects(response, "/spacebook/bookings/pending/", fetch_redirect_response=False)
+        self.assertEqual(
+            dict(Booking.objects.values_list("pk", "status")),
+            {first.pk: "REJECTED", second.pk: "REJECTED", untouched.pk: "PENDING"},
+        )
+        self.assertFalse(booking_index.has_conflict(self.space.pk, self.day, datetime.time(10), datetime.time(11)))
+        self.assertEqual(OutboxEmail.objects.filter(kind="rejected").count(), 2)
+        self.assertEqual(mail.outbox, [])
+        # One email covering both of ali's bookings
+        self.assertEqual(deliver_outbox(), {"rows": 2, "emails": 1, "failed": 0})
+        self.assertEqual([m.to for m in mail.outbox], [[self.ali.email]])
+        self.assertIn("12:00-13:00", mail.outbox[0].body)
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """locmem, except that mail to the addresses in `down` fails."""
+    down = set()
+
+    def send_messages(self, messages):
+        if any(self.down.intersection(m.to) for m in messages):
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        return super().send_messages(messages)
+
+
+class OutboxTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ali = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        self.siti = User.objects.create(username="siti", email="siti@student.uitm.edu.my")
+        self.space = make_space(requires_approval=True)
+        self.day = datetime.date(2030, 3, 4)
+
+    def book(self, user, hour):
+        return Booking.objects.create(
+            user=user, space=self.space, booking_date=self.day,
+            start_time=datetime.time(hour), end_time=datetime.time(hour + 1), status="PENDING",
+        )
+
+    def test_booking_and_its_email_commit_together(self):
+        self.client.force_login(self.ali)
+        slot = {"booking_date": "2030-03-04", "start_time": "10:00", "end_time": "11:00"}
+
+        self.client.post(f"/spacebook/space/{self.space.pk}/book/", slot)
+        self.client.post(f"/spacebook/space/{self.space.pk}/book/", slot)
+
+        self.assertEqual(Booking.objects.count(), 1)
+        row = OutboxEmail.objects.get()
+        self.assertEqual((row.user_id, row.kind, row.status), (self.ali.pk, "created", "PENDING"))
+        self.assertIn("Discussion Room 1, 04 Mar 2030 10:00-11:00", row.summary)
+        # Nothing is sent from the request, nor before the digest window
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(outbox.deliver()["rows"], 0)
+
+    def test_approvals_coalesce_into_one_digest(self):
+        for hour in range(8, 18):
+            self.book(self.ali, hour)
+        self.book(self.siti, 18)
+        self.client.force_login(
+            User.objects.create(username="librarian", email="librarian@uitm.edu.my", is_staff=True)
+        )
+        self.client.post("/spacebook/bookings/pending/bulk/", {
+            "action": "approve", "scope": "filter", "space": self.space.pk, "date": "2030-03-04",
+        })
+        self.assertEqual(OutboxEmail.objects.filter(kind="approved").count(), 11)
+
+        with CaptureQueriesContext(connections["main"]) as queries:
+            stats = deliver_outbox()
+        self.assertEqual(stats, {"rows": 11, "emails": 2, "failed": 0})
+        # Claim (SELECT + UPDATE) and one UPDATE for the sent rows
+        self.assertLessEqual(len(queries), 5)
+
+        ali_digest = next(m for m in mail.outbox if m.to == [self.ali.email])
+        self.assertEqual(ali_digest.subject, "SpaceBook: 10 bookings approved")
+        self.assertEqual(ali_digest.body.count("\n- "), 10)
+        self.assertFalse(OutboxEmail.objects.exclude(status="SENT").exists())
+        self.assertEqual(deliver_outbox()["rows"], 0)
+
+    @override_settings(EMAIL_BACKEND="website.tests.FlakyEmailBackend")
+    def test_failed_sends_back_off_then_give_up(self):
+        FlakyEmailBackend.down = {self.ali.email}
+        self.addCleanup(setattr, FlakyEmailBackend, "down", set())
+        outbox.enqueue("created", [self.book(self.ali, 9), self.book(self.siti, 10)])
+
+        now = timezone.now() + datetime.timedelta(minutes=1)
+        self.assertEqual(outbox.deliver(now=now), {"rows": 2, "emails": 1, "failed": 1})
+        self.assertEqual([m.to for m in mail.outbox], [[self.siti.email]])
+        row = OutboxEmail.objects.get(user_id=self.ali.pk)
+        self.assertEqual((row.status, row.attempts), ("PENDING", 1))
+        self.assertIn("SMTPServerDisconnected", row.last_error)
+        self.assertEqual(row.next_attempt_at, now + datetime.timedelta(seconds=outbox.RETRY_BASE_SECONDS))
+
+        # Not due again until the backoff is over, which doubles each time
+        self.assertEqual(outbox.deliver(now=now + datetime.timedelta(seconds=59))["rows"], 0)
+        now += datetime.timedelta(seconds=60)
+        outbox.deliver(now=now)
+        row.refresh_from_db()
+        self.assertEqual(row.next_attempt_at, now + datetime.timedelta(seconds=2 * outbox.RETRY_BASE_SECONDS))
+
+        for _ in range(outbox.MAX_ATTEMPTS - 2):
+            now += datetime.timedelta(days=1)
+            outbox.deliver(now=now)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ("FAILED", outbox.MAX_ATTEMPTS))
+        self.assertEqual(outbox.deliver(now=now + datetime.timedelta(days=1))["rows"], 0)
+
+
+class FreeSlotTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.space = make_space(buffer_minutes=15)
+        self.day = datetime.date(2030, 3, 4)
+
+    def test_bookings_are_widened_by_buffer(self):
+        busy = [
+            (datetime.time(10, 0), datetime.time(11, 0)),
+            (datetime.time(11, 30), datetime.time(12, 0)),
+        ]
+        slots = free_slots_for_day(self.space, self.day, busy)
+
+        self.assertEqual(
+            slots,
+            [
+                (datetime.time(8, 0), datetime.time(9, 45)),
+                (datetime.time(12, 15), datetime.time(22, 0)),
+            ],
+        )
+
+    def test_advance_notice_cuts_the_first_day(self):
+        not_before = datetime.datetime(2030, 3, 4, 18, 30)
+
+        self.assertEqual(
+            free_slots_for_day(self.space, self.day, [], not_before),
+            [(datetime.time(18, 30), datetime.time(22, 0))],
+        )
+        self.assertEqual(
+            free_slots_for_day(self.space, self.day, [], not_before.replace(day=5)),
+            [],
+        )
+
+    def test_availability_api(self):
+        user = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        Booking.objects.create(
+            user=user,
+            space=self.space,
+            booking_date=self.day,
+            start_time=datetime.time(9, 0),
+            end_time=datetime.time(21, 0),
+        )
+
+        response = self.client.get(
+            f"/spacebook/space/{self.space.space_id}/availability/",
+            {"start": "2030-03-04", "end": "2030-03-05"},
+        )
+
+        days = response.json()["days"]
+        self.assertEqual(
+            days[0]["slots"],
+            [{"start": "08:00", "end": "08:45"}, {"start": "21:15", "end": "22:00"}],
+        )
+        self.assertEqual(days[1]["slots"], [{"start": "08:00", "end": "22:00"}])
+
+
+class LibraryGridTests(SpaceBookTestCase):
+
+    def test_grid_is_batched_for_a_hundred_rooms(self):
+        user = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        spaces = [make_space(space_name=f"Room {i:03}") for i in range(100)]
+        day = datetime.date(2030, 3, 4)
+        Booking.objects.bulk_create(
+            Booking(
+                user=user,
+                space=space,
+                booking_date=day,
+                start_time=datetime.time(9 + i % 10, 30),
+                end_time=datetime.time(11 + i % 10, 0),
+            )
+            for i, space in enumerate(spaces)
+        )
+
+        OPENING_HOURS.get()
+        CLOSURES.get()
+
+        # library lookup + spaces + bookings
+        with self.assertNumQueries(3, using="main"):
+            response = self.client.get(
+                "/spacebook/library/PTAR/grid/", {"date": "2030-03-04", "slot": "60"}
+            )
+
+        rows = response.json()["spaces"]
+        self.assertEqual(len(rows), 100)
+        # 08:00-22:00 in hourly slots, first room booked 09:30-11:00
+        self.assertEqual(rows[0]["cells"], ".xx...........")
+
+    def test_grid_htmx_partial(self):
+        make_space()
+
+        response = self.client.get(
+            "/spacebook/library/PTAR/grid/", HTTP_HX_REQUEST="true"
+        )
+
+        self.assertTemplateUsed(response, "website/library/_library_grid.html")
+
+
+class OpeningHoursTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.space = make_space()
+        self.library = self.space.library
+        self.monday = datetime.date(2030, 3, 4)
+
+    def hours(self, weekday, opens, closes, **owner):
+        owner = owner or {"library": self.library}
+        OpeningHours.objects.create(
+            weekday=weekday, opens_at=datetime.time(*opens), closes_at=datetime.time(*closes), **owner
+        )
+
+    def test_space_hours_without_rules(self):
+        self.assertEqual(open_intervals(self.space, self.monday), ((8 * 60, 22 * 60),))
+
+    def test_weekly_split_shift_intersects_space_hours(self):
+        self.hours(0, (7, 0), (12, 0))
+        self.hours(0, (13, 0), (0, 0))
+
+        self.assertEqual(
+            open_intervals(self.space, self.monday),
+            ((8 * 60, 12 * 60), (13 * 60, 22 * 60)),
+        )
+        # No rows for Tuesday once the library has a schedule: closed
+        self.assertEqual(open_intervals(self.space, self.monday + datetime.timedelta(days=1)), ())
+
+    def test_space_schedule_and_exceptions(self):
+        self.hours(0, (8, 0), (18, 0))
+        self.hours(0, (10, 0), (20, 0), space=self.space)
+        OpeningException.objects.create(
+            library=self.library, date=self.monday + datetime.timedelta(days=7), reason="Hari Raya"
+        )
+        OpeningException.objects.create(
+            space=self.space,
+            date=self.monday + datetime.timedelta(days=14),
+            opens_at=datetime.time(9, 0),
+            closes_at=datetime.time(11, 0),
+        )
+
+        self.assertEqual(open_intervals(self.space, self.monday), ((10 * 60, 18 * 60),))
+        self.assertEqual(open_intervals(self.space, self.monday + datetime.timedelta(days=7)), ())
+        self.assertEqual(
+            open_intervals(self.space, self.monday + datetime.timedelta(days=14)),
+            ((9 * 60, 11 * 60),),
+        )
+
+    def test_free_slots_and_booking_form_follow_opening_hours(self):
+        self.hours(0, (9, 0), (12, 0))
+        self.hours(0, (14, 0), (17, 0))
+
+        self.assertEqual(
+            free_slots_for_day(self.space, self.monday, [(datetime.time(10), datetime.time(11))]),
+            [
+                (datetime.time(9), datetime.time(10)),
+                (datetime.time(11), datetime.time(12)),
+                (datetime.time(14), datetime.time(17)),
+            ],
+        )
+
+        def form(start, end):
+            return BookingForm(
+                {"booking_date": "2030-03-04", "start_time": start, "end_time": end},
+                space=self.space,
+            )
+
+        self.assertTrue(form("14:00", "16:00").is_valid())
+        self.assertFalse(form("11:00", "14:00").is_valid())
+        self.assertIn("closed", form("18:00", "19:00").errors["__all__"][0])
+
+
+class ClosureTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        branch = Branch.objects.create(code="SEL", name="Selangor")
+        Campus.objects.create(campus_code="SA", campus_name="Shah Alam", branch=branch)
+        self.space = make_space()
+        self.space.library.campus_code = "SA"
+        self.space.library.save()
+        self.day = datetime.date(2030, 3, 4)
+
+    def close(self, start, end, **scope):
+        tz = timezone.get_current_timezone()
+        return Closure.objects.create(
+            starts_at=datetime.datetime.combine(self.day, datetime.time(*start), tz),
+            ends_at=datetime.datetime.combine(self.day, datetime.time(*end), tz),
+            reason="Renovation",
+            **scope,
+        )
+
+    def test_branch_closure_reaches_spaces_without_queries(self):
+        self.close((12, 0), (14, 0), branch_id="SEL")
+        CLOSURES.get()
+
+        with self.assertNumQueries(0, using="main"):
+            self.assertIsNotNone(closure_during(self.space.pk, self.day, datetime.time(13), datetime.time(15)))
+            self.assertIsNone(closure_during(self.space.pk, self.day, datetime.time(14), datetime.time(15)))
+
+        self.assertEqual(
+            free_slots_for_day(self.space, self.day, []),
+            [(datetime.time(8), datetime.time(12)), (datetime.time(14), datetime.time(22))],
+        )
+        form = BookingForm(
+            {"booking_date": "2030-03-04", "start_time": "11:00", "end_time": "13:00"},
+            space=self.space,
+        )
+        self.assertIn("Renovation", form.errors["__all__"][0])
+
+    def test_notices_go_out_once_per_user(self):
+        ali = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        siti = User.objects.create(username="siti", email="siti@student.uitm.edu.my")
+        for user, start in [(ali, 9), (ali, 13), (siti, 15), (siti, 20)]:
+            Booking.objects.create(
+                user=user, space=self.space, booking_date=self.day,
+                start_time=datetime.time(start), end_time=datetime.time(start + 1),
+            )
+        closure = self.close((8, 0), (18, 0), library_id="PTAR")
+
+        self.assertEqual(send_notices(), (1, 3))
+        self.assertEqual(mail.outbox, [])
+        deliver_outbox()
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [ali.email, siti.email])
+        ali_notice = next(m for m in mail.outbox if m.to == [ali.email])
+        self.assertIn("09:00-10:00", ali_notice.body)
+        self.assertIn("13:00-14:00", ali_notice.body)
+        self.assertIn("Renovation", ali_notice.body)
+
+        closure.refresh_from_db()
+        self.assertIsNotNone(closure.notices_sent_at)
+        self.assertEqual(send_notices(), (0, 0))
+
+
+class BookingReportTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create(
+            username="librarian", email="librarian@uitm.edu.my", is_staff=True
+        )
+        self.client.force_login(self.staff)
+
+        spaces = [make_space(space_name=f"Room {i}") for i in range(3)]
+        statuses = ["APPROVED", "PENDING", "CANCELLED", "APPROVED"]
+        Booking.objects.bulk_create(
+            Booking(
+                user=self.staff,
+                space=spaces[i % 3],
+                booking_date=datetime.date(2030, 3, 1 + i % 20),
+                start_time=datetime.time(8 + i % 12),
+                end_time=datetime.time(9 + i % 12),
+                status=statuses[i % 4],
+                payment_status="PAID" if i % 5 == 0 else "UNPAID",
+            )
+            for i in range(120)
+        )
+        # bulk_create skips the signals that maintain the rollup
+        rollup.rebuild()
+
+    def test_report_query_count(self):
+        # grouped summary + one page of records (nav branches are cached)
+        NAV_BRANCHES.get()
+        with self.assertNumQueries(2, using="main"):
+            response = self.client.get("/spacebook/bookings/report/")
+
+        summary = response.context["summary"]
+        self.assertEqual(summary["total"], 120)
+        self.assertEqual(summary["approved"], 60)
+        self.assertEqual(summary["pending"], 30)
+        self.assertEqual(summary["cancelled"], 30)
+        self.assertEqual(summary["paid"], 24)
+        self.assertEqual(summary["unpaid"], 96)
+        self.assertEqual(response.context["top_spaces"][0]["total"], 40)
+        self.assertEqual(summary["days"], 20)
+        self.assertEqual(summary["avg_per_day"], 6)
+
+    def test_report_pages_cover_every_booking_once(self):
+        seen = []
+        cursor = ""
+        while True:
+            response = self.client.get(
+                "/spacebook/bookings/report/", {"cursor": cursor}
+            )
+            page = response.context["bookings"]
+            seen.extend(b.id for b in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(set(seen), set(Booking.objects.values_list("id", flat=True)))
+
+    def test_csv_export_streams_every_booking(self):
+        response = self.client.get(
+            "/spacebook/bookings/report/export/", {"format": "csv"}
+        )
+
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(lines[0].split(",")[:2], ["Booking ID", "Date"])
+        self.assertEqual(len(lines), 121)
+
+    def test_export_rejects_a_bad_date(self):
+        url = "/spacebook/bookings/report/export/"
+        for value in ("2030-02-30", "yesterday"):
+            response = self.client.get(url, {"format": "csv", "start_date": value})
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(url, {"format": "csv", "sheet": "usage", "end_date": "2030-03-10"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_xlsx_export_has_bookings_and_usage_sheets(self):
+        response = self.client.get(
+            "/spacebook/bookings/report/export/",
+            {"format": "xlsx", "start_date": "2030-03-01", "end_date": "2030-03-10"},
+        )
+
+        workbook = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        bookings = ElementTree.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+        usage = ElementTree.fromstring(workbook.read("xl/worksheets/sheet2.xml"))
+        ns = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+        # header + 6 bookings per day for 10 days
+        self.assertEqual(len(bookings.findall(f"{ns}sheetData/{ns}row")), 61)
+        # header + 3 spaces
+        self.assertEqual(len(usage.findall(f"{ns}sheetData/{ns}row")), 4)
+
+
+class DailyRollupTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        self.space = make_space()
+
+    def stats(self):
+        return {
+            (s.date.day, s.status, s.payment_status): (s.booking_count, s.booked_minutes)
+            for s in BookingDailyStat.objects.filter(booking_count__gt=0)
+        }
+
+    def test_signals_keep_rollup_in_step(self):
+        booking = Booking.objects.create(
+            user=self.user,
+            space=self.space,
+            booking_date=datetime.date(2030, 3, 4),
+            start_time=datetime.time(10, 0),
+            end_time=datetime.time(11, 30),
+        )
+        self.assertEqual(self.stats(), {(4, "PENDING", "UNPAID"): (1, 90)})
+
+        booking = Booking.objects.get(pk=booking.pk)
+        # Loading alone doesn't snapshot; the save reads the stored row
+        self.assertFalse(hasattr(booking, "_rollup_snapshot"))
+        booking.status = "APPROVED"
+        booking.payment_status = "PAID"
+        booking.save()
+        self.assertEqual(self.stats(), {(4, "APPROVED", "PAID"): (1, 90)})
+
+        deferred = Booking.objects.only("id", "status").get(pk=booking.pk)
+        deferred.status = "CANCELLED"
+        deferred.save()
+        self.assertEqual(self.stats(), {(4, "CANCELLED", "PAID"): (1, 90)})
+
+        deferred.delete()
+        self.assertEqual(self.stats(), {})
+
+    def test_fpx_payment_keeps_rollup_in_step(self):
+        booking = Booking.objects.create(
+            user=self.user,
+            space=self.space,
+            booking_date=datetime.date(2030, 3, 4),
+            start_time=datetime.time(10, 0),
+            end_time=datetime.time(11, 0),
+            status="APPROVED",
+        )
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connections["main"]) as queries:
+            self.client.post(f"/spacebook/fpx/{booking.pk}/")
+        # Only the transaction reference changed; the rollup isn't touched
+        self.assertFalse([q for q in queries if "daily_stat" in q["sql"]])
+        self.client.post(f"/spacebook/fpx/{booking.pk}/bank/")
+
+        self.assertEqual(self.stats(), {(4, "APPROVED", "PAID"): (1, 60)})
+        incremental = self.stats()
+        rollup.rebuild()
+        self.assertEqual(self.stats(), incremental)
+
+    def test_rebuild_matches_incremental(self):
+        for hour in (8, 10, 12):
+            Booking.objects.create(
+                user=self.user,
+                space=self.space,
+                booking_date=datetime.date(2030, 3, 4),
+                start_time=datetime.time(hour),
+                end_time=datetime.time(hour + 1),
+            )
+        incremental = self.stats()
+
+        rollup.rebuild()
+
+        self.assertEqual(self.stats(), incremental)
+        self.assertEqual(incremental, {(4, "PENDING", "UNPAID"): (3, 180)})
+
+    def test_deleting_a_space_drops_its_stats(self):
+        Booking.objects.create(
+            user=self.user,
+            space=self.space,
+            booking_date=datetime.date(2030, 3, 4),
+            start_time=datetime.time(10),
+            end_time=datetime.time(11),
+        )
+
+        self.space.delete()
+
+        self.assertFalse(BookingDailyStat.objects.exists())
+
+
+class AmenityFilterTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.projector = make_space(space_name="A", has_projector=True)
+        self.both = make_space(space_name="B", has_projector=True, has_wifi=True)
+        self.wifi = make_space(space_name="C", has_wifi=True)
+
+    def test_mask_follows_amenity_fields(self):
+        bits = LibrarySpace.AMENITY_BITS
+        self.assertEqual(self.both.amenity_mask, bits["has_projector"] | bits["has_wifi"])
+
+        self.wifi.has_whiteboard = True
+        self.wifi.save(update_fields=["has_whiteboard"])
+        self.wifi.refresh_from_db()
+        self.assertEqual(self.wifi.amenity_mask, bits["has_wifi"] | bits["has_whiteboard"])
+
+    def test_space_list_filters_on_every_ticked_amenity(self):
+        response = self.client.get("/spacebook/space/list/", {"projector": "1", "wifi": "1"})
+        self.assertEqual(list(response.context["spaces"]), [self.both])
+
+    def counts(self, **params):
+        return facet_counts(filters_from_params(params))
+
+    def test_amenity_counts_add_to_the_current_filters(self):
+        self.assertEqual(self.counts()["amenities"]["projector"], 2)
+        counts = self.counts(wifi="1")
+        self.assertEqual(counts["total"], 2)
+        self.assertEqual(counts["amenities"]["projector"], 1)
+        self.assertEqual(counts["amenities"]["wifi"], 2)
+
+    def test_select_counts_ignore_their_own_selection(self):
+        self.projector.space_type = "discussion"
+        self.projector.capacity = 12
+        self.projector.save()
+
+        counts = self.counts(type="discussion", projector="1")
+        self.assertEqual(counts["total"], 1)
+        # B has a projector but no type, so it is counted under the blank type
+        self.assertEqual(counts["type"], {"discussion": 1, "": 1})
+        self.assertEqual(counts["capacity"], {"11-20": 1})
+        self.assertEqual(counts["campus"], {None: 1})
+
+    def test_counts_come_from_memory_and_follow_saves(self):
+        self.counts()
+        with self.assertNumQueries(0, using="main"):
+            self.counts(wifi="1", library="PTAR", noise="quiet")
+
+        self.wifi.has_projector = True
+        self.wifi.save()
+        self.assertEqual(self.counts(wifi="1")["amenities"]["projector"], 2)
+
+    def test_space_list_filters_on_facets(self):
+        self.both.space_type = "media"
+        self.both.save()
+        response = self.client.get("/spacebook/space/list/", {"type": "media", "capacity": "5-10"})
+        self.assertEqual(list(response.context["spaces"]), [self.both])
+        self.assertContains(response, "Media / Lab (1)")
+
+
+class PaginationTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        library = Library.objects.create(library_code="PTAR", library_name="PTAR")
+        LibrarySpace.objects.bulk_create(
+            LibrarySpace(
+                library=library,
+                space_name=f"Room {i:02}",
+                capacity=4,
+                available_from=datetime.time(8, 0),
+                available_to=datetime.time(22, 0),
+            )
+            for i in range(DEFAULT_PAGE_SIZE + 5)
+        )
+
+    def test_space_list_loads_the_next_page_over_htmx(self):
+        response = self.client.get("/spacebook/space/list/", {"wifi": ""})
+        page = response.context["spaces"]
+        self.assertEqual(len(page), DEFAULT_PAGE_SIZE)
+        self.assertEqual(response.context["space_count"], DEFAULT_PAGE_SIZE + 5)
+        self.assertContains(response, 'hx-trigger="revealed"')
+
+        response = self.client.get("/spacebook/space/list/" + page.next_url, HTTP_HX_REQUEST="true")
+        self.assertTemplateUsed(response, "website/space/_space_cards.html")
+        self.assertTemplateNotUsed(response, "website/base.html")
+        self.assertEqual(
+            [s.space_name for s in response.context["spaces"]],
+            [f"Room {i:02}" for i in range(DEFAULT_PAGE_SIZE, DEFAULT_PAGE_SIZE + 5)],
+        )
+        self.assertNotContains(response, 'hx-trigger="revealed"')
+
+    def test_booking_count_is_cached_until_a_booking_changes(self):
+        self.client.force_login(self.user)
+        space = LibrarySpace.objects.first()
+        Booking.objects.create(
+            user=self.user, space=space, booking_date=datetime.date(2030, 1, 7),
+            start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+        )
+        self.assertEqual(self.client.get("/spacebook/bookings/my/").context["booking_count"], 1)
+
+        with CaptureQueriesContext(connections["main"]) as queries:
+            self.client.get("/spacebook/bookings/my/")
+        self.assertFalse(any("COUNT(" in q["sql"] for q in queries.captured_queries))
+
+        Booking.objects.create(
+            user=self.user, space=space, booking_date=datetime.date(2030, 1, 8),
+            start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+        )
+        self.assertEqual(self.client.get("/spacebook/bookings/my/").context["booking_count"], 2)
+
+
+class SearchTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.discussion = make_space(
+            space_name="Bilik Perbincangan 2",
+            description="Meja besar dan projektor untuk kumpulan.",
+        )
+        self.cafe = make_space(
+            space_name="Café Corner",
+            description="Quiet reading nook next to the café.",
+            space_type="reading",
+        )
+
+    def keys(self, query, backend):
+        return [key for _, key in search.search(query, ["space"], backend=backend)]
+
+    def test_backends_fold_case_accents_prefixes_and_languages(self):
+        discussion, cafe = str(self.discussion.pk), str(self.cafe.pk)
+        for backend in ("fts", "python"):
+            with self.subTest(backend=backend):
+                self.assertEqual(self.keys("discussion room", backend), [discussion])
+                self.assertEqual(self.keys("perbin", backend), [discussion])
+                self.assertEqual(self.keys("CAFE", backend), [cafe])
+                self.assertEqual(self.keys("bacaan", backend), [cafe])
+                self.assertEqual(self.keys("projector cafe", backend), [])
+
+    def test_title_matches_rank_first(self):
+        make_space(space_name="Reading Room", description="Open plan.")
+        for backend in ("fts", "python"):
+            with self.subTest(backend=backend):
+                self.assertEqual(self.keys("reading", backend)[1], str(self.cafe.pk))
+
+    def test_documents_follow_saves_and_deletes(self):
+        self.keys("kiosk", "python")  # load the Python index
+        self.cafe.description = "Self-service kiosk."
+        self.cafe.save()
+        self.discussion.delete()
+        for backend in ("fts", "python"):
+            with self.subTest(backend=backend):
+                self.assertEqual(self.keys("kiosk", backend), [str(self.cafe.pk)])
+                self.assertEqual(self.keys("perbincangan", backend), [])
+
+    def test_views_use_the_index(self):
+        Branch.objects.create(code="PNG", name="Pulau Pinang", location="Permatang Pauh")
+        Branch.objects.create(code="PRK", name="Perak", location="Seri Iskandar")
+        response = self.client.get("/spacebook/branch/list/", {"q": "permatang"})
+        self.assertEqual([b.code for b in response.context["branches"]], ["PNG"])
+
+        response = self.client.get("/spacebook/search/", {"q": "tun abdul"})
+        self.assertEqual([l.library_code for l in response.context["libraries"]], ["PTAR"])
+        self.assertEqual(response.context["spaces"], [])
+
+
+class AutocompleteTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        png = Branch.objects.create(code="PNG", name="Pulau Pinang", location="Permatang Pauh")
+        Campus.objects.create(campus_code="PNG-BU", branch=png, campus_name="Bertam", role="Main Campus")
+        Library.objects.create(library_code="PTAR", library_name="Perpustakaan Tun Abdul Razak", campus_code="PNG-BU")
+        self.space = make_space(space_name="Bilik Perbincangan Pinang", room_number="B-201")
+
+    def labels(self, query, **kwargs):
+        return [(s.kind, s.label) for s in suggest(query, **kwargs)]
+
+    def test_every_word_is_a_prefix(self):
+        self.assertEqual(self.labels("pu pin"), [("branch", "Pulau Pinang")])
+        self.assertEqual(
+            self.labels("pin"),
+            [("branch", "Pulau Pinang"), ("space", "Bilik Perbincangan Pinang")],
+        )
+        self.assertEqual(self.labels("b-20"), [("space", "Bilik Perbincangan Pinang")])
+        self.assertEqual(self.labels("ptar"), [("library", "Perpustakaan Tun Abdul Razak")])
+        self.assertEqual(self.labels("b", kinds=["campus"], branch="PNG"), [("campus", "Bertam")])
+        self.assertEqual(self.labels("b", kinds=["campus"], branch="PRK"), [])
+
+    def test_suggestions_come_from_memory_and_follow_saves(self):
+        self.client.get("/spacebook/autocomplete/", {"q": "per"})
+        with self.assertNumQueries(0, using="main"):
+            response = self.client.get("/spacebook/autocomplete/", {"q": "per", "kind": "library"})
+            self.client.get("/spacebook/campus/api/by-branch/", {"branch": "PNG"})
+        self.assertEqual(
+            response.json()["results"],
+            [{
+                "kind": "library",
+                "key": "PTAR",
+                "label": "Perpustakaan Tun Abdul Razak",
+                "detail": None,
+                "url": "/spacebook/library/PTAR/",
+            }],
+        )
+
+        self.space.is_active = False
+        self.space.save()
+        self.assertEqual(self.labels("bilik"), [])
+
+
+class NearestLibraryTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        # Shah Alam, Puncak Alam, Arau
+        for code, lat, lng in [("PTAR", 3.0698, 101.5037), ("PUNCAK", 3.2220, 101.4270), ("ARAU", 6.4459, 100.2813)]:
+            Library.objects.create(library_code=code, library_name=code, latitude=lat, longitude=lng)
+        Library.objects.create(library_code="NOWHERE", library_name="No coordinates")
+
+    def test_grid_matches_brute_force(self):
+        rng = random.Random(0)
+        rows = [(i, rng.uniform(1, 7), rng.uniform(99, 120)) for i in range(500)]
+        grid = geo.LocationGrid(rows)
+        for _ in range(50):
+            lat, lng = rng.uniform(0, 8), rng.uniform(98, 121)
+            nearest = [key for _, key in itertools.islice(grid.nearest(lat, lng), 5)]
+            self.assertEqual(nearest, [key for _, key in grid.brute_force(lat, lng, 5)])
+
+        distance, key = next(grid.nearest(rows[7][1], rows[7][2]))
+        self.assertEqual((round(distance, 6), key), (0, 7))
+        self.assertAlmostEqual(geo.haversine_km(3.0698, 101.5037, 6.4459, 100.2813), 398.6, places=0)
+
+    def nearest(self, **params):
+        response = self.client.get("/spacebook/library/api/nearest/", params)
+        return [r["library_code"] for r in response.json()["results"]]
+
+    def test_nearest_libraries_by_distance(self):
+        self.assertEqual(self.nearest(lat=3.07, lng=101.5, k=2), ["PTAR", "PUNCAK"])
+        self.assertEqual(self.nearest(lat=6.4, lng=100.3, max_km=50), ["ARAU"])
+
+        Library.objects.create(library_code="KAMPAR", library_name="K", latitude=4.3, longitude=101.15)
+        self.assertEqual(self.nearest(lat=6.4, lng=100.3, k=2), ["ARAU", "KAMPAR"])
+
+    def test_nearest_with_a_free_room(self):
+        room = make_space(space_name="Group Room", capacity=4)
+        make_space(space_name="Carrel", capacity=1, library=Library.objects.get(pk="PUNCAK"))
+        day = datetime.date(2030, 1, 7)
+        params = {"lat": 3.2, "lng": 101.4, "date": day, "start": "09:00", "end": "10:00", "capacity": 4}
+
+        response = self.client.get("/spacebook/library/api/nearest/", params)
+        self.assertEqual(
+            response.json()["results"][0]["spaces"],
+            [{"space_id": room.space_id, "space_name": "Group Room", "capacity": 4}],
+        )
+
+        Booking.objects.create(
+            user=self.user, space=room, booking_date=day,
+            start_time=datetime.time(9, 30), end_time=datetime.time(11, 0),
+        )
+        self.assertEqual(self.nearest(**params), [])
+        self.assertEqual(self.nearest(**{**params, "start": "11:00", "end": "12:00"}), ["PTAR"])
+
+    def test_free_room_honours_buffer_and_advance_notice(self):
+        room = make_space(space_name="Group Room", capacity=4, buffer_minutes=15)
+        day = datetime.date(2030, 1, 7)
+        params = {"lat": 3.07, "lng": 101.5, "date": day, "start": "11:00", "end": "12:00"}
+        Booking.objects.create(
+            user=self.user, space=room, booking_date=day,
+            start_time=datetime.time(9, 30), end_time=datetime.time(10, 50),
+        )
+        # Ends ten minutes before the slot, inside the 15 minute buffer
+        self.assertEqual(self.nearest(**params), [])
+        self.assertEqual(self.nearest(**{**params, "start": "11:05", "end": "12:00"}), ["PTAR"])
+
+        # Open then, but always less than 48 hours away
+        LibrarySpace.objects.filter(pk=room.pk).update(buffer_minutes=0, advance_notice=48)
+        tomorrow = timezone.localdate() + datetime.timedelta(days=1)
+        self.assertEqual(self.nearest(**{**params, "date": tomorrow, "start": "13:00", "end": "14:00"}), [])
+        self.assertEqual(self.nearest(**{**params, "start": "13:00", "end": "14:00"}), ["PTAR"])
+
+    def test_bad_parameters(self):
+        url = "/spacebook/library/api/nearest/"
+        self.assertEqual(self.client.get(url, {"lng": 101}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"lat": 3, "lng": 101, "start": "10:00"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"lat": 95, "lng": 101}).status_code, 400)
+
+
+class NavBranchCacheTests(SpaceBookTestCase):
+
+    def test_nav_branches_are_cached_until_a_branch_changes(self):
+        Branch.objects.create(code="PNG", name="Pulau Pinang")
+        self.client.get("/spacebook/about/")
+
+        with self.assertNumQueries(0, using="main"):
+            response = self.client.get("/spacebook/about/")
+        self.assertEqual([b.code for b in response.context["nav_branches"]], ["PNG"])
+
+        Branch.objects.create(code="KDH", name="Kedah")
+        response = self.client.get("/spacebook/about/")
+        self.assertEqual(
+            [b.code for b in response.context["nav_branches"]], ["KDH", "PNG"]
+        )
+
+
+class GooglePictureTests(SpaceBookTestCase):
+
+    def test_picture_is_not_reloaded_on_every_page(self):
+        user = User.objects.create(username="ali", email="ali@student.uitm.edu.my")
+        social = UserSocialAuth.objects.create(
+            user=user,
+            provider="google-oauth2",
+            uid="ali@student.uitm.edu.my",
+            extra_data={"picture": "https://example.com/a.png"},
+        )
+        cache.clear()
+        self.client.force_login(user)
+
+        response = self.client.get("/spacebook/about/")
+        self.assertEqual(response.context["google_picture"], "https://example.com/a.png")
+
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = self.client.get("/spacebook/about/")
+        self.assertFalse(any("social_auth" in q["sql"] for q in queries))
+
+        # A token refresh saves extra_data again
+        social.extra_data["picture"] = "https://example.com/b.png"
+        social.save()
+        response = self.client.get("/spacebook/about/")
+        self.assertEqual(response.context["google_picture"], "https://example.com/b.png")
+
+
+class HealthTests(SpaceBookTestCase):
+
+    def test_liveness_touches_nothing(self):
+        with self.assertNumQueries(0, using="default"), self.assertNumQueries(0, using="main"):
+            response = self.client.get("/spacebook/health/live/")
+        self.assertEqual(response.json(), {"status": "ok"})
+
+    def test_readiness_pings_both_databases(self):
+        response = self.client.get("/spacebook/health/ready/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["checks"]["databases"]), {"default", "main"})
+
+    def test_health_returns_cached_system_stats_without_blocking(self):
+        self.client.get("/spacebook/health/")
+
+        started = time.perf_counter()
+        response = self.client.get("/spacebook/health/")
+        elapsed = time.perf_counter() - started
+
+        self.assertIn("cpu_percent", response.json()["system"])
+        self.assertLess(elapsed, 0.1)
+
+
+class MetricsTests(SpaceBookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        self.enterContext(override_settings(METRICS_DIR=folder))
+
+    def test_metrics_report_latency_and_queries_per_view(self):
+        make_space()
+        self.client.get("/spacebook/space/list/")
+
+        body = self.client.get("/spacebook/metrics/").content.decode()
+
+        self.assertIn('spacebook_requests_total{view="space_list",status="200"}', body)
+        self.assertIn(
+            'spacebook_request_duration_seconds_bucket{view="space_list",le="+Inf"}', body
+        )
+        self.assertIn('spacebook_db_queries_total{view="space_list",database="main"}', body)
+        self.assertIn(
+            'spacebook_db_lock_wait_seconds_total{view="space_list",database="main"}', body
+        )
+
+    def test_metrics_sum_files_from_other_live_workers(self):
+        metrics.store.flush(force=True)
+        with open(os.path.join(metrics.metrics_dir(), metrics.store.filename)) as f:
+            ours = json.load(f)
+
+        # Pretend the test runner's parent process is another worker
+        parent = psutil.Process().parent()
+        other = f"{parent.pid}-{int(parent.create_time())}.json"
+        with open(os.path.join(metrics.metrics_dir(), other), "w") as f:
+            json.dump({"requests": [["home", "200", 5]], "latency": [], "queries": []}, f)
+
+        requests, _, _ = metrics.collect()
+        before = dict((tuple(r[:2]), r[2]) for r in ours["requests"])
+        self.assertEqual(requests[("home", "200")], before.get(("home", "200"), 0) + 5)
+
+    def test_counts_of_exited_workers_are_kept(self):
+        folder = metrics.metrics_dir()
+        metrics.store.flush(force=True)
+        base = metrics.collect()[0].get(("home", "200"), 0)
+
+        # Our pid with another start time: a worker that has since exited
+        for i, count in enumerate((5, 7)):
+            with open(os.path.join(folder, f"{os.getpid()}-{i}.json"), "w") as f:
+                json.dump({
+                    "requests": [["home", "200", count]],
+                    "latency": [],
+                    "queries": [["home", "main", count, 0.5]],
+                }, f)
+            requests, _, queries = metrics.collect()
+            self.assertFalse(os.path.exists(os.path.join(folder, f"{os.getpid()}-{i}.json")))
+
+        self.assertEqual(requests[("home", "200")], base + 12)
+        self.assertEqual(queries[("home", "main")], [12, 1.0, 0.0])
+        # and still there on the next scrape
+        self.assertEqual(metrics.collect()[0][("home", "200")], base + 12)
+
+
+class QueryBudgetTests(SpaceBookTestCase):
+
+    def test_every_named_route_has_a_budget(self):
+        names = {
+            p.name for p in get_resolver("website.urls").url_patterns if p.name
+        }
+        self.assertEqual(names - {r.name for r in benchmarks.ROUTES}, set())
+
+    def test_routes_stay_within_query_budget(self):
+        data = benchmarks.seed(**benchmarks.SCALES["test"])
+        student, staff = Client(), Client()
+        student.force_login(data.student)
+        staff.force_login(data.staff)
+
+        results = benchmarks.sweep({None: Client(), "student": student, "staff": staff}, data)
+
+        for name, result in results.items():
+            with self.subTest(route=name):
+                self.assertLess(result["status"], 400)
+                self.assertLessEqual(result["queries"], result["budget"])
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    databases = {"default", "main"}
+    workers = 8
+
+    def setUp(self):
+        booking_index.invalidate()
+
+    def test_parallel_bookings_for_one_slot_have_one_winner(self):
+        users = [
+            User.objects.create(username=f"user{i}", email=f"user{i}@uitm.edu.my")
+            for i in range(self.workers)
+        ]
+        space = make_space()
+        barrier = threading.Barrier(self.workers)
+        results = []
+
+        def attempt(user):
+            booking = Booking(
+                user=user,
+                space_id=space.space_id,
+                booking_date=datetime.date(2030, 3, 4),
+                start_time=datetime.time(10, 0),
+                end_time=datetime.time(11, 0),
+            )
+            try:
+                barrier.wait()
+                reserve(booking)
+                results.append("ok")
+            except BookingConflict:
+                results.append("conflict")
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=attempt, args=(u,)) for u in users]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results.count("ok"), 1)
+        self.assertEqual(results.count("conflict"), self.workers - 1)
+        self.assertEqual(Booking.objects.filter(space=space).count(), 1)
+
+
+class LoadTestTests(TransactionTestCase):
+    # Virtual users run on their own threads, so the seeded rows must be
+    # committed for them to see
+    databases = {"default", "main"}
+
+    def setUp(self):
+        booking_index.invalidate()
+        NAV_BRANCHES.invalidate()
+
+    def test_parse_mix(self):
+        self.assertEqual(loadtest.parse_mix("browse=3, book"), {"browse": 3, "book": 1})
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix("checkout=5")
+
+    def test_run_reports_every_request(self):
+        first_day = datetime.date(2030, 1, 6)
+        data = benchmarks.seed(**benchmarks.SCALES["test"], first_day=first_day)
+        students = list(User.objects.filter(is_staff=False).order_by("pk")[:2])
+        pools = loadtest.Pools(students, first_day, days=7)
+
+        stats, elapsed = loadtest.run(
+            loadtest.ClientTarget, students, data.staff, pools,
+            loadtest.DEFAULT_MIX, concurrency=2, total=40, seed=1,
+        )
+        report = loadtest.summarize(stats, elapsed, lock_wait=0.0)
+
+        sent = sum(s["requests"] + s["skipped"] for s in report["scenarios"].values())
+        self.assertEqual(sent, 40)
+        self.assertEqual(report["error_rate"], 0)
+        self.assertLessEqual(set(report["scenarios"]), set(loadtest.SCENARIOS))
@@ -17,6 +17,8 @@ urlpatterns = [
     path("profile/", views.profile, name="profile"),
     path("about/", views.about, name="about"),
     path("blank/", views.blank, name="blank"),
+    path("search/", views.search_view, name="search"),
+    path("autocomplete/", views.autocomplete_api, name="autocomplete_api"),
     # Branch routes
     path("branch/embed/", views_branch.branch_list_embed, name="branch_list_embed"),
     path("branch/list/", views_branch.branch_list, name="branch_list"),
@@ -34,24 +36,30 @@ urlpatterns = [
     path("library/list/", views_library.library_list, name="library_list"),
     path("library/create/", views_library.library_create, name="library_create"),
     path("library/delete/<str:library_code>/", views_library.library_delete, name="library_delete"),
+    path("library/api/nearest/", views_library.library_nearest_api, name="library_nearest_api"),
     path("campus/api/by-branch/", views_campus.campus_by_branch_api, name="campus_by_branch_api",),
     path("library/edit/<str:library_code>/", views_library.library_edit, name="library_edit"),
+    path("library/<str:library_code>/grid/", views_library.library_grid, name="library_grid"),
     path("library/<str:library_code>/", views_library.library_detail, name="library_detail"),
     # Space routes
     path("space/list/", views_space.space_list, name="space_list"),
     path("space/create/", views_space.space_create, name="space_create"),
     path("space/<int:space_id>/", views_space.space_detail, name="space_detail"),
+    path("space/<int:space_id>/availability/", views_space.space_availability_api, name="space_availability_api"),
     path("space/edit/<int:space_id>/", views_space.space_edit, name="space_edit"),
     path("space/delete/<int:space_id>/", views_space.space_delete, name="space_delete"),
     # Booking routes
     path("space/<int:space_id>/book/",views_booking.booking_create,name="booking_create"),
+    path("space/<int:space_id>/book/series/",views_booking.booking_series_create,name="booking_series_create"),
     path("bookings/my/",views_booking.my_bookings,name="my_bookings"),
     path("bookings/<int:booking_id>/cancel/",views_booking.cancel_booking,name="cancel_booking"),
     # Admin Booking routes
     path("bookings/pending/",views_booking.pending_bookings,name="pending_bookings"),
+    path("bookings/pending/bulk/",views_booking.bulk_decide_bookings,name="bulk_decide_bookings"),
     path("bookings/<int:booking_id>/approve/",views_booking.approve_booking,name="approve_booking"),
     path("bookings/<int:booking_id>/reject/",views_booking.reject_booking,name="reject_booking"),
     path("bookings/report/",views_booking.booking_report,name="booking_report"),
+    path("bookings/report/export/",views_booking.booking_report_export,name="booking_report_export"),
     path("fpx/<int:booking_id>/", views_payment.fpx_start, name="fpx_start"),
     path("fpx/<int:booking_id>/bank/", views_payment.fpx_bank, name="fpx_bank"),
 
@@ -1,15 +1,18 @@
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 
-from ..models import Branch
+from website import autocomplete, search
+from ..models import Branch, LibrarySpace
 
 
 def home(request):
     query = request.GET.get("q", "")
 
-    branches = Branch.objects.filter(
-        name__icontains=query
-    ).order_by("name")
+    if query:
+        branches = search.search_objects(query, "branch")
+    else:
+        branches = Branch.objects.order_by("name")
 
     return render(
         request,
@@ -21,6 +24,43 @@ def home(request):
     )
 
 
+def search_view(request):
+    query = request.GET.get("q", "").strip()
+    libraries = spaces = []
+
+    if query:
+        libraries = search.search_objects(query, "library", limit=20)
+        spaces = search.search_objects(
+            query, "space", LibrarySpace.objects.select_related("library"), limit=30
+        )
+
+    return render(
+        request,
+        "website/search.html",
+        {
+            "query": query,
+            "libraries": libraries,
+            "spaces": spaces,
+        }
+    )
+
+
+def autocomplete_api(request):
+    kinds = [k for k in request.GET.get("kind", "").split(",") if k in autocomplete.KIND_ORDER]
+    try:
+        limit = int(request.GET.get("limit", autocomplete.DEFAULT_LIMIT))
+    except ValueError:
+        limit = autocomplete.DEFAULT_LIMIT
+    limit = max(1, min(limit, autocomplete.MAX_LIMIT))
+
+    suggestions = autocomplete.suggest(
+        request.GET.get("q", ""),
+        kinds=kinds,
+        branch=request.GET.get("branch") or None,
+        limit=limit,
+    )
+    return JsonResponse({"results": [s.as_json() for s in suggestions]})
+
 
 @login_required
 def profile(request):
@@ -1,10 +1,35 @@
+import datetime
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Count
+from django.db import transaction
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.template.defaultfilters import pluralize
+from django.utils.dateparse import parse_date
 
 from website.models import LibrarySpace, Booking
-from website.forms.forms_booking import BookingForm
+from website.forms.forms_booking import BookingForm, BookingSeriesForm
+from website.reservations import reserve, reserve_series, BookingConflict
+from website.pagination import keyset_page, paginate
+from website.cache_utils import cached_count
+from website.reports import usage_by_space, usage_by_library, summarize
+from website import approvals, exports, outbox
+
+
+def attach_users(bookings):
+    """Load booking.user for a list of bookings in one batched lookup.
+
+    Users live in the default database, so select_related can't join them.
+    """
+    bookings = list(bookings)
+    users = User.objects.in_bulk({b.user_id for b in bookings})
+    for booking in bookings:
+        if booking.user_id in users:
+            booking.user = users[booking.user_id]
+    return bookings
 
 
 # -----------------------------
@@ -13,7 +38,7 @@ from website.forms.forms_booking import BookingForm
 @login_required
 def booking_create(request, space_id):
     space = get_object_or_404(
-        LibrarySpace.objects.using("main"),
+        LibrarySpace.objects.using("main").select_related("library"),
         space_id=space_id
     )
 
@@ -36,8 +61,14 @@ def booking_create(request, space_id):
             if space.requires_payment:
                 booking.payment_status = "UNPAID"
 
-            booking.save()
-            return redirect("space_detail", space_id=space.space_id)
+            try:
+                with transaction.atomic(using="main"):
+                    reserve(booking)
+                    outbox.enqueue("created", [booking])
+            except BookingConflict as e:
+                form.add_error(None, str(e))
+            else:
+                return redirect("space_detail", space_id=space.space_id)
     else:
         form = BookingForm(space=space)
 
@@ -47,20 +78,67 @@ def booking_create(request, space_id):
     })
 
 
+# -----------------------------
+# Create recurring booking series
+# -----------------------------
+@login_required
+def booking_series_create(request, space_id):
+    space = get_object_or_404(
+        LibrarySpace.objects.using("main").select_related("library"),
+        space_id=space_id
+    )
+
+    if not space.is_active:
+        return redirect("space_detail", space_id=space.space_id)
+
+    created, failed = None, None
+    if request.method == "POST":
+        form = BookingSeriesForm(request.POST)
+        if form.is_valid():
+            series = form.save(commit=False)
+            series.user = request.user
+            series.space = space
+
+            with transaction.atomic(using="main"):
+                created, failed = reserve_series(
+                    series,
+                    form.cleaned_data["dates"],
+                    status="PENDING" if space.requires_approval else "APPROVED",
+                )
+                outbox.enqueue("created", created)
+            if created and not failed:
+                messages.success(request, f"Booked all {len(created)} dates.")
+                return redirect("my_bookings")
+    else:
+        form = BookingSeriesForm()
+
+    return render(request, "website/booking/booking_series_form.html", {
+        "form": form,
+        "space": space,
+        "created": created,
+        "failed": sorted(failed.items()) if failed else failed,
+    })
+
+
 # -----------------------------
 # My bookings (user)
 # -----------------------------
 @login_required
 def my_bookings(request):
-    bookings = (
-        Booking.objects.using("main")
-        .select_related("space", "space__library")
-        .filter(user=request.user)
-        .order_by("-created_at")
+    mine = Booking.objects.using("main").filter(user=request.user)
+    bookings = paginate(
+        request, mine.select_related("space", "space__library"), ["-created_at", "-id"]
     )
 
+    if request.htmx:
+        # Infinite scroll: just the next page of rows
+        return render(request, "website/booking/_my_booking_rows.html", {
+            "bookings": bookings,
+        })
+
     return render(request, "website/booking/my_bookings.html", {
         "bookings": bookings,
+        "booking_count": cached_count("booking_counts", f"user:{request.user.pk}", mine),
     })
 
 
@@ -70,14 +148,16 @@ def my_bookings(request):
 @login_required
 def cancel_booking(request, booking_id):
     booking = get_object_or_404(
-        Booking.objects.using("main"),
+        Booking.objects.using("main").select_related("space"),
         id=booking_id,
         user=request.user
     )
 
     if booking.status not in ["CANCELLED", "REJECTED"]:
         booking.status = "CANCELLED"
-        booking.save()
+        with transaction.atomic(using="main"):
+            booking.save(update_fields=["status", "updated_at"])
+            outbox.enqueue("cancelled", [booking])
         messages.success(request, "Booking has been cancelled.")
 
     return redirect("my_bookings")
@@ -91,18 +171,96 @@ def pending_bookings(request):
     if not request.user.is_staff:
         return redirect("my_bookings")
 
-    bookings = (
-        Booking.objects.using("main")
-        .select_related("space", "space__library")
-        .filter(status="PENDING")
-        .order_by("booking_date", "start_time")
+    pending = Booking.objects.using("main").filter(status="PENDING")
+
+    # Narrow to one space and/or date, e.g. to decide them all at once
+    filters = _pending_filters(request.GET)
+    if filters.get("space_id"):
+        pending = pending.filter(space_id=filters["space_id"])
+    if filters.get("booking_date"):
+        pending = pending.filter(booking_date=filters["booking_date"])
+
+    bookings = paginate(
+        request,
+        pending.select_related("space", "space__library"),
+        ["booking_date", "start_time", "id"],
     )
+    attach_users(bookings.items)
+
+    if request.htmx:
+        # Infinite scroll: just the next page of rows
+        return render(request, "website/booking/_pending_booking_rows.html", {
+            "bookings": bookings,
+        })
 
+    count_key = "pending:{space_id}:{booking_date}".format(
+        space_id=filters.get("space_id") or "", booking_date=filters.get("booking_date") or ""
+    )
     return render(request, "website/booking/pending_bookings.html", {
         "bookings": bookings,
+        "booking_count": cached_count("booking_counts", count_key, pending),
+        "filters": filters,
     })
 
 
+def _pending_filters(params):
+    """{"space_id": int, "booking_date": date} from ?space=&date=, if valid."""
+    filters = {}
+    space = params.get("space", "")
+    if space.isdigit():
+        filters["space_id"] = int(space)
+    try:
+        filters["booking_date"] = datetime.date.fromisoformat(params.get("date", ""))
+    except ValueError:
+        pass
+    return filters
+
+
+# -----------------------------
+# Bulk approve / reject (librarian)
+# -----------------------------
+@login_required
+def bulk_decide_bookings(request):
+    if not request.user.is_staff:
+        return redirect("my_bookings")
+    if request.method != "POST":
+        return redirect("pending_bookings")
+
+    decision = {"approve": "APPROVED", "reject": "REJECTED"}.get(request.POST.get("action"))
+    filters = _pending_filters(request.POST)
+    back = redirect("pending_bookings")
+    if filters:
+        back["Location"] += "?" + urlencode({
+            "space": filters.get("space_id", ""),
+            "date": filters.get("booking_date", ""),
+        })
+
+    if decision is None:
+        messages.error(request, "Choose approve or reject.")
+        return back
+
+    if request.POST.get("scope") == "filter" and not filters:
+        messages.error(request, "Filter by space or date before deciding them all.")
+        return back
+
+    with transaction.atomic(using="main"):
+        if request.POST.get("scope") == "filter":
+            decided, skipped = approvals.decide(decision, **filters)
+        else:
+            ids = [int(i) for i in request.POST.getlist("ids") if i.isdigit()]
+            decided, skipped = approvals.decide(decision, ids=ids) if ids else ([], {})
+        outbox.enqueue(decision.lower(), decided)
+
+    verb = "approved" if decision == "APPROVED" else "rejected"
+    messages.success(request, f"{len(decided)} booking{pluralize(len(decided))} {verb}.")
+    if skipped:
+        messages.warning(
+            request,
+            f"{len(skipped)} left pending because they overlap an approved booking.",
+        )
+    return back
+
+
 # -----------------------------
 # Approve booking (librarian)
 # -----------------------------
@@ -112,13 +270,15 @@ def approve_booking(request, booking_id):
         return redirect("my_bookings")
 
     booking = get_object_or_404(
-        Booking.objects.using("main"),
+        Booking.objects.using("main").select_related("space"),
         id=booking_id,
         status="PENDING"
     )
 
     booking.status = "APPROVED"
-    booking.save()
+    with transaction.atomic(using="main"):
+        booking.save(update_fields=["status", "updated_at"])
+        outbox.enqueue("approved", [booking])
 
     messages.success(request, "Booking approved.")
     return redirect("pending_bookings")
@@ -133,13 +293,15 @@ def reject_booking(request, booking_id):
         return redirect("my_bookings")
 
     booking = get_object_or_404(
-        Booking.objects.using("main"),
+        Booking.objects.using("main").select_related("space"),
         id=booking_id,
         status="PENDING"
     )
 
     booking.status = "REJECTED"
-    booking.save()
+    with transaction.atomic(using="main"):
+        booking.save(update_fields=["status", "updated_at"])
+        outbox.enqueue("rejected", [booking])
 
     messages.warning(request, "Booking rejected.")
     return redirect("pending_bookings")
@@ -168,33 +330,92 @@ def booking_report(request):
     if end_date:
         qs = qs.filter(booking_date__lte=end_date)
 
-    # Summary
-    summary = {
-        "total": qs.count(),
-        "approved": qs.filter(status="APPROVED").count(),
-        "pending": qs.filter(status="PENDING").count(),
-        "cancelled": qs.filter(status="CANCELLED").count(),
-        "paid": qs.filter(payment_status="PAID").count(),
-        "unpaid": qs.filter(payment_status="UNPAID").count(),
-    }
-
-    # Per-space usage
-    space_usage = (
-        qs.values(
-            "space__space_name",
-            "space__library__library_name"
-        )
-        .annotate(total=Count("id"))
-        .order_by("-total")
-    )
-
+    # Summary + per-space usage (one grouped query on the daily rollup)
+    space_usage = usage_by_space(start_date, end_date)
+    summary = summarize(space_usage, start_date, end_date)
     top_spaces = space_usage[:5]
 
+    # Detailed records, one keyset page at a time
+    bookings = keyset_page(
+        qs,
+        ["-booking_date", "-start_time", "-id"],
+        cursor=request.GET.get("cursor"),
+    )
+
     return render(request, "website/booking/booking_report.html", {
-        "bookings": qs.order_by("-booking_date", "-start_time"),
+        "bookings": bookings,
         "summary": summary,
         "space_usage": space_usage,
+        "library_usage": usage_by_library(space_usage),
         "top_spaces": top_spaces,
         "start_date": start_date,
         "end_date": end_date,
     })
+
+
+# -----------------------------
+# Booking report export (librarian)
+# -----------------------------
+@login_required
+def booking_report_export(request):
+    if not request.user.is_staff:
+        return redirect("my_bookings")
+
+    # Parsed once, so both sheets filter on the same dates
+    try:
+        start_date = _query_date(request.GET, "start_date")
+        end_date = _query_date(request.GET, "end_date")
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    export_format = request.GET.get("format", "csv")
+
+    bookings = (
+        "Bookings",
+        exports.BOOKING_COLUMNS,
+        exports.booking_rows(start_date, end_date),
+    )
+    usage = (
+        "Usage by Space",
+        exports.USAGE_COLUMNS,
+        exports.usage_rows(start_date, end_date),
+    )
+
+    filename = "booking-report"
+    if start_date or end_date:
+        filename += f"_{start_date or 'start'}_{end_date or 'end'}"
+
+    if export_format == "xlsx":
+        response = StreamingHttpResponse(
+            exports.stream_xlsx([bookings, usage]),
+            content_type=(
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            ),
+        )
+        filename += ".xlsx"
+    else:
+        # CSV holds one sheet per file
+        title, columns, rows = usage if request.GET.get("sheet") == "usage" else bookings
+        response = StreamingHttpResponse(
+            exports.stream_csv(columns, rows), content_type="text/csv"
+        )
+        if title == usage[0]:
+            filename += "_usage"
+        filename += ".csv"
+
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _query_date(params, name):
+    """Date from ?name=YYYY-MM-DD, or None if absent. Raises ValueError
+    if it can't be parsed."""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"{name} must be a date as YYYY-MM-DD.")
+    return parsed
@@ -6,6 +6,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 
+from website import search
 from ..models import Branch
 from website.forms.forms_branch import BranchForm
 
@@ -36,9 +37,10 @@ def branch_detail(request, code):
 def branch_list(request):
     query = request.GET.get("q", "")
 
-    branches = Branch.objects.filter(
-        name__icontains=query
-    ).order_by("name")
+    if query:
+        branches = search.search_objects(query, "branch")
+    else:
+        branches = Branch.objects.order_by("name")
 
     view_mode = request.GET.get("view", "grid")
 
@@ -57,9 +59,10 @@ def branch_list(request):
 def branch_list_embed(request):
     query = request.GET.get("q", "")
 
-    branches = Branch.objects.filter(
-        name__icontains=query
-    ).order_by("name")
+    if query:
+        branches = search.search_objects(query, "branch")
+    else:
+        branches = Branch.objects.order_by("name")
 
     view_mode = request.GET.get("view", "grid")
 
@@ -1,11 +1,12 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from website import autocomplete
 from website.models import Campus
 from website.forms.forms_campus import CampusForm
 from django.http import JsonResponse
 
 
 def campus_list(request):
-    campuses = Campus.objects.all()
+    campuses = Campus.objects.select_related("branch")
     return render(request, "website/campus/campus_list.html", {"campuses": campuses})
 
 
@@ -60,15 +61,12 @@ def campus_by_branch_api(request):
     data = []
 
     if branch_code:
-        campuses = Campus.objects.filter(branch__code=branch_code).order_by(
-            "campus_name"
-        )
-
-        for c in campuses:
+        # From the in-memory suggestion store, not the database
+        for c in autocomplete.campuses_of(branch_code):
             data.append(
                 {
-                    "campus_code": c.campus_code,
-                    "campus_name": c.campus_name,
+                    "campus_code": c.key,
+                    "campus_name": c.label,
                 }
             )
 
@@ -1,8 +1,16 @@
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
 from website.models import Library
 from website.forms.forms_library import LibraryForm
 from website.utils import save_library_image
+from website import geo
+from website.availability import library_day_grid
+from website.cache_utils import cached_count
+from website.pagination import paginate
 from django.shortcuts import get_object_or_404
 import os
 from django.conf import settings
@@ -40,6 +48,17 @@ def library_list(request):
     if campus_code:
         libraries = libraries.filter(campus_code=campus_code)
 
+    library_count = cached_count(
+        "library_counts", f"{branch_code}:{campus_code}", libraries
+    )
+    libraries = paginate(request, libraries, ["library_name", "library_code"])
+
+    if request.htmx:
+        # Infinite scroll: just the next page of cards
+        return render(
+            request, "website/library/_library_cards.html", {"libraries": libraries}
+        )
+
     # Branch dropdown (first)
     branches = Branch.objects.all().order_by("name")
 
@@ -67,6 +86,7 @@ def library_list(request):
         "website/library/library_list.html",
         {
             "libraries": libraries,
+            "library_count": library_count,
             "branches": branches,
             "campuses": campuses,
             "selected_branch": branch_code,
@@ -90,7 +110,60 @@ def library_detail(request, library_code):
         request,
         "website/library/library_detail.html",
         {
-            "library": library
+            "library": library,
+            "today": timezone.localdate(),
+        }
+    )
+
+
+# Allowed grid widths in minutes
+GRID_SLOT_MINUTES = (15, 30, 60)
+
+
+def library_grid(request, library_code):
+    library = get_object_or_404(Library, library_code=library_code)
+
+    try:
+        day = parse_date(request.GET.get("date") or "") or timezone.localdate()
+    except ValueError:
+        day = timezone.localdate()
+
+    slot_minutes = request.GET.get("slot", "60")
+    slot_minutes = int(slot_minutes) if slot_minutes.isdigit() else 60
+    if slot_minutes not in GRID_SLOT_MINUTES:
+        slot_minutes = 60
+
+    labels, rows = library_day_grid(library, day, slot_minutes)
+
+    if request.htmx:
+        return render(
+            request,
+            "website/library/_library_grid.html",
+            {
+                "library": library,
+                "day": day,
+                "labels": labels,
+                "rows": [(row, row.cells(len(labels))) for row in rows],
+            }
+        )
+
+    return JsonResponse(
+        {
+            "library_code": library.library_code,
+            "date": day.isoformat(),
+            "slot_minutes": slot_minutes,
+            "slots": [t.strftime("%H:%M") for t in labels],
+            "spaces": [
+                {
+                    "space_id": row.space_id,
+                    "space_name": row.space_name,
+                    "capacity": row.capacity,
+                    "booked_mask": row.booked,
+                    "closed_mask": row.closed,
+                    "cells": row.cells(len(labels)),
+                }
+                for row in rows
+            ],
         }
     )
 
@@ -202,3 +275,67 @@ def library_delete(request, library_code):
         }
     )
 
+
+# -----------------------------
+# Nearest libraries (JSON)
+# -----------------------------
+def library_nearest_api(request):
+    """?lat=&lng= [&k=&max_km=] [&date=&start=&end=] [&capacity=]
+
+    With start/end (and/or capacity) only libraries with a free space
+    that fits count, and those spaces are listed.
+    """
+    try:
+        lat = float(request.GET["lat"])
+        lng = float(request.GET["lng"])
+        k = int(request.GET.get("k") or geo.DEFAULT_K)
+        max_km = float(request.GET["max_km"]) if request.GET.get("max_km") else None
+        capacity = int(request.GET.get("capacity") or 0)
+        day = parse_date(request.GET.get("date") or "") or timezone.localdate()
+        start = parse_time(request.GET.get("start") or "")
+        end = parse_time(request.GET.get("end") or "")
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {"error": "lat and lng are required; k, max_km and capacity are numbers; "
+                      "date is YYYY-MM-DD; start and end are HH:MM."},
+            status=400,
+        )
+
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return JsonResponse({"error": "lat/lng out of range."}, status=400)
+    if bool(start) != bool(end) or (start and end <= start):
+        return JsonResponse({"error": "Give both start and end, with end after start."}, status=400)
+    k = max(1, min(k, geo.MAX_K))
+
+    availability = None
+    if start or capacity:
+        availability = (day, start, end, capacity)
+
+    results = []
+    for distance, library, spaces in geo.nearest_libraries(lat, lng, k, max_km, availability):
+        result = {
+            "library_code": library.library_code,
+            "library_name": library.library_name,
+            "distance_km": round(distance, 3),
+            "latitude": library.latitude,
+            "longitude": library.longitude,
+            "url": request.build_absolute_uri(
+                reverse("library_detail", args=[library.library_code])
+            ),
+        }
+        if availability is not None:
+            result["spaces"] = [
+                {"space_id": s.space_id, "space_name": s.space_name, "capacity": s.capacity}
+                for s in spaces
+            ]
+        results.append(result)
+
+    return JsonResponse(
+        {
+            "date": day.isoformat() if start else None,
+            "start": start.strftime("%H:%M") if start else None,
+            "end": end.strftime("%H:%M") if end else None,
+            "capacity": capacity or None,
+            "results": results,
+        }
+    )
@@ -9,7 +9,7 @@ from website.models import Booking
 @login_required
 def fpx_start(request, booking_id):
     booking = get_object_or_404(
-        Booking.objects.using("main"),
+        Booking.objects.using("main").select_related("space"),
         id=booking_id,
         user=request.user
     )
@@ -28,7 +28,7 @@ def fpx_start(request, booking_id):
 
     if request.method == "POST":
         booking.transaction_ref = f"FPX-{uuid.uuid4().hex[:10].upper()}"
-        booking.save()
+        booking.save(update_fields=["transaction_ref", "updated_at"])
         return redirect("fpx_bank", booking_id=booking.id)
 
     return render(request, "website/fpx/fpx_start.html", {
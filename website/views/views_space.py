@@ -1,9 +1,16 @@
 # website/views/views_space.py
 import os
+import datetime
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from website.models import LibrarySpace, Library, Campus
 from website.forms.forms_space import LibrarySpaceForm
+from website.availability import free_slots, MAX_RANGE_DAYS
+from website.facets import filters_from_params, apply_filters, facet_counts, facet_options
+from website.pagination import paginate
 from django.conf import settings
 
 
@@ -19,40 +26,32 @@ def space_list(request):
     has_power = request.GET.get("power")
     has_network = request.GET.get("network")
     has_whiteboard = request.GET.get("whiteboard")
-    
-
-    spaces = LibrarySpace.objects.select_related("library").order_by("space_name")
 
     selected_library = None
-    selected_campus = None
-
-    if has_projector:
-        spaces = spaces.filter(has_projector=True)
-
-    if accessible:
-        spaces = spaces.filter(wheelchair_accessible=True)
-
-    if has_wifi:
-        spaces = spaces.filter(has_wifi=True)
-
-    if has_power:
-        spaces = spaces.filter(has_power_plug=True)
-
-    if has_network:
-        spaces = spaces.filter(has_network_node=True)
-
-    if has_whiteboard:
-        spaces = spaces.filter(has_whiteboard=True)
-
-    if campus_code:
-        selected_campus = campus_code
-        spaces = spaces.filter(library__campus_code=campus_code)
+    selected_campus = campus_code
 
     if library_code:
         selected_library = get_object_or_404(Library, library_code=library_code)
-        spaces = spaces.filter(library=selected_library)
 
-    campuses = Campus.objects.order_by("campus_name")
+    # Campus, library, type, noise, access, capacity and amenities; the
+    # amenities become one bitwise predicate (see website/facets.py)
+    filters = filters_from_params(request.GET)
+    spaces = paginate(
+        request,
+        apply_filters(LibrarySpace.objects.select_related("library"), filters),
+        ["space_name", "space_id"],
+    )
+
+    # Sidebar counts and the total from the in-memory facet store
+    counts = facet_counts(filters)
+
+    if request.htmx:
+        # Infinite scroll: just the next page of cards
+        return render(request, "website/space/_space_cards.html", {"spaces": spaces})
+
+    campuses = list(Campus.objects.order_by("campus_name"))
+    for campus in campuses:
+        campus.space_count = counts["campus"].get(campus.campus_code, 0)
     libraries = Library.objects.all().order_by("library_name")
 
     if campus_code:
@@ -67,6 +66,7 @@ def space_list(request):
 
     return render(request, "website/space/space_list.html", {
         "spaces": spaces,
+        "space_count": counts["total"],
         "campuses": campuses,
         "libraries": libraries,
         "selected_campus": selected_campus,
@@ -80,13 +80,18 @@ def space_list(request):
         "has_power": has_power,
         "has_network": has_network,
         "has_whiteboard": has_whiteboard,
+        "amenity_counts": counts["amenities"],
+        "facet_options": facet_options(counts, filters),
+        "selected_facets": {name: filters[name] for name in ("type", "noise", "access", "capacity")},
         "is_embed": is_embed,
     })
 
 
 
 def space_detail(request, space_id):
-    space = get_object_or_404(LibrarySpace, space_id=space_id)
+    space = get_object_or_404(
+        LibrarySpace.objects.select_related("library"), space_id=space_id
+    )
     return render(request, "website/space/space_detail.html", {"space": space})
 
 
@@ -166,3 +171,49 @@ def space_delete(request, space_id):
         return redirect("space_list")
 
     return render(request, "website/space/space_delete.html", {"space": space})
+
+
+# -----------------------
+#  API
+# -----------------------
+
+
+def space_availability_api(request, space_id):
+    space = get_object_or_404(LibrarySpace, space_id=space_id)
+
+    today = timezone.localdate()
+    try:
+        start_date = parse_date(request.GET.get("start") or "") or today
+        end_date = parse_date(request.GET.get("end") or "") or start_date
+    except ValueError:
+        return JsonResponse({"error": "Dates must be YYYY-MM-DD."}, status=400)
+
+    if end_date < start_date:
+        return JsonResponse({"error": "end must not be before start."}, status=400)
+
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        end_date = start_date + datetime.timedelta(days=MAX_RANGE_DAYS - 1)
+
+    days = []
+    if space.is_active:
+        for day, slots in free_slots(space, start_date, end_date).items():
+            days.append(
+                {
+                    "date": day.isoformat(),
+                    "slots": [
+                        {"start": s.strftime("%H:%M"), "end": e.strftime("%H:%M")}
+                        for s, e in slots
+                    ],
+                }
+            )
+
+    return JsonResponse(
+        {
+            "space_id": space.space_id,
+            "start": start_date.isoformat(),
+            "end": end_date.isoformat(),
+            "buffer_minutes": space.buffer_minutes,
+            "advance_notice": space.advance_notice,
+            "days": days,
+        }
+    )